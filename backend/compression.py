@@ -0,0 +1,291 @@
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from file_serving import accepted_encodings, is_compressible
+from metrics import Histogram
+
+try:
+    import brotli
+except ImportError:  # responses are gzip-only without brotli
+    brotli = None
+
+
+# Bodies above this size are compressed off the event loop
+THREAD_THRESHOLD = 256 * 1024
+
+
+class Compressor:
+    """gzip/brotli encoder that records CPU time and bytes saved per encoding."""
+
+    def __init__(self, gzip_level: int = 6, brotli_quality: int = 5):
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ["br", "gzip"] if brotli else ["gzip"]
+        self._lock = threading.Lock()
+        self.stats = {
+            encoding: {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "latency": Histogram()}
+            for encoding in self.encodings
+        }
+
+    def choose(self, accept_encoding: Optional[str]) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        return next((encoding for encoding in self.encodings if encoding in accepted), None)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        cpu = time.thread_time() - cpu_started
+        stats = self.stats[encoding]
+        stats["latency"].observe(time.perf_counter() - started)
+        with self._lock:
+            stats["responses"] += 1
+            stats["bytes_in"] += len(body)
+            stats["bytes_out"] += len(compressed)
+            stats["cpu_seconds"] += cpu
+        return compressed
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        if len(body) > THREAD_THRESHOLD:
+            return await run_in_threadpool(self._compress, body, encoding)
+        return self._compress(body, encoding)
+
+    def snapshot(self) -> Dict:
+        result = {}
+        for encoding, stats in self.stats.items():
+            with self._lock:
+                bytes_in, bytes_out = stats["bytes_in"], stats["bytes_out"]
+                row = {key: value for key, value in stats.items() if key != "latency"}
+            row["bytes_saved"] = bytes_in - bytes_out
+            row["ratio"] = round(bytes_out / bytes_in, 4) if bytes_in else None
+            row["latency"] = stats["latency"].snapshot()
+            result[encoding] = row
+        return result
+
+
+class CachedResponse:
+    __slots__ = ("status", "headers", "body", "variants", "expires", "route")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, expires: float, route=None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        # Content-Encoding -> body, filled the first time a client asks for it
+        self.variants: Dict[str, bytes] = {}
+        self.expires = expires
+        # Route that rendered the response, so hits are attributed to it
+        self.route = route
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.variants.values())
+
+
+class ResponseCache:
+    """Size-bounded LRU of public GET responses with a TTL.
+
+    `clear()` also bumps a generation counter, so a response rendered
+    before an invalidation is not stored after it.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = self.misses = self.stores = self.evictions = self.invalidations = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= time.monotonic():
+            self._discard(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes,
+            generation: int, route=None) -> Optional[CachedResponse]:
+        if generation != self.generation or len(body) > self.max_bytes:
+            return None
+        self._discard(key)
+        entry = CachedResponse(status, headers, body, time.monotonic() + self.ttl, route)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self.stores += 1
+        self._evict()
+        return entry
+
+    def add_variant(self, key: str, entry: CachedResponse, encoding: str, body: bytes):
+        if encoding not in entry.variants:
+            entry.variants[encoding] = body
+            if self._entries.get(key) is entry:
+                self.bytes += len(body)
+                self._evict()
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+        self.generation += 1
+        self.invalidations += 1
+
+    def snapshot(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CompressionMiddleware:
+    """Compresses API responses and caches public GET responses with their encodings.
+
+    Only complete (non-streamed) 200 responses with a compressible content
+    type and at least `minimum_size` bytes are compressed. GET requests
+    under `prefix` that carry no Authorization header and are not under one
+    of `private_prefixes` are cached; every cached body is compressed at
+    most once per encoding. A successful write under `invalidate_prefix`
+    clears the cache.
+    """
+
+    def __init__(self, app, compressor: Compressor, cache: ResponseCache, minimum_size: int = 1024,
+                 prefix: str = "/api/", private_prefixes: Sequence[str] = (), invalidate_prefix: str = ""):
+        self.app = app
+        self.compressor = compressor
+        self.cache = cache
+        self.minimum_size = minimum_size
+        self.prefix = prefix
+        self.private_prefixes = tuple(private_prefixes)
+        self.invalidate_prefix = invalidate_prefix
+
+    def cache_key(self, scope, headers: Headers) -> Optional[str]:
+        path = scope["path"]
+        if (scope["method"] != "GET" or not path.startswith(self.prefix) or path.startswith(self.private_prefixes)
+                or "authorization" in headers):
+            return None
+        query = scope.get("query_string", b"").decode("latin-1")
+        return f"{path}?{query}" if query else path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = self.compressor.choose(headers.get("accept-encoding"))
+        key = self.cache_key(scope, headers)
+        if key is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                if entry.route is not None:
+                    scope["route"] = entry.route
+                await self.send_entry(key, entry, encoding, send, hit=True)
+                return
+        generation = self.cache.generation
+        invalidates = (
+            self.invalidate_prefix and scope["method"] not in ("GET", "HEAD", "OPTIONS")
+            and scope["path"].startswith(self.invalidate_prefix)
+        )
+
+        start = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                if invalidates and message["status"] < 400:
+                    self.cache.clear()
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Streamed responses are passed through untouched
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            await self.finish(start, message.get("body", b""), key, generation, encoding, send, scope.get("route"))
+
+        await self.app(scope, receive, wrapped_send)
+
+    def compressible(self, status: int, headers: Headers, body: bytes) -> bool:
+        return (
+            status == 200 and "content-encoding" not in headers and len(body) >= self.minimum_size
+            and self.compressible_type(headers)
+        )
+
+    async def finish(self, start, body: bytes, key: Optional[str], generation: int, encoding: Optional[str], send,
+                     route=None):
+        headers = Headers(raw=start["headers"])
+        cache_control = headers.get("cache-control", "")
+        if (key is not None and start["status"] == 200 and "set-cookie" not in headers
+                and "no-store" not in cache_control and "private" not in cache_control):
+            raw = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"]
+            entry = self.cache.put(key, start["status"], raw, body, generation, route)
+            if entry is not None:
+                await self.send_entry(key, entry, encoding, send, hit=False)
+                return
+        if encoding and self.compressible(start["status"], headers, body):
+            body = await self.compressor.compress(body, encoding)
+            start = self.encoded_start(start["status"], start["headers"], encoding, len(body))
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
+
+    async def send_entry(self, key: str, entry: CachedResponse, encoding: Optional[str], send, hit: bool):
+        body = entry.body
+        headers = Headers(raw=entry.headers)
+        use_encoding = encoding if encoding and self.compressible(entry.status, headers, body) else None
+        if use_encoding:
+            body = entry.variants.get(use_encoding)
+            if body is None:
+                body = await self.compressor.compress(entry.body, use_encoding)
+                self.cache.add_variant(key, entry, use_encoding, body)
+        start = self.encoded_start(entry.status, entry.headers, use_encoding, len(body))
+        start["headers"].append((b"x-cache", b"HIT" if hit else b"MISS"))
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
+
+    def encoded_start(self, status: int, raw_headers, encoding: Optional[str], length: int) -> dict:
+        start = {"type": "http.response.start", "status": status, "headers": list(raw_headers)}
+        headers = MutableHeaders(scope=start)
+        headers["content-length"] = str(length)
+        if encoding:
+            headers["content-encoding"] = encoding
+        if status == 200 and self.compressible_type(headers):
+            headers.add_vary_header("Accept-Encoding")
+        return start
+
+    @staticmethod
+    def compressible_type(headers) -> bool:
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        return is_compressible(content_type) or content_type.endswith("+json")
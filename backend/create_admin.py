@@ -29,7 +29,8 @@ async def create_admin():
     
     # Create admin user
     password = "admin123"  # Default password - change after first login
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    rounds = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
     
     user = {
         "id": str(uuid.uuid4()),
@@ -0,0 +1,181 @@
+import gzip
+import os
+import shutil
+from email.utils import formatdate
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # without brotli only gzip siblings are produced
+    brotli = None
+
+
+# Stored media names never change, so clients may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 64 * 1024
+
+COMPRESSED_PREFIX = ".compressed/"
+COMPRESSIBLE_TYPES = {
+    "image/svg+xml", "application/json", "application/pdf", "application/xml",
+    "application/javascript", "image/x-icon", "font/ttf", "font/otf",
+}
+# Content-Encoding -> sibling suffix, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")] if brotli else [("gzip", ".gz")]
+# Siblings that do not save at least this fraction of the original are dropped
+MIN_SAVING = 0.1
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and (content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES)
+
+
+def compress_file(source: Path, target_dir: Path, name: str) -> List[Tuple[str, Path]]:
+    """Write .br/.gz siblings of `source` into `target_dir`.
+
+    Returns (encoding, path) for each sibling worth keeping.
+    """
+    target_dir.mkdir(exist_ok=True)
+    size = source.stat().st_size
+    results = []
+    for encoding, suffix in ENCODINGS:
+        target = target_dir / f"{name}{suffix}"
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            if encoding == "gzip":
+                # mtime=0 keeps the output byte-identical across runs
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=9, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, CHUNK_SIZE)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(compressor.process(chunk))
+                dst.write(compressor.finish())
+        if target.stat().st_size > size * (1 - MIN_SAVING):
+            target.unlink()
+        else:
+            results.append((encoding, target))
+    return results
+
+
+def accepted_encodings(header: Optional[str]) -> List[str]:
+    """Encodings from Accept-Encoding with a non-zero q value."""
+    accepted = []
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header: str, size: int):
+    """Parse a single-range Range header.
+
+    Returns (start, end) inclusive, None to ignore the header (syntax this
+    server does not handle, such as multiple ranges), or False if the
+    range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            length = int(last)
+            if length == 0:
+                return False
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start > end and last:
+        return None
+    if start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class RangeFileResponse(Response):
+    """206 response streaming the bytes start..end (inclusive) of a file."""
+
+    def __init__(self, path: Path, start: int, end: int, size: int, headers: dict, media_type: Optional[str]):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(request, path: Path, stat: os.stat_result, media_type: Optional[str],
+                  content_encoding: Optional[str] = None, vary: bool = False) -> Response:
+    """Serve an immutable file with a strong ETag, conditional GET and byte ranges.
+
+    Ranges are only honoured for the identity encoding.
+    """
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + content_encoding if content_encoding else ""}"'
+    headers = {
+        "cache-control": IMMUTABLE_CACHE_CONTROL,
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes" if content_encoding is None else "none",
+    }
+    if content_encoding:
+        headers["content-encoding"] = content_encoding
+    if vary:
+        headers["vary"] = "Accept-Encoding"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() not in (etag, headers["last-modified"]):
+        # The client's partial copy is stale; send the whole file
+        range_header = None
+    if range_header and content_encoding is None:
+        byte_range = parse_range(range_header, stat.st_size)
+        if byte_range is False:
+            headers["content-range"] = f"bytes */{stat.st_size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            return RangeFileResponse(path, *byte_range, stat.st_size, headers, media_type)
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat)
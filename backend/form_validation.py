@@ -0,0 +1,106 @@
+import time
+from typing import Annotated, Any, Dict, Literal, Optional, Tuple, Type
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, EmailStr, Field, StringConstraints, create_model
+
+
+# Maximum length per field type; unknown types are treated as text
+MAX_LENGTHS = {"text": 500, "email": 254, "tel": 40, "textarea": 5000, "select": 500}
+PHONE_PATTERN = r"^\+?[0-9()\-.\s]{3,40}$"
+MAX_CACHED_SLUGS = 1000
+
+
+def _blank_to_none(value: Any) -> Any:
+    # Cleared inputs arrive as empty strings
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
+
+
+def field_type(field: dict):
+    kind = field.get("type") or "text"
+    max_length = MAX_LENGTHS.get(kind, MAX_LENGTHS["text"])
+    if kind == "email":
+        return EmailStr
+    if kind == "tel":
+        return Annotated[str, StringConstraints(strip_whitespace=True, max_length=max_length, pattern=PHONE_PATTERN)]
+    if kind == "select":
+        # Either language's labels may be submitted
+        options = [*(field.get("options") or []), *(field.get("options_en") or [])]
+        if options:
+            return Literal[tuple(dict.fromkeys(options))]
+    return Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=max_length)]
+
+
+def compile_form(form: dict) -> Type[BaseModel]:
+    """Build a Pydantic model accepting exactly the fields of a form definition."""
+    fields = {}
+    for index, field in enumerate(form.get("fields") or []):
+        annotation = field_type(field)
+        # Field ids are free text, so they become aliases of generated names
+        if field.get("required"):
+            fields[f"field_{index}"] = (annotation, Field(alias=field["id"]))
+        else:
+            fields[f"field_{index}"] = (
+                Annotated[Optional[annotation], BeforeValidator(_blank_to_none)],
+                Field(default=None, alias=field["id"]),
+            )
+    return create_model(
+        f"FormSubmission_{form['id']}".replace("-", "_"),
+        __config__=ConfigDict(extra="forbid"),
+        **fields,
+    )
+
+
+class FormValidatorCache:
+    """Form definitions by slug and their compiled models, kept for `ttl` seconds.
+
+    Compiled models are keyed by form id and updated_at, so an edited form
+    is recompiled even on a node that missed the invalidation.
+    """
+
+    def __init__(self, forms_collection, ttl: float = 60.0):
+        self.forms = forms_collection
+        self.ttl = ttl
+        self._by_slug: Dict[str, Tuple[float, Optional[dict]]] = {}
+        self._models: Dict[Tuple[str, str], Type[BaseModel]] = {}
+        self.hits = self.misses = self.compiled = 0
+
+    async def get(self, slug: str) -> Tuple[Optional[dict], Optional[Type[BaseModel]]]:
+        """Return (form, model) for a slug, or (None, None) if there is no such form."""
+        cached = self._by_slug.get(slug)
+        if cached is not None and cached[0] > time.monotonic():
+            self.hits += 1
+            form = cached[1]
+        else:
+            self.misses += 1
+            form = await self.forms.find_one({"slug": slug}, {"_id": 0})
+            if len(self._by_slug) >= MAX_CACHED_SLUGS:
+                # Misses for made-up slugs are cached too; keep them bounded
+                self._by_slug.clear()
+            self._by_slug[slug] = (time.monotonic() + self.ttl, form)
+        if form is None:
+            return None, None
+        key = (form["id"], form.get("updated_at", ""))
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = compile_form(form)
+            self.compiled += 1
+        return form, model
+
+    def invalidate(self, form_id: Optional[str] = None):
+        """Forget cached definitions; compiled models of `form_id` are dropped too."""
+        self._by_slug.clear()
+        if form_id is not None:
+            for key in [key for key in self._models if key[0] == form_id]:
+                del self._models[key]
+
+    def snapshot(self) -> Dict:
+        return {
+            "forms": len(self._by_slug),
+            "models": len(self._models),
+            "hits": self.hits,
+            "misses": self.misses,
+            "compiled": self.compiled,
+            "ttl_seconds": self.ttl,
+        }
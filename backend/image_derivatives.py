@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; originals are served as-is without it
+    Image = None
+
+
+RESIZABLE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+WIDTHS = sorted(int(w) for w in os.getenv("MEDIA_DERIVATIVE_WIDTHS", "320,640,960,1280,1920").split(",") if w)
+QUALITY = {"webp": 80, "avif": 55, "jpeg": 82, "png": None}
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif", "jpeg": "image/jpeg", "png": "image/png"}
+# Formats rendered right after upload; anything else is rendered on first request
+EAGER_FORMATS = [f for f in os.getenv("MEDIA_DERIVATIVE_EAGER_FORMATS", "webp").split(",") if f]
+WORKERS = int(os.getenv("MEDIA_DERIVATIVE_WORKERS", "2"))
+DERIVATIVES_PREFIX = ".derivatives/"
+
+
+def available_formats() -> List[str]:
+    if Image is None:
+        return []
+    formats = ["jpeg", "png"]
+    for name in ("webp", "avif"):
+        if features.check(name):
+            formats.append(name)
+    return formats
+
+
+FORMATS = available_formats()
+
+
+def enabled() -> bool:
+    return bool(FORMATS) and bool(WIDTHS)
+
+
+def snap_width(width: int) -> int:
+    """Round a requested width up to the nearest configured width."""
+    for candidate in WIDTHS:
+        if candidate >= width:
+            return candidate
+    return WIDTHS[-1]
+
+
+def derivative_name(filename: str, width: int, fmt: str) -> str:
+    return f"{Path(filename).stem}_w{width}.{fmt}"
+
+
+def render(source: str, target: str, width: int, fmt: str) -> int:
+    """Resize `source` to at most `width` pixels wide and encode it as `fmt`.
+
+    Runs in a worker process. Returns the size of the written file.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode == "P":
+            image = image.convert("RGBA")
+        options = {"optimize": True} if fmt in ("jpeg", "png") else {}
+        if QUALITY.get(fmt) is not None:
+            options["quality"] = QUALITY[fmt]
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        image.save(tmp, format=fmt.upper(), **options)
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+class DerivativeRenderer:
+    """Renders image derivatives in a process pool and keeps them in media storage.
+
+    Derivatives are stored next to the originals under ".derivatives/", so
+    every node serving the same storage shares them. `work_dir` is the
+    local directory renders are written to before they are stored.
+    """
+
+    def __init__(self, storage, work_dir: Path):
+        self.storage = storage
+        self.work_dir = work_dir
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # The server process runs driver and executor threads, so workers are spawned, not forked
+            self._pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    @staticmethod
+    def key(filename: str, width: int, fmt: str) -> str:
+        return f"{DERIVATIVES_PREFIX}{derivative_name(filename, width, fmt)}"
+
+    async def ensure(self, filename: str, width: int, fmt: str, source: Optional[Path] = None) -> str:
+        """Return the storage name of a derivative, rendering it once if missing.
+
+        `source` is a local copy of the original; it is fetched from storage
+        when not given. Raises FileNotFoundError if the original is gone.
+        """
+        key = self.key(filename, width, fmt)
+        future = self._pending.get(key)
+        if future is None:
+            if await self.storage.exists(key):
+                return key
+            future = asyncio.ensure_future(self._render(filename, width, fmt, source))
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        await asyncio.shield(future)
+        return key
+
+    async def _render(self, filename: str, width: int, fmt: str, source: Optional[Path]):
+        if source is None:
+            async with self.storage.local_copy(filename) as source:
+                return await self._render(filename, width, fmt, source)
+        target = self.work_dir / derivative_name(filename, width, fmt)
+        self.work_dir.mkdir(exist_ok=True)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor(), render, str(source), str(target), width, fmt
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a huge image); start a fresh pool next time
+            self._pool = None
+            raise
+        await self.storage.save(target, self.key(filename, width, fmt), CONTENT_TYPES[fmt])
+
+    async def render_all(self, filename: str, formats: List[str]) -> List[Dict]:
+        """Render every configured width for `formats`; returns derivative descriptors."""
+        formats = [f for f in formats if f in FORMATS]
+        jobs = [(width, fmt) for fmt in formats for width in WIDTHS]
+        async with self.storage.local_copy(filename) as source:
+            keys = await asyncio.gather(*(self.ensure(filename, w, f, source) for w, f in jobs))
+        stats = await asyncio.gather(*(self.storage.stat(key) for key in keys))
+        return [
+            {
+                "width": width,
+                "format": fmt,
+                "url": f"/uploads/{filename}?w={width}&fmt={fmt}",
+                "size": stat.size if stat else None,
+            }
+            for (width, fmt), stat in zip(jobs, stats)
+        ]
+
+    async def remove(self, filename: str):
+        for item in await self.storage.list(f"{DERIVATIVES_PREFIX}{Path(filename).stem}_w"):
+            await self.storage.delete(item.name)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
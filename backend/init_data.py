@@ -1,23 +1,20 @@
 import asyncio
+import sys
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from seed_utils import seed_all, print_report
 
 load_dotenv()
 
-async def init_database():
+async def init_database(missing_only: bool = True):
     mongo_url = os.environ['MONGO_URL']
     db_name = os.environ['DB_NAME']
     
     client = AsyncIOMotorClient(mongo_url)
     db = client[db_name]
     
-    # Clear existing collections
-    collections = ['services', 'cases', 'events', 'projects', 'partners', 'articles', 'team']
-    for collection in collections:
-        await db[collection].delete_many({})
-    
-    # Insert Services
+    # Services
     services = [
         {
             "id": "1",
@@ -52,9 +49,8 @@ async def init_database():
             "features": ["Поиск инвесторов", "Due diligence", "Сопровождение сделок"]
         }
     ]
-    await db.services.insert_many(services)
     
-    # Insert Cases
+    # Cases
     cases = [
         {
             "id": "1",
@@ -83,9 +79,8 @@ async def init_database():
             "created_at": "2024-11-15T00:00:00Z"
         }
     ]
-    await db.cases.insert_many(cases)
     
-    # Insert Events
+    # Events
     events = [
         {
             "id": "1",
@@ -118,9 +113,8 @@ async def init_database():
             "image_url": "https://images.unsplash.com/photo-1519046904884-53103b34b206?q=80&w=800"
         }
     ]
-    await db.events.insert_many(events)
     
-    # Insert Projects
+    # Projects
     projects = [
         {
             "id": "1",
@@ -149,9 +143,8 @@ async def init_database():
             "image_url": "https://images.unsplash.com/photo-1509391366360-2e959784a276?q=80&w=800"
         }
     ]
-    await db.projects.insert_many(projects)
     
-    # Insert Partners
+    # Partners
     partners = [
         {
             "id": "1",
@@ -172,9 +165,8 @@ async def init_database():
             "logo_url": "https://images.unsplash.com/photo-1566576721346-d4a3b4eaeb55?q=80&w=400"
         }
     ]
-    await db.partners.insert_many(partners)
     
-    # Insert Articles
+    # Articles
     articles = [
         {
             "id": "1",
@@ -199,9 +191,8 @@ async def init_database():
             "category": "investments"
         }
     ]
-    await db.articles.insert_many(articles)
     
-    # Insert Team
+    # Team
     team = [
         {
             "id": "1",
@@ -220,18 +211,23 @@ async def init_database():
             "linkedin": "https://linkedin.com"
         }
     ]
-    await db.team.insert_many(team)
+    
+    # Upsert by id so admin-created documents survive and the site is never empty
+    results = await seed_all(db, {
+        "services": {"docs": services},
+        "cases": {"docs": cases},
+        "events": {"docs": events},
+        "projects": {"docs": projects},
+        "partners": {"docs": partners},
+        "articles": {"docs": articles},
+        "team": {"docs": team},
+    }, missing_only=missing_only)
     
     print("✅ Database initialized successfully!")
-    print(f"- Services: {len(services)}")
-    print(f"- Cases: {len(cases)}")
-    print(f"- Events: {len(events)}")
-    print(f"- Projects: {len(projects)}")
-    print(f"- Partners: {len(partners)}")
-    print(f"- Articles: {len(articles)}")
-    print(f"- Team: {len(team)}")
+    print_report(results)
     
     client.close()
 
 if __name__ == "__main__":
-    asyncio.run(init_database())
+    # Only absent seed documents are added; --overwrite resets existing ones to the seed
+    asyncio.run(init_database(missing_only="--overwrite" not in sys.argv))
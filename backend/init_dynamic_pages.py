@@ -1,11 +1,13 @@
 import json
 import os
+import sys
 import asyncio
 from datetime import datetime, timezone
 from pathlib import Path
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from dotenv import load_dotenv
+from seed_utils import seed_all, seed_collection, print_report
 load_dotenv()
 
 ROOT = Path(__file__).parent
@@ -478,7 +480,7 @@ def build_pages(ru, en):
     return pages
 
 
-async def run():
+async def run(missing_only: bool = True):
     mongo_url = os.environ["MONGO_URL"]
     db_name = os.environ["DB_NAME"]
     client = AsyncIOMotorClient(mongo_url)
@@ -492,11 +494,6 @@ async def run():
     for page in pages:
         page.setdefault("id", page["slug"])
         page["updated_at"] = now
-        await db.pages_dynamic.update_one(
-            {"slug": page["slug"]},
-            {"$set": page},
-            upsert=True,
-        )
 
     contact_form = {
         "id": "contact",
@@ -515,13 +512,17 @@ async def run():
         ],
         "updated_at": now,
     }
-    await db.forms.update_one({"id": "contact"}, {"$set": contact_form}, upsert=True)
+
+    results = await seed_all(db, {
+        "pages_dynamic": {"docs": pages, "key": "slug", "insert_only": ("id",)},
+        "forms": {"docs": [contact_form]},
+    }, missing_only=missing_only)
 
     # Copy static pages into dynamic pages as HTML blocks when present
-    for slug in ["privacy", "terms", "nda", "download"]:
-        static_page = await db.pages.find_one({"slug": slug}, {"_id": 0})
-        if not static_page:
-            continue
+    legal_pages = []
+    static_pages = db.pages.find({"slug": {"$in": ["privacy", "terms", "nda", "download"]}}, {"_id": 0})
+    async for static_page in static_pages:
+        slug = static_page["slug"]
         html_block = {
             "type": "html",
             "html": static_page.get("content", ""),
@@ -535,15 +536,17 @@ async def run():
             "updated_at": now,
             "blocks": [html_block],
         }
-        await db.pages_dynamic.update_one(
-            {"slug": slug},
-            {"$set": dynamic_page},
-            upsert=True,
-        )
+        legal_pages.append(dynamic_page)
+    if legal_pages:
+        results.append(await seed_collection(
+            db, "pages_dynamic", legal_pages, key="slug", insert_only=("id",), missing_only=missing_only
+        ))
 
     client.close()
     print("Dynamic pages initialized.")
+    print_report(results)
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    # Only absent pages are added; --overwrite resets existing ones to the seed
+    asyncio.run(run(missing_only="--overwrite" not in sys.argv))
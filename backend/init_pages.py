@@ -1,4 +1,5 @@
 import asyncio
+import sys
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
@@ -6,6 +7,7 @@ from pathlib import Path
 from deep_translator import GoogleTranslator
 from datetime import datetime, timezone
 import uuid
+from seed_utils import seed_collection, print_report
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -123,27 +125,31 @@ pages_data = [
     }
 ]
 
-async def init_pages():
+async def init_pages(missing_only: bool = True):
     print("Initializing static pages...")
     
+    slugs = [page['slug'] for page in pages_data]
+    existing = {}
+    async for page in db.pages.find({"slug": {"$in": slugs}}, {"_id": 0}):
+        existing[page['slug']] = page
+    
     for page in pages_data:
-        # Add English translations
-        page['title_en'] = auto_translate(page['title'])
-        page['content_en'] = auto_translate(page['content'])
-        
-        # Check if page already exists
-        existing = await db.pages.find_one({"slug": page['slug']})
-        if existing:
-            print(f"Page '{page['slug']}' already exists, updating...")
-            await db.pages.update_one(
-                {"slug": page['slug']},
-                {"$set": page}
-            )
-        else:
-            print(f"Creating page '{page['slug']}'...")
-            await db.pages.insert_one(page)
+        if missing_only and page['slug'] in existing:
+            # Left as stored, so there is nothing to translate
+            continue
+        # Add English translations, reusing stored ones while the source is unchanged
+        current = existing.get(page['slug']) or {}
+        for field in ('title', 'content'):
+            if current.get(field) == page[field] and current.get(f'{field}_en'):
+                page[f'{field}_en'] = current[f'{field}_en']
+            else:
+                page[f'{field}_en'] = auto_translate(page[field])
     
+    result = await seed_collection(db, "pages", pages_data, key="slug", insert_only=("id",),
+                                   missing_only=missing_only)
+    print_report([result])
     print("Done! Pages initialized.")
 
 if __name__ == "__main__":
-    asyncio.run(init_pages())
+    # Only absent pages are added; --overwrite resets existing ones to the seed
+    asyncio.run(init_pages(missing_only="--overwrite" not in sys.argv))
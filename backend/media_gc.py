@@ -0,0 +1,205 @@
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+
+UPLOAD_URL = re.compile(r"/uploads/([^/?#\"'\s()<>]+)")
+QUARANTINE_PREFIX = ".quarantine/"
+TEMP_PREFIX = ".upload-"
+SESSIONS_DIR = ".sessions"
+
+
+def scan_temp_files(directory: Path, older_than: float) -> Dict[str, os.stat_result]:
+    """Temp files and resumable upload parts left behind by abandoned uploads."""
+    files = {}
+    for subdir, prefix in (("", TEMP_PREFIX), (SESSIONS_DIR, "")):
+        try:
+            entries = os.scandir(directory / subdir)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(prefix) and entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < older_than:
+                        files[os.path.join(subdir, entry.name)] = stat
+    return files
+
+
+def collect_urls(value, found: Set[str]):
+    """Add the filename of every /uploads/ URL inside a nested document."""
+    if isinstance(value, str):
+        if "/uploads/" in value:
+            found.update(UPLOAD_URL.findall(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_urls(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            collect_urls(item, found)
+
+
+def _describe(name: str, size: int, modified: float) -> Dict:
+    return {
+        "filename": name,
+        "size": size,
+        "modified": datetime.fromtimestamp(modified, timezone.utc).isoformat(),
+    }
+
+
+class MediaGarbageCollector:
+    """Cross-references uploaded files, media records and content URLs.
+
+    Orphans are files nobody tracks or links, media records whose file is
+    gone, and media whose file no content links to. A sweep moves orphaned
+    files older than `grace` seconds under ".quarantine/" in media storage
+    and deletes them once they have sat there for another grace period.
+    Quarantined files that content links to again are restored on the next
+    sweep.
+    """
+
+    def __init__(self, db, storage, staging_dir: Path, collections: Iterable[str], grace: float,
+                 on_purge: Optional[Callable[[str], Awaitable]] = None):
+        self.db = db
+        self.storage = storage
+        self.staging_dir = staging_dir
+        self.collections = list(collections)
+        self.grace = grace
+        self.on_purge = on_purge
+
+    async def references(self) -> Set[str]:
+        found: Set[str] = set()
+        for name in self.collections:
+            async for doc in self.db[name].find({}, {"_id": 0}):
+                collect_urls(doc, found)
+        return found
+
+    async def scan(self) -> Dict:
+        """Build an orphan report without changing anything."""
+        started = time.perf_counter()
+        cutoff = time.time() - self.grace
+        files = {item.name: item for item in await self.storage.list()}
+        quarantined = {
+            item.name[len(QUARANTINE_PREFIX):]: item for item in await self.storage.list(QUARANTINE_PREFIX)
+        }
+        temp_files = await run_in_threadpool(scan_temp_files, self.staging_dir, cutoff)
+        referenced = await self.references()
+
+        tracked: Set[str] = set()
+        missing, unreferenced = [], []
+        async for media in self.db.media.find(
+            {}, {"_id": 0, "id": 1, "filename": 1, "original_name": 1, "size": 1, "created_at": 1, "quarantined_at": 1}
+        ):
+            filename = media.get("filename")
+            tracked.add(filename)
+            if media.get("quarantined_at"):
+                continue
+            if filename not in files:
+                missing.append(media)
+            elif filename not in referenced:
+                unreferenced.append(media)
+        async for blob in self.db.media_blobs.find({}, {"_id": 0, "filename": 1}):
+            tracked.add(blob["filename"])
+
+        untracked = [
+            _describe(name, item.size, item.modified) for name, item in files.items()
+            if name not in tracked and name not in referenced
+        ]
+        return {
+            "scanned_files": len(files),
+            "referenced_files": len(referenced),
+            "untracked_files": untracked,
+            "missing_files": missing,
+            "unreferenced_media": unreferenced,
+            "stale_temp_files": [
+                _describe(name, stat.st_size, stat.st_mtime) for name, stat in temp_files.items()
+            ],
+            "quarantined": [_describe(name, item.size, item.modified) for name, item in quarantined.items()],
+            "restorable": sorted(name for name in quarantined if name in referenced),
+            "grace_seconds": self.grace,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def sweep(self, include_unreferenced: bool = False) -> Dict:
+        """Quarantine orphans past the grace period and purge expired quarantine.
+
+        Media that is merely unreferenced stays in the library unless
+        `include_unreferenced` is set.
+        """
+        report = await self.scan()
+        cutoff = time.time() - self.grace
+        old = lambda item: datetime.fromisoformat(item["modified"]).timestamp() < cutoff
+        created_before_cutoff = lambda media: (
+            not media.get("created_at") or datetime.fromisoformat(media["created_at"]).timestamp() < cutoff
+        )
+        actions = {"quarantined": [], "purged": [], "restored": [], "removed_records": [], "removed_temp_files": []}
+
+        for name in report["restorable"]:
+            if await self.restore(name):
+                actions["restored"].append(name)
+
+        for item in report["stale_temp_files"]:
+            await run_in_threadpool((self.staging_dir / item["filename"]).unlink, True)
+            actions["removed_temp_files"].append(item["filename"])
+
+        for item in report["untracked_files"]:
+            if old(item) and await self._quarantine(item["filename"]):
+                actions["quarantined"].append(item["filename"])
+
+        for media in report["missing_files"]:
+            if created_before_cutoff(media):
+                await self.db.media.delete_one({"id": media["id"]})
+                await self._drop_blob(media["filename"])
+                actions["removed_records"].append(media["id"])
+
+        if include_unreferenced:
+            for filename in {m["filename"] for m in report["unreferenced_media"] if created_before_cutoff(m)}:
+                if await self._quarantine(filename):
+                    await self.db.media.update_many(
+                        {"filename": filename},
+                        {"$set": {"quarantined_at": datetime.now(timezone.utc).isoformat()}},
+                    )
+                    actions["quarantined"].append(filename)
+
+        for item in report["quarantined"]:
+            if item["filename"] not in actions["restored"] and old(item):
+                await self._purge(item["filename"])
+                actions["purged"].append(item["filename"])
+
+        report["actions"] = actions
+        return report
+
+    async def restore(self, filename: str) -> bool:
+        quarantined = f"{QUARANTINE_PREFIX}{filename}"
+        if not await self.storage.exists(quarantined):
+            return False
+        if await self.storage.exists(filename):
+            # The same bytes were uploaded again in the meantime
+            await self.storage.delete(quarantined)
+        else:
+            await self.storage.move(quarantined, filename)
+        await self.db.media.update_many({"filename": filename}, {"$unset": {"quarantined_at": ""}})
+        return True
+
+    async def _quarantine(self, filename: str) -> bool:
+        if not await self.storage.exists(filename):
+            return False
+        # The quarantine grace period starts at the move
+        await self.storage.move(filename, f"{QUARANTINE_PREFIX}{filename}")
+        return True
+
+    async def _purge(self, filename: str):
+        await self.storage.delete(f"{QUARANTINE_PREFIX}{filename}")
+        await self.db.media.delete_many({"filename": filename, "quarantined_at": {"$exists": True}})
+        await self._drop_blob(filename)
+        if self.on_purge:
+            await self.on_purge(filename)
+
+    async def _drop_blob(self, filename: str):
+        if not await self.db.media.find_one({"filename": filename}, {"_id": 1}):
+            await self.db.media_blobs.delete_one({"filename": filename})
@@ -0,0 +1,272 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+
+from file_serving import IMMUTABLE_CACHE_CONTROL, file_response
+
+
+class StoredObject(NamedTuple):
+    name: str
+    size: int
+    modified: float
+
+
+class LocalStorage:
+    """Media stored in a directory on this node's filesystem.
+
+    Object names are paths relative to `root`; names inside hidden
+    directories (".derivatives/...", ".quarantine/...") hold derived and
+    quarantined files.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+    async def save(self, source: Path, name: str, content_type: str, content_encoding: Optional[str] = None):
+        """Take ownership of the local file `source` and store it as `name`."""
+        target = self.path(name)
+        if source != target:
+            await run_in_threadpool(target.parent.mkdir, parents=True, exist_ok=True)
+            await run_in_threadpool(os.replace, source, target)
+
+    async def exists(self, name: str) -> bool:
+        return await run_in_threadpool(self.path(name).is_file)
+
+    async def stat(self, name: str) -> Optional[StoredObject]:
+        try:
+            result = await run_in_threadpool(os.stat, self.path(name))
+        except FileNotFoundError:
+            return None
+        return StoredObject(name, result.st_size, result.st_mtime)
+
+    async def delete(self, name: str):
+        await run_in_threadpool(self.path(name).unlink, True)
+
+    async def move(self, name: str, target: str):
+        """Rename an object; the target's modification time starts now."""
+        def move():
+            path = self.path(target)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.path(name), path)
+            os.utime(path)
+        await run_in_threadpool(move)
+
+    async def list(self, prefix: str = "") -> List[StoredObject]:
+        """Objects whose name starts with `prefix`, one directory level deep.
+
+        Hidden entries are skipped unless the prefix names them.
+        """
+        directory, _, start = prefix.rpartition("/")
+        base = f"{directory}/" if directory else ""
+
+        def scan():
+            objects = []
+            try:
+                entries = os.scandir(self.root / directory)
+            except FileNotFoundError:
+                return objects
+            with entries:
+                for entry in entries:
+                    if not entry.name.startswith(start) or (entry.name.startswith(".") and not start):
+                        continue
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        objects.append(StoredObject(base + entry.name, stat.st_size, stat.st_mtime))
+            return objects
+
+        return await run_in_threadpool(scan)
+
+    @asynccontextmanager
+    async def local_copy(self, name: str):
+        """Yield a local path holding the object's bytes."""
+        path = self.path(name)
+        if not await run_in_threadpool(path.is_file):
+            raise FileNotFoundError(name)
+        yield path
+
+    async def response(self, request, name: str, media_type: Optional[str] = None,
+                       content_encoding: Optional[str] = None, vary: bool = False):
+        """Response serving the object, or None if it does not exist."""
+        path = self.path(name)
+        try:
+            stat = await run_in_threadpool(os.stat, path)
+        except FileNotFoundError:
+            return None
+        return file_response(request, path, stat, media_type, content_encoding, vary)
+
+
+class S3Storage:
+    """Media stored in an S3-compatible bucket shared by all nodes.
+
+    Uploads use boto3's managed transfer, which switches to multipart
+    uploads above `multipart_threshold`. Downloads are answered with a
+    redirect to `public_url` or to a presigned URL, so media bytes never
+    pass through the API workers. Redirects are only sent for objects a
+    HEAD request found, remembered for `exists_ttl` seconds. `endpoint_url`
+    points the client at MinIO or another local stand-in.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, public_url: Optional[str] = None,
+                 url_expires: int = 3600, multipart_threshold: int = 16 * 1024 * 1024,
+                 multipart_chunksize: int = 16 * 1024 * 1024, max_concurrency: int = 4,
+                 scratch_dir: Optional[Path] = None, exists_ttl: float = 60.0, exists_max_keys: int = 10_000):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.url_expires = url_expires
+        self.scratch_dir = scratch_dir
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.transfer = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+        )
+        self.exists_ttl = exists_ttl
+        self.exists_max_keys = exists_max_keys
+        # Names known to exist -> when that stops being trusted
+        self._existing: "OrderedDict[str, float]" = OrderedDict()
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def _remember(self, name: str):
+        self._existing[name] = time.monotonic() + self.exists_ttl
+        self._existing.move_to_end(name)
+        while len(self._existing) > self.exists_max_keys:
+            self._existing.popitem(last=False)
+
+    async def _known_to_exist(self, name: str) -> bool:
+        expires = self._existing.get(name)
+        if expires is not None and expires > time.monotonic():
+            return True
+        self._existing.pop(name, None)
+        if await self.exists(name):
+            self._remember(name)
+            return True
+        return False
+
+    @staticmethod
+    def _not_found(error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    async def save(self, source: Path, name: str, content_type: str, content_encoding: Optional[str] = None):
+        extra = {"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL}
+        if content_encoding:
+            extra["ContentEncoding"] = content_encoding
+        await run_in_threadpool(
+            self.client.upload_file, str(source), self.bucket, self.key(name),
+            ExtraArgs=extra, Config=self.transfer,
+        )
+        self._remember(name)
+        await run_in_threadpool(source.unlink, True)
+
+    async def stat(self, name: str) -> Optional[StoredObject]:
+        try:
+            head = await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=self.key(name))
+        except ClientError as e:
+            if self._not_found(e):
+                return None
+            raise
+        return StoredObject(name, head["ContentLength"], head["LastModified"].timestamp())
+
+    async def exists(self, name: str) -> bool:
+        return await self.stat(name) is not None
+
+    async def delete(self, name: str):
+        self._existing.pop(name, None)
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=self.key(name))
+
+    async def move(self, name: str, target: str):
+        # Copying gives the target a fresh LastModified
+        await run_in_threadpool(
+            self.client.copy, {"Bucket": self.bucket, "Key": self.key(name)}, self.bucket, self.key(target),
+            Config=self.transfer,
+        )
+        await self.delete(name)
+
+    async def list(self, prefix: str = "") -> List[StoredObject]:
+        def scan():
+            objects = []
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.key(prefix), Delimiter="/"):
+                for item in page.get("Contents", []):
+                    name = item["Key"][len(self.prefix):]
+                    if name.rpartition("/")[2].startswith(".") and not prefix:
+                        continue
+                    objects.append(StoredObject(name, item["Size"], item["LastModified"].timestamp()))
+            return objects
+
+        return await run_in_threadpool(scan)
+
+    @asynccontextmanager
+    async def local_copy(self, name: str):
+        path = Path(self.scratch_dir or "/tmp") / f".fetch-{uuid.uuid4().hex}{Path(name).suffix}"
+        try:
+            await run_in_threadpool(
+                self.client.download_file, self.bucket, self.key(name), str(path), Config=self.transfer
+            )
+        except ClientError as e:
+            path.unlink(missing_ok=True)
+            if self._not_found(e):
+                raise FileNotFoundError(name)
+            raise
+        try:
+            yield path
+        finally:
+            path.unlink(missing_ok=True)
+
+    async def response(self, request, name: str, media_type: Optional[str] = None,
+                       content_encoding: Optional[str] = None, vary: bool = False):
+        if not await self._known_to_exist(name):
+            return None
+        # The bucket answers Range and conditional requests itself
+        headers = {"vary": "Accept-Encoding"} if vary else {}
+        if self.public_url:
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            return RedirectResponse(f"{self.public_url}/{self.key(name)}", headers=headers)
+        params = {"Bucket": self.bucket, "Key": self.key(name)}
+        if media_type:
+            params["ResponseContentType"] = media_type
+        url = await run_in_threadpool(
+            self.client.generate_presigned_url, "get_object", Params=params, ExpiresIn=self.url_expires
+        )
+        # Presigned URLs expire, so the redirect may only be reused for part of their lifetime
+        headers["cache-control"] = f"private, max-age={self.url_expires // 2}"
+        return RedirectResponse(url, headers=headers)
+
+
+def storage_from_env(local_root: Path):
+    """Build the media storage selected by MEDIA_STORAGE (local or s3)."""
+    backend = os.getenv("MEDIA_STORAGE", "local").lower()
+    if backend == "local":
+        return LocalStorage(local_root)
+    if backend == "s3":
+        mb = 1024 * 1024
+        return S3Storage(
+            bucket=os.environ["MEDIA_S3_BUCKET"],
+            prefix=os.getenv("MEDIA_S3_PREFIX", ""),
+            endpoint_url=os.getenv("MEDIA_S3_ENDPOINT_URL") or None,
+            region=os.getenv("MEDIA_S3_REGION") or None,
+            public_url=os.getenv("MEDIA_S3_PUBLIC_URL") or None,
+            url_expires=int(os.getenv("MEDIA_S3_URL_EXPIRES", "3600")),
+            multipart_threshold=int(os.getenv("MEDIA_S3_MULTIPART_THRESHOLD_MB", "16")) * mb,
+            multipart_chunksize=int(os.getenv("MEDIA_S3_MULTIPART_CHUNK_MB", "16")) * mb,
+            max_concurrency=int(os.getenv("MEDIA_S3_MAX_CONCURRENCY", "4")),
+            scratch_dir=local_root,
+            exists_ttl=float(os.getenv("MEDIA_S3_EXISTS_TTL_SECONDS", "60")),
+        )
+    raise ValueError(f"Unknown MEDIA_STORAGE backend: {backend}")
@@ -0,0 +1,161 @@
+import hashlib
+import mimetypes
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+
+CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 512
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+# (offset, signature, content type); checked in order
+MAGIC_NUMBERS = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x00\x00\x01\x00", "image/x-icon"),
+    (0, b"\x1a\x45\xdf\xa3", "video/webm"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"wOFF", "font/woff"),
+    (0, b"wOF2", "font/woff2"),
+    (0, b"\x00\x01\x00\x00", "font/ttf"),
+    (0, b"OTTO", "font/otf"),
+]
+# ISO base media brands at offset 8 of an "ftyp" box
+FTYP_BRANDS = {
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heif",
+    b"qt  ": "video/quicktime",
+    b"M4A ": "audio/mp4",
+}
+
+
+def sniff_content_type(head: bytes, filename: Optional[str] = None) -> str:
+    """Detect a content type from the first bytes, falling back to the extension."""
+    for offset, signature, content_type in MAGIC_NUMBERS:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(head[8:12], "video/mp4")
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return "image/svg+xml"
+    guessed = mimetypes.guess_type(filename or "")[0]
+    if guessed and not guessed.startswith(("image/", "video/", "audio/")):
+        # A media type claimed only by the extension did not match any signature.
+        return guessed
+    return "application/octet-stream"
+
+
+def blob_extension(content_type: str, filename: Optional[str] = None) -> str:
+    """File extension for stored bytes, preferring the sniffed content type."""
+    suffix = Path(filename or "").suffix.lower()
+    if content_type == "application/octet-stream":
+        return suffix
+    if mimetypes.guess_type(f"x{suffix}")[0] == content_type:
+        return suffix
+    return mimetypes.guess_extension(content_type) or suffix
+
+
+class StreamedUpload:
+    """Result of streaming an upload to a temporary file."""
+
+    def __init__(self, path: Path, size: int, sha256: str, head: bytes):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.head = head
+
+    def discard(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _open_temp(directory: Path):
+    path = directory / f".upload-{uuid.uuid4().hex}.tmp"
+    return path, open(path, "wb")
+
+
+def _finish(handle):
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+
+
+async def stream_upload(upload, directory: Path, max_bytes: int) -> StreamedUpload:
+    """Copy an UploadFile to a hidden temp file in `directory` chunk by chunk.
+
+    The size limit is enforced while copying, and the SHA-256 and the
+    leading bytes for content sniffing are collected on the way.
+    """
+    path, handle = await run_in_threadpool(_open_temp, directory)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            if len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+            digest.update(chunk)
+            await run_in_threadpool(handle.write, chunk)
+        await run_in_threadpool(_finish, handle)
+    except BaseException:
+        handle.close()
+        path.unlink(missing_ok=True)
+        raise
+    return StreamedUpload(path, size, digest.hexdigest(), head)
+
+
+def write_chunk(path: Path, offset: int, data: bytes):
+    """Write `data` at `offset` and fsync before returning.
+
+    Positional writes make a retried chunk land on the same bytes.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def hash_file(path: Path) -> StreamedUpload:
+    """Hash a fully written file, collecting the same facts as stream_upload."""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            if len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+            digest.update(chunk)
+            size += len(chunk)
+    return StreamedUpload(path, size, digest.hexdigest(), head)
@@ -0,0 +1,73 @@
+import bisect
+import threading
+from typing import Dict, Optional, Sequence
+
+
+# Seconds; covers sub-millisecond cache hits up to slow translation calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram.
+
+    Observations may come from the event loop or from the driver's worker
+    threads, so updates are guarded by a lock.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            maximum = self.max
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else maximum
+                fraction = (rank - seen) / bucket_count
+                return min(lower + (upper - lower) * fraction, maximum)
+            seen += bucket_count
+        return maximum
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            count, total, maximum = self.count, self.sum, self.max
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else None,
+            "max": maximum if count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def cumulative(self):
+        """Yield (upper bound, cumulative count) pairs, ending with +Inf."""
+        with self._lock:
+            counts = list(self.counts)
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            yield bound, running
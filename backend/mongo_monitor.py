@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+import bson
+from pymongo import monitoring
+
+from metrics import Histogram
+
+
+# Handshake and session bookkeeping, not application queries.
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart",
+                    "saslContinue", "buildInfo", "getnonce", "authenticate"}
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "$cmd")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else "$cmd"
+
+
+def reply_documents(command_name: str, reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if batch is not None else 0
+    if command_name in ("count", "insert", "update", "delete"):
+        return int(reply.get("n", 0))
+    return 0
+
+
+class CommandStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.documents = 0
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Records latency, returned documents and errors per collection and command."""
+
+    def __init__(self):
+        self.stats: Dict[Tuple[str, str], CommandStats] = defaultdict(CommandStats)
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[self._key(event)] = (collection, event.command_name)
+
+    def succeeded(self, event):
+        with self._lock:
+            key = self._pending.pop(self._key(event), None)
+            if key is None:
+                return
+            stats = self.stats[key]
+            stats.documents += reply_documents(event.command_name, event.reply)
+        stats.latency.observe(event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        with self._lock:
+            key = self._pending.pop(self._key(event), None)
+            if key is None:
+                return
+            stats = self.stats[key]
+            stats.errors += 1
+        stats.latency.observe(event.duration_micros / 1_000_000)
+
+    def items(self):
+        with self._lock:
+            return list(self.stats.items())
+
+    def snapshot(self):
+        items = self.items()
+        rows = []
+        for (collection, command), stats in items:
+            rows.append({
+                "collection": collection,
+                "command": command,
+                "errors": stats.errors,
+                "documents": stats.documents,
+                **stats.latency.snapshot(),
+            })
+        rows.sort(key=lambda row: row["sum"], reverse=True)
+        return rows
+
+
+def bson_size(document) -> Optional[int]:
+    try:
+        return len(bson.encode(document))
+    except Exception:
+        return None
+
+
+class SlowCommandLogger(monitoring.CommandListener):
+    """Logs each command that takes `threshold` seconds or longer as one record.
+
+    Only sizes are logged, never the command or reply contents. A threshold
+    of 0 disables the listener.
+    """
+
+    def __init__(self, threshold: float, logger: logging.Logger):
+        self.threshold = threshold
+        self.logger = logger
+        self._pending: Dict[Tuple, Tuple[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if self.threshold <= 0 or event.command_name in IGNORED_COMMANDS:
+            return
+        collection = command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, event.reply, None)
+
+    def failed(self, event):
+        self._finish(event, None, event.failure)
+
+    def _finish(self, event, reply, failure):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None or event.duration_micros < self.threshold * 1_000_000:
+            return
+        collection, command = pending
+        self.logger.warning("Slow Mongo command", extra={
+            "event": "slow_query",
+            "collection": collection,
+            "command": event.command_name,
+            "duration_ms": round(event.duration_micros / 1000, 1),
+            "request_bytes": bson_size(command),
+            "response_bytes": bson_size(reply) if reply is not None else None,
+            "documents": reply_documents(event.command_name, reply) if reply is not None else None,
+            "error": str(failure.get("errmsg", failure)) if failure else None,
+        })
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks how long operations wait to check a connection out of the pool."""
+
+    def __init__(self):
+        self.wait = Histogram()
+        self.checkout_failures: Dict[str, int] = defaultdict(int)
+        self.in_use = 0
+        self.open_connections = 0
+        self.pool_clears = 0
+        self._started: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    # Check-out starts and completes on the same driver thread.
+    def connection_check_out_started(self, event):
+        self._started[threading.get_ident()] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = self._started.pop(threading.get_ident(), None)
+        with self._lock:
+            self.in_use += 1
+        if started is not None:
+            self.wait.observe(time.perf_counter() - started)
+
+    def connection_check_out_failed(self, event):
+        started = self._started.pop(threading.get_ident(), None)
+        with self._lock:
+            self.checkout_failures[str(event.reason)] += 1
+        if started is not None:
+            self.wait.observe(time.perf_counter() - started)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            failures = dict(self.checkout_failures)
+            in_use, open_connections, clears = self.in_use, self.open_connections, self.pool_clears
+        return {
+            "in_use": in_use,
+            "open_connections": open_connections,
+            "pool_clears": clears,
+            "checkout_failures": failures,
+            "checkout_wait": self.wait.snapshot(),
+        }
+
+
+command_monitor = CommandMonitor()
+pool_monitor = PoolMonitor()
@@ -0,0 +1,211 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from prometheus import route_template
+
+
+MODES = ("cprofile", "sample")
+HEADER = b"x-profile"
+QUERY_PARAM = "__profile"
+
+
+class ProfileRecord:
+    __slots__ = ("id", "created_at", "method", "path", "route", "status", "duration", "mode", "trigger", "data")
+
+    def __init__(self, mode: str, trigger: str, scope):
+        self.id = uuid.uuid4().hex
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.route = None
+        self.status = None
+        self.duration = None
+        self.mode = mode
+        self.trigger = trigger
+        # pstats dump for cprofile, folded stacks for sample
+        self.data = b""
+
+    @property
+    def filename(self) -> str:
+        return f"profile-{self.id}.{'prof' if self.mode == 'cprofile' else 'folded'}"
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "duration": self.duration,
+            "mode": self.mode,
+            "trigger": self.trigger,
+            "size": len(self.data),
+        }
+
+
+class ProfileStore:
+    """Ring buffer of the most recent profiles."""
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self._records: "OrderedDict[str, ProfileRecord]" = OrderedDict()
+
+    def add(self, record: ProfileRecord):
+        self._records[record.id] = record
+        while len(self._records) > self.capacity:
+            self._records.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        return self._records.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        return [record.summary() for record in reversed(self._records.values())]
+
+
+class _DumpedStats:
+    # pstats.Stats loads anything with create_stats() and a stats dict
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+def stats_text(data: bytes, limit: int = 60) -> str:
+    """Readable table of a pstats dump, sorted by cumulative time."""
+    stream = io.StringIO()
+    pstats.Stats(_DumpedStats(data), stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread.
+
+    The result is in the folded format read by flamegraph.pl and speedscope:
+    one line per distinct stack, frames root first, then the sample count.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> bytes:
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common()).encode()
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it, and optionally a random share of all requests.
+
+    A request is profiled when it carries an `X-Profile: cprofile|sample`
+    header or a `__profile=` query parameter and `authorize` accepts its
+    bearer token; the response then carries an X-Profile-Id header. With
+    `sample_rate` above 0 that share of requests is also sampled into the
+    store. Only one request is profiled at a time, and since handlers share
+    the event loop thread, concurrent requests show up in the profile too.
+    """
+
+    def __init__(self, app, store: ProfileStore, authorize: Callable[[str], bool], sample_rate: float = 0.0,
+                 interval: float = 0.005):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._busy = False
+
+    def requested_mode(self, scope) -> Optional[str]:
+        mode = None
+        for name, value in scope["headers"]:
+            if name == HEADER:
+                mode = value.decode("latin-1").strip().lower()
+                break
+        if mode is None and QUERY_PARAM.encode() in scope.get("query_string", b""):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get(QUERY_PARAM)
+            mode = values[0].strip().lower() if values else None
+        if not mode or mode in ("0", "false"):
+            return None
+        mode = mode if mode in MODES else MODES[0]
+
+        authorization = next((value for name, value in scope["headers"] if name == b"authorization"), b"")
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not self.authorize(token.strip()):
+            return None
+        return mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy:
+            await self.app(scope, receive, send)
+            return
+        mode, trigger = self.requested_mode(scope), "requested"
+        if mode is None and self.sample_rate > 0 and random.random() < self.sample_rate:
+            mode, trigger = "sample", "sampled"
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        record = ProfileRecord(mode, trigger, scope)
+
+        async def wrapped_send(message):
+            if message["type"] == "http.response.start":
+                record.status = message["status"]
+                if trigger == "requested":
+                    message = {**message, "headers": [*message["headers"], (b"x-profile-id", record.id.encode())]}
+            await send(message)
+
+        self._busy = True
+        started = time.perf_counter()
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), self.interval)
+            profiler.start()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            if mode == "cprofile":
+                profiler.disable()
+                profiler.create_stats()
+                record.data = marshal.dumps(profiler.stats)
+            else:
+                record.data = profiler.stop()
+            self._busy = False
+            record.duration = time.perf_counter() - started
+            record.route = route_template(scope)
+            self.store.add(record)
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metrics import Histogram
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Route label for requests that matched no route, so unknown paths cannot
+# inflate the number of series
+UNMATCHED = "unmatched"
+# Any other request method is counted as "other", for the same reason
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+def method_label(scope) -> str:
+    method = scope["method"]
+    return method if method in METHODS else "other"
+
+
+def route_template(scope) -> Optional[str]:
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None)
+
+
+class RequestMetrics:
+    """Latency, status codes and in-flight requests per method and route template."""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.responses: Counter = Counter()
+        # Scopes of requests being handled; routed lazily, grouped when scraped
+        self.active: Dict[int, dict] = {}
+
+    def in_flight(self) -> Counter:
+        counts = Counter()
+        for scope in list(self.active.values()):
+            counts[(method_label(scope), route_template(scope) or UNMATCHED)] += 1
+        return counts
+
+
+class MetricsMiddleware:
+    """Records every HTTP request into a RequestMetrics.
+
+    The route template is read from the scope after the router has matched
+    it, so the cost per request is two clock reads and a few dict updates.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def wrapped_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.active[id(scope)] = scope
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            del self.metrics.active[id(scope)]
+            key = (method_label(scope), route_template(scope) or UNMATCHED)
+            self.metrics.latency[key].observe(time.perf_counter() - started)
+            self.metrics.responses[(*key, str(status))] += 1
+
+
+class CallStats:
+    """Calls, failures, input characters and latency of an external call."""
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.characters = 0
+        self.latency = Histogram()
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, characters: int, failed: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.characters += characters
+            if failed:
+                self.failures += 1
+        self.latency.observe(seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls, failures, characters = self.calls, self.failures, self.characters
+        return {"calls": calls, "failures": failures, "characters": characters, "latency": self.latency.snapshot()}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """Builds a Prometheus text exposition, one metric family at a time."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def _header(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, float]]):
+        self._header(name, "counter", help_text)
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, float]]):
+        self._header(name, "gauge", help_text)
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, Histogram]]):
+        self._header(name, "histogram", help_text)
+        for labels, histogram in samples:
+            count = 0
+            for bound, count in histogram.cumulative():
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}")
+            # The +Inf bucket doubles as the count
+            self.lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+            self.lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,303 @@
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class _WindowState:
+    __slots__ = ("failures", "blocked_until", "lockouts", "touched")
+
+    def __init__(self):
+        self.failures = deque()
+        self.blocked_until = 0.0
+        self.lockouts = 0
+        self.touched = 0.0
+
+
+class SlidingWindowLimiter:
+    """In-memory sliding-window failure limiter with exponential backoff.
+
+    After `max_failures` failures within `window` seconds a key is blocked
+    for `base_backoff` seconds, doubling with every further lockout up to
+    `max_backoff`. Checking a key touches no I/O, so rejected requests
+    cost next to nothing.
+    """
+
+    def __init__(self, max_failures: int, window: float, base_backoff: float, max_backoff: float,
+                 max_keys: int = 100_000):
+        self.max_failures = max_failures
+        self.window = window
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_keys = max_keys
+        self._state: "OrderedDict[str, _WindowState]" = OrderedDict()
+
+    def backoff(self, lockouts: int) -> float:
+        return min(self.base_backoff * 2 ** (lockouts - 1), self.max_backoff)
+
+    def _get(self, key: str, now: float, create: bool = False):
+        state = self._state.get(key)
+        if state is not None and now - state.touched > self.window + self.max_backoff:
+            # Idle long enough: forget the key, including its lockout history.
+            del self._state[key]
+            state = None
+        if state is None and create:
+            state = self._state[key] = _WindowState()
+            while len(self._state) > self.max_keys:
+                self._state.popitem(last=False)
+        if state is not None:
+            self._state.move_to_end(key)
+        return state
+
+    def _block(self, key: str, blocked_until: float):
+        now = time.time()
+        state = self._get(key, now, create=True)
+        state.touched = now
+        state.blocked_until = max(state.blocked_until, blocked_until)
+
+    async def check(self, key: str) -> float:
+        """Return the seconds until `key` may try again, 0 if allowed."""
+        now = time.time()
+        state = self._get(key, now)
+        if state is None or state.blocked_until <= now:
+            return 0.0
+        return state.blocked_until - now
+
+    async def failure(self, key: str) -> float:
+        """Record a failure; returns the block duration if it caused a lockout."""
+        now = time.time()
+        state = self._get(key, now, create=True)
+        state.touched = now
+        state.failures.append(now)
+        while state.failures and state.failures[0] <= now - self.window:
+            state.failures.popleft()
+        if len(state.failures) < self.max_failures:
+            return 0.0
+        state.failures.clear()
+        state.lockouts += 1
+        delay = self.backoff(state.lockouts)
+        state.blocked_until = now + delay
+        return delay
+
+    async def reset(self, key: str):
+        self._state.pop(key, None)
+
+
+class MongoSlidingWindowLimiter(SlidingWindowLimiter):
+    """Sliding-window limiter whose state is shared through a Mongo TTL collection.
+
+    Lockouts seen in Mongo are mirrored into local memory, so repeated
+    requests from a blocked key are rejected without another round trip.
+    """
+
+    def __init__(self, collection, prefix: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collection = collection
+        self.prefix = prefix
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def check(self, key: str) -> float:
+        retry = await super().check(key)
+        if retry:
+            return retry
+        doc = await self.collection.find_one({"_id": f"{self.prefix}:{key}"}, {"blocked_until": 1})
+        blocked_until = (doc or {}).get("blocked_until", 0.0)
+        now = time.time()
+        if blocked_until > now:
+            self._block(key, blocked_until)
+            return blocked_until - now
+        return 0.0
+
+    async def failure(self, key: str) -> float:
+        now = time.time()
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.window + self.max_backoff)
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{self.prefix}:{key}"},
+            {
+                "$push": {"failures": {"$each": [now], "$slice": -self.max_failures}},
+                "$set": {"expires_at": expires_at},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        recent = [t for t in doc.get("failures", []) if t > now - self.window]
+        if len(recent) < self.max_failures:
+            return 0.0
+        lockouts = doc.get("lockouts", 0) + 1
+        delay = self.backoff(lockouts)
+        await self.collection.update_one(
+            {"_id": f"{self.prefix}:{key}"},
+            {"$set": {"failures": [], "blocked_until": now + delay, "lockouts": lockouts}},
+        )
+        self._block(key, now + delay)
+        return delay
+
+    async def reset(self, key: str):
+        await super().reset(key)
+        await self.collection.delete_one({"_id": f"{self.prefix}:{key}"})
+
+
+class TokenBucketLimiter:
+    """In-memory token bucket: `burst` requests at once, refilled at `rate` per second.
+
+    Each key stores the time at which its bucket will be full again (the
+    GCRA form of a token bucket), so a full bucket needs no state and a
+    take is a single comparison.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.interval = 1.0 / rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._full_at: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"allowed": 0, "rejected": 0}
+
+    @property
+    def tolerance(self) -> float:
+        # How far ahead of now the bucket may be drawn before it is empty
+        return (self.burst - 1) * self.interval
+
+    def _take_local(self, key: str, now: float) -> float:
+        full_at = max(self._full_at.get(key, now), now)
+        if full_at - now > self.tolerance:
+            return full_at - now - self.tolerance
+        self._full_at[key] = full_at + self.interval
+        self._full_at.move_to_end(key)
+        while len(self._full_at) > self.max_keys:
+            self._full_at.popitem(last=False)
+        return 0.0
+
+    def _count(self, retry: float) -> float:
+        self.stats["rejected" if retry else "allowed"] += 1
+        return retry
+
+    async def take(self, key: str) -> float:
+        """Take a token; returns the seconds until one is available, 0 if taken."""
+        return self._count(self._take_local(key, time.time()))
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "rate_per_second": round(1.0 / self.interval, 4),
+            "burst": self.burst,
+            "keys": len(self._full_at),
+        }
+
+
+class MongoTokenBucketLimiter(TokenBucketLimiter):
+    """Token bucket shared through a Mongo TTL collection.
+
+    The bucket is drawn with a conditional update, so concurrent workers
+    never over-spend it. Rejections are remembered locally until the next
+    token is due, sparing Mongo the requests of a client that keeps trying.
+    """
+
+    def __init__(self, collection, prefix: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collection = collection
+        self.prefix = prefix
+        self._blocked: "OrderedDict[str, float]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str) -> float:
+        now = time.time()
+        blocked_until = self._blocked.get(key, 0.0)
+        if blocked_until > now:
+            return self._count(blocked_until - now)
+        self._blocked.pop(key, None)
+
+        _id = f"{self.prefix}:{key}"
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.tolerance + 2 * self.interval)
+        # An idle bucket is full: bring its timestamp up to now first
+        await self.collection.update_one({"_id": _id}, {"$max": {"full_at": now}}, upsert=True)
+        doc = await self.collection.find_one_and_update(
+            {"_id": _id, "full_at": {"$lte": now + self.tolerance}},
+            {"$inc": {"full_at": self.interval}, "$set": {"expires_at": expires_at}},
+            projection={"_id": 1},
+        )
+        if doc is not None:
+            return self._count(0.0)
+        doc = await self.collection.find_one({"_id": _id}, {"full_at": 1})
+        retry = max((doc or {}).get("full_at", now) - now - self.tolerance, self.interval / 10)
+        self._blocked[key] = now + retry
+        while len(self._blocked) > self.max_keys:
+            self._blocked.popitem(last=False)
+        return self._count(retry)
+
+    def snapshot(self) -> dict:
+        # Bucket state lives in Mongo; only remembered rejections are local
+        return {**super().snapshot(), "keys": len(self._blocked)}
+
+
+class DuplicateFilter:
+    """Remembers keys (such as payload hashes) for `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_keys: int = 100_000):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"checked": 0, "duplicates": 0}
+
+    def _seen_local(self, key: str, now: float) -> bool:
+        while self._seen and next(iter(self._seen.values())) <= now:
+            self._seen.popitem(last=False)
+        if key in self._seen:
+            return True
+        self._seen[key] = now + self.ttl
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        return False
+
+    def _count(self, duplicate: bool) -> bool:
+        self.stats["checked"] += 1
+        if duplicate:
+            self.stats["duplicates"] += 1
+        return duplicate
+
+    async def seen(self, key: str) -> bool:
+        """Record `key`; returns True if it was already recorded within the TTL."""
+        return self._count(self._seen_local(key, time.time()))
+
+    async def forget(self, key: str):
+        """Drop `key`, e.g. when the request it was recorded for did not succeed."""
+        self._seen.pop(key, None)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "ttl_seconds": self.ttl, "keys": len(self._seen)}
+
+
+class MongoDuplicateFilter(DuplicateFilter):
+    """Duplicate filter shared through a Mongo TTL collection."""
+
+    def __init__(self, collection, prefix: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collection = collection
+        self.prefix = prefix
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def seen(self, key: str) -> bool:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            await self.collection.insert_one({"_id": f"{self.prefix}:{key}", "expires_at": expires_at})
+            return self._count(False)
+        except DuplicateKeyError:
+            pass
+        # The TTL monitor runs about once a minute, so an expired entry may still be there
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{self.prefix}:{key}", "expires_at": {"$lte": now}},
+            {"$set": {"expires_at": expires_at}},
+            projection={"_id": 1},
+        )
+        return self._count(doc is None)
+
+    async def forget(self, key: str):
+        await self.collection.delete_one({"_id": f"{self.prefix}:{key}"})
@@ -0,0 +1,205 @@
+import json
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+
+# A full snapshot is stored at least every SNAPSHOT_EVERY versions, so
+# reconstructing any version replays a bounded number of deltas.
+SNAPSHOT_EVERY = 20
+CACHE_SIZE = 256
+
+Path = List[Any]
+
+
+def diff(old: Any, new: Any, path: Optional[Path] = None) -> list:
+    """Structural diff between two JSON-like values.
+
+    Returns a list of ["set", path, value], ["unset", path] and
+    ["truncate", path, length] operations that turn old into new.
+    """
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append(["set", path + [key], value])
+            elif old[key] != value:
+                ops.extend(diff(old[key], value, path + [key]))
+        for key in old:
+            if key not in new:
+                ops.append(["unset", path + [key]])
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and path:
+        ops = []
+        for index, value in enumerate(new):
+            if index >= len(old):
+                ops.append(["set", path + [index], value])
+            elif old[index] != value:
+                ops.extend(diff(old[index], value, path + [index]))
+        if len(new) < len(old):
+            ops.append(["truncate", path, len(new)])
+        return ops
+    if old == new:
+        return []
+    return [["set", path, new]]
+
+
+def _container(doc: Any, path: Path):
+    for key in path:
+        doc = doc[key]
+    return doc
+
+
+def apply(doc: Any, ops: list) -> Any:
+    """Apply operations produced by diff(); the input is modified in place."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if kind == "truncate":
+            del _container(doc, path)[op[2]:]
+            continue
+        if not path:
+            doc = op[2]
+            continue
+        parent, key = _container(doc, path[:-1]), path[-1]
+        if kind == "unset":
+            parent.pop(key, None)
+        elif isinstance(parent, list) and key == len(parent):
+            parent.append(op[2])
+        else:
+            parent[key] = op[2]
+    return doc
+
+
+def encode(value: Any) -> bytes:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    return zlib.compress(raw.encode("utf-8"), 9)
+
+
+def decode(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def raw_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+class RevisionStore:
+    """Delta-encoded document history.
+
+    Each save stores a zlib-compressed structural diff against the previous
+    version. A full snapshot is written when the chain since the last one
+    gets long or when the delta would not be much smaller than a snapshot.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._latest: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("collection", ASCENDING), ("doc_id", ASCENDING), ("version", DESCENDING)],
+            unique=True,
+        )
+
+    def _remember(self, collection: str, doc_id: str, version: int, doc: dict):
+        key = (collection, doc_id)
+        self._latest[key] = (version, json.loads(json.dumps(doc, default=str)))
+        self._latest.move_to_end(key)
+        while len(self._latest) > CACHE_SIZE:
+            self._latest.popitem(last=False)
+
+    async def latest(self, collection: str, doc_id: str) -> Optional[dict]:
+        return await self.collection.find_one(
+            {"collection": collection, "doc_id": doc_id},
+            {"_id": 0, "data": 0},
+            sort=[("version", DESCENDING)],
+        )
+
+    async def list(self, collection: str, doc_id: str) -> List[dict]:
+        cursor = self.collection.find(
+            {"collection": collection, "doc_id": doc_id},
+            {"_id": 0, "data": 0},
+        ).sort("version", DESCENDING)
+        return await cursor.to_list(None)
+
+    async def get(self, collection: str, doc_id: str, version: int) -> Optional[dict]:
+        cached = self._latest.get((collection, doc_id))
+        if cached and cached[0] == version:
+            return json.loads(json.dumps(cached[1]))
+        target = await self.collection.find_one(
+            {"collection": collection, "doc_id": doc_id, "version": version},
+            {"_id": 0, "base": 1},
+        )
+        if target is None:
+            return None
+        cursor = self.collection.find(
+            {"collection": collection, "doc_id": doc_id, "version": {"$gte": target["base"], "$lte": version}},
+            {"_id": 0, "kind": 1, "data": 1},
+        ).sort("version", ASCENDING)
+        doc = None
+        async for revision in cursor:
+            payload = decode(revision["data"])
+            doc = payload if revision["kind"] == "snapshot" else apply(doc, payload)
+        return doc
+
+    async def _insert(self, collection: str, doc_id: str, version: int, base: int, kind: str,
+                      data: bytes, size: int, changed: List[str], author: Optional[str]):
+        await self.collection.insert_one({
+            "collection": collection,
+            "doc_id": doc_id,
+            "version": version,
+            "base": base,
+            "kind": kind,
+            "data": data,
+            "size": len(data),
+            "raw_size": size,
+            "changed": changed,
+            "author": author,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    async def record(self, collection: str, doc_id: str, after: dict, before: Optional[dict] = None,
+                     author: Optional[str] = None) -> Optional[int]:
+        """Record a new version; returns its number, or None for a no-op save."""
+        for _ in range(3):
+            try:
+                return await self._record(collection, doc_id, after, before, author)
+            except DuplicateKeyError:
+                # Another worker saved the same document concurrently.
+                self._latest.pop((collection, doc_id), None)
+        return None
+
+    async def _record(self, collection, doc_id, after, before, author):
+        latest = await self.latest(collection, doc_id)
+        if latest is None:
+            # Keep the pre-edit state as the first version when it is known.
+            first = before if before is not None else after
+            await self._insert(collection, doc_id, 1, 1, "snapshot", encode(first), raw_size(first),
+                               list(first), author)
+            self._remember(collection, doc_id, 1, first)
+            if before is None:
+                return 1
+            latest = {"version": 1, "base": 1}
+            previous = first
+        else:
+            previous = await self.get(collection, doc_id, latest["version"])
+
+        ops = diff(previous, after)
+        if not ops:
+            return None
+        version = latest["version"] + 1
+        delta = encode(ops)
+        snapshot = encode(after)
+        if version - latest["base"] >= SNAPSHOT_EVERY or len(delta) * 2 > len(snapshot):
+            kind, data, base = "snapshot", snapshot, version
+        else:
+            kind, data, base = "delta", delta, latest["base"]
+        changed = sorted({str(op[1][0]) for op in ops if op[1]})
+        await self._insert(collection, doc_id, version, base, kind, data, raw_size(after), changed, author)
+        self._remember(collection, doc_id, version, after)
+        return version
@@ -0,0 +1,158 @@
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+
+CONTACT_FORM = "contact"
+# Option-like contact form fields worth counting per value
+CONTACT_FIELDS = ("service",)
+TOTAL = "__total__"
+
+
+def rollup_id(form: str, day: str, field: str, value: str) -> str:
+    return f"{form}|{day}|{field}|{value}"
+
+
+def rollup_doc(form: str, day: str, field: str, value: str, count: int) -> dict:
+    return {"_id": rollup_id(form, day, field, value), "form": form, "day": day,
+            "field": field, "value": value, "count": count}
+
+
+class SubmissionRollups:
+    """Submission counts per form, day and option value.
+
+    One document per (form, day, field, value) plus a per-day total, so
+    reading a date range costs the same whatever the number of
+    submissions. Counts are incremented as batches are written and can be
+    rebuilt from the raw collections at any time.
+    """
+
+    def __init__(self, db, collection: str = "submission_rollups"):
+        self.db = db
+        self.rollups = db[collection]
+        self.staging = db[f"{collection}_staging"]
+
+    async def ensure_indexes(self, rollups=None):
+        rollups = rollups if rollups is not None else self.rollups
+        await rollups.create_index([("form", 1), ("day", 1)])
+        await rollups.create_index([("day", 1), ("field", 1)])
+
+    async def option_fields(self, form_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Select field ids per dynamic form."""
+        fields = {}
+        async for form in self.db.forms.find({"id": {"$in": list(form_ids)}}, {"_id": 0, "id": 1, "fields": 1}):
+            fields[form["id"]] = [f["id"] for f in form.get("fields") or [] if f.get("type") == "select"]
+        return fields
+
+    async def record(self, collection: str, docs: List[dict]):
+        """Count a batch of freshly inserted submissions."""
+        counts: Counter = Counter()
+        if collection == "contact_forms":
+            for doc in docs:
+                day = doc.get("created_at", "")[:10]
+                counts[(CONTACT_FORM, day, TOTAL, "")] += 1
+                for field in CONTACT_FIELDS:
+                    if isinstance(doc.get(field), str) and doc[field]:
+                        counts[(CONTACT_FORM, day, field, doc[field])] += 1
+        elif collection == "form_submissions":
+            fields = await self.option_fields({doc["form_id"] for doc in docs})
+            for doc in docs:
+                day = doc.get("created_at", "")[:10]
+                counts[(doc["form_id"], day, TOTAL, "")] += 1
+                payload = doc.get("payload") or {}
+                for field in fields.get(doc["form_id"], []):
+                    if isinstance(payload.get(field), str):
+                        counts[(doc["form_id"], day, field, payload[field])] += 1
+        if not counts:
+            return
+        await self.rollups.bulk_write([
+            UpdateOne(
+                {"_id": rollup_id(*key)},
+                {"$inc": {"count": count},
+                 "$setOnInsert": {"form": key[0], "day": key[1], "field": key[2], "value": key[3]}},
+                upsert=True,
+            )
+            for key, count in counts.items()
+        ], ordered=False)
+
+    async def rebuild(self) -> Dict:
+        """Recompute every rollup with aggregations over the raw submissions.
+
+        The result is built in a staging collection and renamed over the
+        live one, so readers see either the old or the new counts. Batches
+        recorded while it runs would be lost with the old collection, so
+        pause the writer meanwhile.
+        """
+        docs = []
+        day = {"$substr": ["$created_at", 0, 10]}
+
+        async for row in self.db.contact_forms.aggregate([
+            {"$project": {"day": day, "values": {"$objectToArray": {
+                TOTAL: "", **{field: f"${field}" for field in CONTACT_FIELDS},
+            }}}},
+            {"$unwind": "$values"},
+            {"$match": {"values.v": {"$type": "string"}}},
+            {"$match": {"$or": [{"values.k": TOTAL}, {"values.v": {"$ne": ""}}]}},
+            {"$group": {"_id": {"day": "$day", "field": "$values.k", "value": "$values.v"}, "count": {"$sum": 1}}},
+        ], allowDiskUse=True):
+            key = row["_id"]
+            docs.append(rollup_doc(CONTACT_FORM, key["day"], key["field"], key["value"], row["count"]))
+
+        form_ids = await self.db.form_submissions.distinct("form_id")
+        fields = await self.option_fields(form_ids)
+        # Only totals and option fields are grouped; free text would make a
+        # group per submission
+        counted = [{"values.k": TOTAL}] + [
+            {"form_id": form_id, "values.k": {"$in": names}} for form_id, names in fields.items() if names
+        ]
+        async for row in self.db.form_submissions.aggregate([
+            {"$project": {"form_id": 1, "day": day, "values": {"$concatArrays": [
+                [{"k": TOTAL, "v": ""}], {"$objectToArray": {"$ifNull": ["$payload", {}]}},
+            ]}}},
+            {"$unwind": "$values"},
+            {"$match": {"values.v": {"$type": "string"}, "$or": counted}},
+            {"$group": {
+                "_id": {"form": "$form_id", "day": "$day", "field": "$values.k", "value": "$values.v"},
+                "count": {"$sum": 1},
+            }},
+        ], allowDiskUse=True):
+            key = row["_id"]
+            docs.append(rollup_doc(key["form"], key["day"], key["field"], key["value"], row["count"]))
+
+        if not docs:
+            await self.rollups.delete_many({})
+            return {"rollups": 0}
+        await self.staging.drop()
+        for start in range(0, len(docs), 1000):
+            await self.staging.insert_many(docs[start:start + 1000])
+        await self.ensure_indexes(self.staging)
+        await self.staging.rename(self.rollups.name, dropTarget=True)
+        return {"rollups": len(docs)}
+
+    async def summary(self, form: Optional[str], date_from: date, date_to: date) -> Dict:
+        """Per-day totals and per-value counts for one form, or totals per form."""
+        query = {"day": {"$gte": date_from.isoformat(), "$lte": date_to.isoformat()}}
+        if form is None:
+            totals: Counter = Counter()
+            async for doc in self.rollups.find({**query, "field": TOTAL}, {"_id": 0, "form": 1, "count": 1}):
+                totals[doc["form"]] += doc["count"]
+            return {"from": date_from.isoformat(), "to": date_to.isoformat(),
+                    "forms": [{"form": key, "count": count} for key, count in totals.most_common()]}
+
+        days = {(date_from + timedelta(days=i)).isoformat(): 0 for i in range((date_to - date_from).days + 1)}
+        fields: Dict[str, Counter] = {}
+        async for doc in self.rollups.find({**query, "form": form}, {"_id": 0}):
+            if doc["field"] == TOTAL:
+                days[doc["day"]] = days.get(doc["day"], 0) + doc["count"]
+            else:
+                fields.setdefault(doc["field"], Counter())[doc["value"]] += doc["count"]
+        return {
+            "form": form,
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "total": sum(days.values()),
+            "days": [{"day": day, "count": count} for day, count in sorted(days.items())],
+            "fields": {field: dict(counter.most_common()) for field, counter in fields.items()},
+        }
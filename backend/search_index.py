@@ -0,0 +1,279 @@
+import html
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+TOKEN_RE = re.compile(r"[0-9a-zа-яё]+", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]+>")
+SPACE_RE = re.compile(r"\s+")
+CYRILLIC_RE = re.compile(r"[а-яё]")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+SNIPPET_CHARS = 180
+
+RU_STOPWORDS = {
+    "и", "в", "во", "не", "что", "он", "на", "я", "с", "со", "как", "а", "то", "все", "она",
+    "так", "его", "но", "да", "ты", "к", "у", "же", "вы", "за", "бы", "по", "только", "ее",
+    "мне", "было", "вот", "от", "меня", "о", "из", "ему", "для", "при", "это", "мы", "их",
+    "или", "ли", "до", "без", "под", "над", "об", "про",
+}
+EN_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "to", "was", "were", "will", "with", "we", "our",
+    "this", "these", "those", "you", "your",
+}
+
+# Endings are checked longest first; the stem must keep at least MIN_STEM characters.
+RU_ENDINGS = sorted([
+    "иями", "ями", "ами", "ией", "иях", "ях", "ах", "ев", "ов", "ие", "ье", "еи", "ии", "ей",
+    "ой", "ий", "ый", "ая", "яя", "ое", "ее", "ые", "ие", "ых", "их", "ым", "им", "ом", "ем",
+    "ую", "юю", "ого", "его", "ому", "ему", "ыми", "ими", "ать", "ять", "ить", "еть", "ует",
+    "ют", "ут", "ет", "ит", "ла", "ло", "ли", "ость", "ости", "ия", "ья", "а", "я", "о", "е",
+    "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+EN_ENDINGS = sorted([
+    "ational", "ization", "fulness", "ousness", "iveness", "ations", "ation", "ments", "ment",
+    "ness", "ings", "ing", "edly", "ers", "ies", "ied", "ed", "er", "es", "ly", "s",
+], key=len, reverse=True)
+MIN_STEM = 3
+
+# Field weights: matches in titles count more than matches in body text.
+FIELD_WEIGHTS = {"title": 3.0, "summary": 2.0, "body": 1.0}
+
+# (title fields, summary fields, body fields) per collection, Russian source names.
+COLLECTION_FIELDS = {
+    "articles": (["title"], ["excerpt"], ["content"]),
+    "cases": (["title"], ["description"], ["challenge", "solution", "results", "client", "category"]),
+    "projects": (["title"], ["description"], ["industry", "stage", "country"]),
+    "partners": (["name"], ["description"], ["categories", "country"]),
+    "pages": (["title"], [], ["content"]),
+    "pages_dynamic": (["title"], [], ["blocks"]),
+}
+
+# Block keys that never hold human readable text.
+BLOCK_SKIP_KEYS = {"type", "id", "href", "url", "image", "image_url", "src", "video_url", "cta_href",
+                   "button_href", "collection", "layout", "icon", "form", "form_slug", "style"}
+
+LANGS = ("ru", "en")
+
+DocKey = Tuple[str, str, str]  # (collection, id, lang)
+
+
+def strip_html(value: str) -> str:
+    text = TAG_RE.sub(" ", value)
+    text = html.unescape(text)
+    return SPACE_RE.sub(" ", text).strip()
+
+
+def stem(token: str) -> str:
+    token = token.lower().replace("ё", "е")
+    endings = RU_ENDINGS if CYRILLIC_RE.search(token) else EN_ENDINGS
+    for ending in endings:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM:
+            return token[: -len(ending)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    for match in TOKEN_RE.finditer(text):
+        token = match.group(0).lower()
+        if token in RU_STOPWORDS or token in EN_STOPWORDS:
+            continue
+        terms.append(stem(token))
+    return terms
+
+
+def _localized(doc: dict, field: str, lang: str):
+    if lang == "en":
+        value = doc.get(f"{field}_en")
+        if value:
+            return value
+    return doc.get(field)
+
+
+def _flatten_text(value, lang: str) -> List[str]:
+    """Collect human readable strings from nested block structures."""
+    parts: List[str] = []
+    if isinstance(value, str):
+        parts.append(strip_html(value))
+    elif isinstance(value, list):
+        for item in value:
+            parts.extend(_flatten_text(item, lang))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            base = key[:-3] if key.endswith("_en") else key
+            if base in BLOCK_SKIP_KEYS:
+                continue
+            if key.endswith("_en"):
+                if lang != "en":
+                    continue
+            elif lang == "en" and value.get(f"{key}_en"):
+                continue
+            parts.extend(_flatten_text(item, lang))
+    return [p for p in parts if p]
+
+
+def extract_fields(collection: str, doc: dict, lang: str) -> Dict[str, str]:
+    title_fields, summary_fields, body_fields = COLLECTION_FIELDS[collection]
+    result = {}
+    for name, fields in (("title", title_fields), ("summary", summary_fields), ("body", body_fields)):
+        parts = []
+        for field in fields:
+            if field == "blocks":
+                parts.extend(_flatten_text(doc.get("blocks") or [], lang))
+                continue
+            value = _localized(doc, field, lang)
+            if isinstance(value, list):
+                parts.extend(strip_html(str(v)) for v in value if v)
+            elif value:
+                parts.append(strip_html(str(value)))
+        result[name] = " ".join(parts)
+    return result
+
+
+class SearchIndex:
+    """In-process inverted index with BM25 ranking over site content.
+
+    Every document is indexed twice, once per language, so a query in either
+    language is answered from memory without touching Mongo.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[DocKey, float]] = defaultdict(dict)
+        self.doc_terms: Dict[DocKey, List[str]] = {}
+        self.doc_lengths: Dict[DocKey, float] = {}
+        self.docs: Dict[DocKey, dict] = {}
+        self.total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def clear(self):
+        self.postings.clear()
+        self.doc_terms.clear()
+        self.doc_lengths.clear()
+        self.docs.clear()
+        self.total_length = 0.0
+
+    def add(self, collection: str, doc: dict):
+        if collection not in COLLECTION_FIELDS or not doc.get("id"):
+            return
+        self.remove(collection, doc["id"])
+        for lang in LANGS:
+            fields = extract_fields(collection, doc, lang)
+            key = (collection, doc["id"], lang)
+            frequencies: Dict[str, float] = defaultdict(float)
+            length = 0.0
+            for name, text in fields.items():
+                weight = FIELD_WEIGHTS[name]
+                for term in tokenize(text):
+                    frequencies[term] += weight
+                    length += weight
+            if not frequencies:
+                continue
+            for term, tf in frequencies.items():
+                self.postings[term][key] = tf
+            self.doc_terms[key] = list(frequencies)
+            self.doc_lengths[key] = length
+            self.total_length += length
+            self.docs[key] = {
+                "type": collection,
+                "id": doc["id"],
+                "slug": doc.get("slug"),
+                "title": fields["title"],
+                "text": " ".join(t for t in (fields["summary"], fields["body"]) if t),
+            }
+
+    def remove(self, collection: str, doc_id: str):
+        for lang in LANGS:
+            key = (collection, doc_id, lang)
+            terms = self.doc_terms.pop(key, None)
+            if terms is None:
+                continue
+            for term in terms:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(key, None)
+                    if not posting:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(key, 0.0)
+            self.docs.pop(key, None)
+
+    def rebuild(self, documents: Iterable[Tuple[str, dict]]):
+        self.clear()
+        for collection, doc in documents:
+            self.add(collection, doc)
+
+    def search(self, query: str, lang: Optional[str] = None, types: Optional[Iterable[str]] = None,
+               limit: int = 20) -> List[dict]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.docs:
+            return []
+        langs = (lang,) if lang in LANGS else LANGS
+        allowed = set(types) if types else None
+        doc_count = len(self.docs)
+        avg_length = self.total_length / doc_count if doc_count else 0.0
+        scores: Dict[DocKey, float] = defaultdict(float)
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                if key[2] not in langs or (allowed and key[0] not in allowed):
+                    continue
+                norm = K1 * (1 - B + B * self.doc_lengths[key] / avg_length) if avg_length else K1
+                scores[key] += idf * tf * (K1 + 1) / (tf + norm)
+
+        # Keep the best scoring language per document.
+        best: Dict[Tuple[str, str], Tuple[float, DocKey]] = {}
+        for key, score in scores.items():
+            doc_ref = key[:2]
+            if doc_ref not in best or score > best[doc_ref][0]:
+                best[doc_ref] = (score, key)
+        ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)[:limit]
+
+        results = []
+        for score, key in ranked:
+            meta = self.docs[key]
+            results.append({
+                "type": meta["type"],
+                "id": meta["id"],
+                "slug": meta["slug"],
+                "lang": key[2],
+                "title": meta["title"],
+                "snippet": make_snippet(meta["text"] or meta["title"], terms),
+                "score": round(score, 4),
+            })
+        return results
+
+
+def make_snippet(text: str, terms: List[str], width: int = SNIPPET_CHARS) -> str:
+    """Return a window of text around the first token matching a query term."""
+    wanted = set(terms)
+    start = 0
+    for match in TOKEN_RE.finditer(text):
+        if stem(match.group(0)) in wanted:
+            start = max(0, match.start() - width // 3)
+            break
+    if start:
+        space = text.find(" ", start)
+        if 0 <= space < match.start():
+            start = space + 1
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        if space > start:
+            end = space
+    snippet = text[start:end].strip()
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet += "…"
+    return snippet
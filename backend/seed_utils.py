@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List
+
+from pymongo import UpdateOne
+
+
+async def seed_collection(db, name: str, docs: List[dict], key: str = "id",
+                          insert_only: Iterable[str] = (), volatile: Iterable[str] = ("updated_at",),
+                          missing_only: bool = True) -> Dict:
+    """Upsert seed documents keyed by `key` with one unordered bulk_write.
+
+    By default existing documents are left untouched, so reseeding never
+    reverts an admin's edits. With `missing_only=False` they are reset to the
+    seed: they only receive the fields whose value differs from it, fields in
+    `insert_only` are written when a document is created, and `volatile`
+    fields (timestamps) are only written together with a real change.
+    """
+    started = time.perf_counter()
+    insert_only = set(insert_only)
+    volatile = set(volatile)
+    keys = [doc[key] for doc in docs]
+    existing = {}
+    async for doc in db[name].find({key: {"$in": keys}}, {"_id": 0}):
+        existing[doc[key]] = doc
+
+    requests = []
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for doc in docs:
+        current = existing.get(doc[key])
+        if current is None:
+            requests.append(UpdateOne({key: doc[key]}, {"$setOnInsert": doc}, upsert=True))
+            stats["inserted"] += 1
+            continue
+        changes = {
+            field: value for field, value in doc.items()
+            if field not in insert_only and field not in volatile and current.get(field) != value
+        }
+        if missing_only or not changes:
+            stats["unchanged"] += 1
+            continue
+        changes.update({field: doc[field] for field in volatile if field in doc})
+        requests.append(UpdateOne({key: doc[key]}, {"$set": changes}))
+        stats["updated"] += 1
+
+    if requests:
+        await db[name].bulk_write(requests, ordered=False)
+    return {"collection": name, **stats, "seconds": round(time.perf_counter() - started, 3)}
+
+
+async def seed_all(db, seeds: Dict[str, dict], missing_only: bool = True) -> List[Dict]:
+    """Seed several collections concurrently.
+
+    `seeds` maps a collection name to seed_collection keyword arguments,
+    at least {"docs": [...]}.
+    """
+    return await asyncio.gather(*(
+        seed_collection(db, name, missing_only=missing_only, **options)
+        for name, options in seeds.items()
+    ))
+
+
+def print_report(results: List[Dict]):
+    for result in results:
+        print(
+            f"- {result['collection']}: {result['inserted']} inserted, {result['updated']} updated, "
+            f"{result['unchanged']} unchanged ({result['seconds']}s)"
+        )
@@ -1,21 +1,61 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, Response
+from starlette.background import BackgroundTask
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, TypeAdapter
+from typing import List, Optional, Dict, Literal
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from deep_translator import GoogleTranslator
 import jwt
 import bcrypt
 import shutil
 import re
+import tempfile
+import hashlib
+import hmac
+import json
+import mimetypes
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from search_index import SearchIndex, COLLECTION_FIELDS as SEARCH_COLLECTIONS
+from mongo_monitor import command_monitor, pool_monitor, SlowCommandLogger
+from revisions import RevisionStore, diff as revision_diff
+from snapshot import SNAPSHOT_COLLECTIONS, export_snapshot, import_snapshot
+from rate_limit import (
+    SlidingWindowLimiter, MongoSlidingWindowLimiter, TokenBucketLimiter, MongoTokenBucketLimiter,
+    DuplicateFilter, MongoDuplicateFilter,
+)
+from media_utils import UploadTooLarge, sniff_content_type, stream_upload, blob_extension, write_chunk, hash_file
+from image_derivatives import (
+    DerivativeRenderer, RESIZABLE_TYPES, EAGER_FORMATS, WIDTHS as DERIVATIVE_WIDTHS,
+    FORMATS as DERIVATIVE_FORMATS, CONTENT_TYPES as DERIVATIVE_CONTENT_TYPES,
+    enabled as derivatives_enabled, snap_width,
+)
+from media_gc import MediaGarbageCollector, QUARANTINE_PREFIX
+from media_storage import storage_from_env
+from compression import Compressor, CompressionMiddleware, ResponseCache
+from structured_logging import RequestContextMiddleware, configure_logging
+from profiling import ProfileStore, ProfilingMiddleware, stats_text
+from prometheus import CallStats, Exposition, MetricsMiddleware, RequestMetrics, CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE
+from write_buffer import WriteBehindBuffer, BufferFull
+from form_validation import FormValidatorCache
+from rollups import SubmissionRollups
+from file_serving import (
+    COMPRESSED_PREFIX, ENCODINGS as COMPRESSED_ENCODINGS, accepted_encodings, compress_file, is_compressible,
+)
 
 
 ROOT_DIR = Path(__file__).parent
@@ -23,15 +63,61 @@ load_dotenv(ROOT_DIR / '.env')
 UPLOADS_DIR = ROOT_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 FONTS_DIR = ROOT_DIR.parent / "frontend" / "public" / "fonts"
+MEDIA_MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(250 * 1024 * 1024)))
+# Resumable uploads: parts are staged here until the session is completed or expires
+UPLOAD_SESSIONS_DIR = UPLOADS_DIR / ".sessions"
+UPLOAD_SESSIONS_DIR.mkdir(exist_ok=True)
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("MEDIA_UPLOAD_CHUNK_MAX_BYTES", str(32 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = timedelta(hours=int(os.getenv("MEDIA_UPLOAD_SESSION_TTL_HOURS", "24")))
+# Parts of sessions the TTL index dropped are removed this often, whether or not media GC runs
+UPLOAD_SESSION_SWEEP_SECONDS = int(os.getenv("MEDIA_UPLOAD_SESSION_SWEEP_SECONDS", "3600"))
+# Where uploaded media lives (MEDIA_STORAGE=local|s3); UPLOADS_DIR also stages incoming uploads
+media_storage = storage_from_env(UPLOADS_DIR)
+derivative_renderer = DerivativeRenderer(media_storage, UPLOADS_DIR / ".derivatives")
+# Compressible uploads up to this size get precompressed .br/.gz siblings
+MEDIA_PRECOMPRESS_MAX_BYTES = int(os.getenv("MEDIA_PRECOMPRESS_MAX_BYTES", str(50 * 1024 * 1024)))
+# Stored name -> {encoding: sibling name}; stored names are immutable, so entries never go stale
+compressed_variants: Dict[str, Dict[str, str]] = {}
+COMPRESSED_VARIANTS_MAX = 10_000
+# Stored name -> when to look again for siblings that did not exist yet; they
+# may still be written in the background, possibly by another worker
+missing_compressed_variants: Dict[str, float] = {}
+COMPRESSED_VARIANTS_MISS_TTL = 30.0
 
 # MongoDB connection
+# Client option -> (environment variable, type); unset variables keep driver defaults
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", int),
+    "readPreference": ("MONGO_READ_PREFERENCE", str),
+}
+mongo_options = {
+    option: cast(os.environ[env])
+    for option, (env, cast) in MONGO_CLIENT_OPTIONS.items()
+    if os.environ.get(env)
+}
+# Requests, Mongo commands and translations slower than these many
+# milliseconds are logged as one structured record each; 0 disables
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_TRANSLATION_MS = float(os.getenv("SLOW_TRANSLATION_MS", "2000"))
+slow_log = logging.getLogger("slow")
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[command_monitor, pool_monitor, SlowCommandLogger(SLOW_QUERY_MS / 1000, slow_log)],
+    **mongo_options,
+)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
 app = FastAPI()
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -41,11 +127,142 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# Password hashing: bcrypt cost factor and a small dedicated pool so hashing
+# never runs on the event loop and a login burst can't take every thread
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+password_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")), thread_name_prefix="bcrypt"
+)
+
 SETTINGS_ID = "main"
+MAX_BATCH_OPERATIONS = int(os.getenv("MAX_BATCH_OPERATIONS", "1000"))
 
 # Security
 security = HTTPBearer()
 
+# Number of reverse proxies in front of the app that append to X-Forwarded-For.
+# With 0 the header is ignored, since anyone can send it; set it to the number
+# of trusted proxies when deployed behind them.
+PROXY_HOPS = int(os.getenv("PROXY_HOPS", "0"))
+
+# Login throttling: failures per client IP and per username within a sliding
+# window, with exponential backoff. Anyone can fail logins for a username, so
+# its lockouts are capped lower, delaying an attacker without shutting the
+# real user out for long. "mongo" shares state across workers.
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_BACKOFF_SECONDS = float(os.getenv("LOGIN_BACKOFF_SECONDS", "30"))
+LOGIN_MAX_BACKOFF_SECONDS = float(os.getenv("LOGIN_MAX_BACKOFF_SECONDS", "3600"))
+LOGIN_USER_MAX_BACKOFF_SECONDS = float(os.getenv("LOGIN_USER_MAX_BACKOFF_SECONDS", "300"))
+
+def make_login_limiter(prefix: str, max_failures: int,
+                       max_backoff: float = LOGIN_MAX_BACKOFF_SECONDS) -> SlidingWindowLimiter:
+    args = (max_failures, LOGIN_WINDOW_SECONDS, LOGIN_BACKOFF_SECONDS, max_backoff)
+    if LOGIN_THROTTLE_BACKEND == "mongo":
+        return MongoSlidingWindowLimiter(db.login_throttle, prefix, *args)
+    return SlidingWindowLimiter(*args)
+
+login_user_limiter = make_login_limiter(
+    "user", int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "10")), LOGIN_USER_MAX_BACKOFF_SECONDS
+)
+login_ip_limiter = make_login_limiter("ip", int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20")))
+
+# Public submission throttling: token buckets per client IP, across all forms
+# and per form, and identical payloads dropped for
+# SUBMIT_DUPLICATE_WINDOW_SECONDS. Buckets are per client so one client
+# cannot use up a form's budget for everyone.
+# "mongo" shares state across workers.
+SUBMIT_THROTTLE_BACKEND = os.getenv("SUBMIT_THROTTLE_BACKEND", "memory")
+SUBMIT_DUPLICATE_WINDOW_SECONDS = float(os.getenv("SUBMIT_DUPLICATE_WINDOW_SECONDS", "600"))
+
+def make_submit_limiter(prefix: str, per_minute: float, burst: int) -> TokenBucketLimiter:
+    if SUBMIT_THROTTLE_BACKEND == "mongo":
+        return MongoTokenBucketLimiter(db.submission_throttle, prefix, per_minute / 60, burst)
+    return TokenBucketLimiter(per_minute / 60, burst)
+
+submit_ip_limiter = make_submit_limiter(
+    "ip", float(os.getenv("SUBMIT_RATE_PER_IP_PER_MINUTE", "6")), int(os.getenv("SUBMIT_BURST_PER_IP", "5"))
+)
+submit_form_limiter = make_submit_limiter(
+    "form", float(os.getenv("SUBMIT_RATE_PER_FORM_PER_MINUTE", "2")), int(os.getenv("SUBMIT_BURST_PER_FORM", "3"))
+)
+if SUBMIT_THROTTLE_BACKEND == "mongo":
+    submit_duplicates = MongoDuplicateFilter(db.submission_throttle, "dup", SUBMIT_DUPLICATE_WINDOW_SECONDS)
+else:
+    submit_duplicates = DuplicateFilter(SUBMIT_DUPLICATE_WINDOW_SECONDS)
+
+# Full-text search over public content, kept in memory
+search_index = SearchIndex()
+SEARCH_FIELDS = {
+    collection: {"slug", *(field for group in groups for field in group)}
+    for collection, groups in SEARCH_COLLECTIONS.items()
+}
+
+# Collections whose saves are kept as delta-encoded revisions
+REVISIONED_COLLECTIONS = {"pages", "pages_dynamic", "articles"}
+revision_store = RevisionStore(db.revisions)
+
+# Facetable fields per collection; array fields are unwound before counting
+FACET_FIELDS = {
+    "projects": {"stage": False, "industry": False, "country": False},
+    "partners": {"categories": True, "country": False},
+}
+# Facet counts keyed by collection, then by the active filters. Only filters
+# whose values occur in the data are cached, and each collection keeps its
+# most recently used entries, so arbitrary query strings cannot grow it.
+FACET_CACHE_MAX_ENTRIES = int(os.getenv("FACET_CACHE_MAX_ENTRIES", "256"))
+facet_cache: Dict[str, "OrderedDict[tuple, dict]"] = {}
+
+# Submission counts per form, day and option value, kept current as batches are written
+submission_rollups = SubmissionRollups(db)
+ANALYTICS_MAX_DAYS = 366
+
+# Public form submissions are acknowledged once queued and inserted in batches
+submission_buffer = WriteBehindBuffer(
+    db,
+    max_queue=int(os.getenv("FORM_INGEST_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("FORM_INGEST_BATCH_SIZE", "500")),
+    flush_interval=int(os.getenv("FORM_INGEST_FLUSH_MS", "200")) / 1000,
+    durable=os.getenv("FORM_INGEST_DURABLE", "false").lower() == "true",
+    on_flush=submission_rollups.record,
+)
+
+# Compiled submission validators per form definition
+form_validators = FormValidatorCache(db.forms, ttl=float(os.getenv("FORM_VALIDATOR_TTL_SECONDS", "60")))
+
+# Request and translation metrics, exported on /metrics for Prometheus.
+# Scrapers authenticate with METRICS_TOKEN as a bearer token; admins with their JWT.
+request_metrics = RequestMetrics()
+translation_stats = CallStats()
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Opt-in profiling: admins send X-Profile: cprofile|sample (or ?__profile=);
+# PROFILE_SAMPLE_RATE additionally samples that share of all requests
+profile_store = ProfileStore(int(os.getenv("PROFILE_BUFFER_SIZE", "50")))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+# Response compression and the public GET response cache
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+compressor = Compressor(
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")),
+)
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    # Other nodes do not see this node's invalidations, so entries also expire
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60")),
+)
+
+# Orphaned media sweeper; MEDIA_GC_INTERVAL_SECONDS=0 leaves it to the admin endpoints
+MEDIA_GC_INTERVAL_SECONDS = int(os.getenv("MEDIA_GC_INTERVAL_SECONDS", "0"))
+MEDIA_GC_GRACE_SECONDS = int(os.getenv("MEDIA_GC_GRACE_HOURS", "72")) * 3600
+MEDIA_GC_INCLUDE_UNREFERENCED = os.getenv("MEDIA_GC_INCLUDE_UNREFERENCED", "false").lower() == "true"
+media_gc = MediaGarbageCollector(
+    db, media_storage, UPLOADS_DIR, [c for c in SNAPSHOT_COLLECTIONS if c not in ("media", "media_blobs")],
+    MEDIA_GC_GRACE_SECONDS, on_purge=lambda filename: remove_derived_files(filename),
+)
+
 # Auth Models
 class LoginRequest(BaseModel):
     username: str
@@ -329,9 +546,27 @@ class MediaItem(BaseModel):
     original_name: Optional[str] = None
     content_type: Optional[str] = None
     size: Optional[int] = None
+    sha256: Optional[str] = None
+    derivatives: List[Dict] = Field(default_factory=list)
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    sha256: Optional[str] = None  # checked against the assembled file when given
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None
+    data: Optional[Dict] = None
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(default_factory=list)
+
+
 MenuItem.model_rebuild()
 
 
@@ -365,15 +600,50 @@ async def list_fonts():
     fonts.sort(key=lambda f: (f["family"].lower(), f["weight"]))
     return fonts
 
+@api_router.get("/search")
+async def search(q: str, lang: Optional[str] = None, type: Optional[str] = None, limit: int = 20):
+    types = [t for t in type.split(",") if t] if type else None
+    limit = max(1, min(limit, 50))
+    return {"query": q, "results": search_index.search(q, lang=lang, types=types, limit=limit)}
+
 # Auth functions
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def _hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
-def verify_password(password: str, password_hash: str) -> bool:
-    """Verify password against hash"""
+def _verify_password(password: str, password_hash: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
 
+async def hash_password(password: str) -> str:
+    """Hash password using bcrypt on the password executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, _hash_password, password)
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Verify password against hash on the password executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, _verify_password, password, password_hash)
+
+def password_hash_outdated(password_hash: str) -> bool:
+    """True when a stored hash uses a different bcrypt cost than BCRYPT_ROUNDS"""
+    try:
+        return int(password_hash.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+async def upgrade_password_hash(user_id: str, password: str, old_hash: str):
+    new_hash = await hash_password(password)
+    # Only replace the hash we verified, in case the password changed meanwhile
+    await db.users.update_one({"id": user_id, "password_hash": old_hash}, {"$set": {"password_hash": new_hash}})
+
+def client_ip(request: Request) -> str:
+    """Client address, taken from X-Forwarded-For only behind PROXY_HOPS trusted proxies"""
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and PROXY_HOPS > 0:
+        hops = [part.strip() for part in forwarded.split(",") if part.strip()]
+        if hops:
+            return hops[-min(PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
 def create_access_token(data: dict) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -392,13 +662,42 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def is_valid_token(token: str) -> bool:
+    try:
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return True
+    except jwt.InvalidTokenError:
+        return False
+
+def verify_metrics_access(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Accept the METRICS_TOKEN bearer token or an admin JWT"""
+    if METRICS_TOKEN and hmac.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        return {"sub": "metrics"}
+    return verify_token(credentials)
+
 # Auth endpoints
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(login_data: LoginRequest):
+async def login(login_data: LoginRequest, request: Request, background_tasks: BackgroundTasks):
     """Login endpoint"""
+    ip_key = client_ip(request)
+    user_key = login_data.username.strip().lower()
+    # Rejected before any database lookup or bcrypt work
+    retry_after = max(await login_ip_limiter.check(ip_key), await login_user_limiter.check(user_key))
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts. Try again later.",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
     user = await db.users.find_one({"username": login_data.username}, {"_id": 0})
-    if not user or not verify_password(login_data.password, user["password_hash"]):
+    if not user or not await verify_password(login_data.password, user["password_hash"]):
+        await login_ip_limiter.failure(ip_key)
+        await login_user_limiter.failure(user_key)
         raise HTTPException(status_code=401, detail="Invalid username or password")
+    await login_user_limiter.reset(user_key)
+    if password_hash_outdated(user["password_hash"]):
+        background_tasks.add_task(upgrade_password_hash, user["id"], login_data.password, user["password_hash"])
     
     role = user.get("role", "admin")
     access_token = create_access_token({"sub": user["username"], "user_id": user["id"], "role": role})
@@ -416,10 +715,10 @@ async def change_password(data: ChangePasswordRequest, payload: dict = Depends(v
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if not verify_password(data.current_password, user["password_hash"]):
+    if not await verify_password(data.current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
-    new_hash = hash_password(data.new_password)
+    new_hash = await hash_password(data.new_password)
     await db.users.update_one({"id": payload["user_id"]}, {"$set": {"password_hash": new_hash}})
     return {"message": "Password changed successfully"}
 
@@ -446,7 +745,7 @@ async def create_admin_user(data: CreateUserRequest, payload: dict = Depends(ver
     user = {
         "id": str(uuid.uuid4()),
         "username": data.username,
-        "password_hash": hash_password(data.password),
+        "password_hash": await hash_password(data.password),
         "role": data.role,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
@@ -487,7 +786,7 @@ async def reset_user_password(user_id: str, data: AdminChangePasswordRequest, pa
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    new_hash = hash_password(data.new_password)
+    new_hash = await hash_password(data.new_password)
     await db.users.update_one({"id": user_id}, {"$set": {"password_hash": new_hash}})
     return {"message": "Password reset successfully"}
 
@@ -520,6 +819,147 @@ async def update_admin_settings(settings: SiteSettings, payload: dict = Depends(
         raise HTTPException(status_code=404, detail="Settings not found")
     return {"message": "Settings updated"}
 
+# Database metrics (Admin)
+@api_router.get("/admin/metrics/mongo")
+async def get_mongo_metrics(payload: dict = Depends(verify_token)):
+    """Per-collection command latency and connection pool statistics"""
+    return {
+        "options": mongo_options,
+        "commands": command_monitor.snapshot(),
+        "pool": pool_monitor.snapshot(),
+    }
+
+@api_router.get("/admin/metrics/ingest")
+async def get_ingest_metrics(payload: dict = Depends(verify_token)):
+    """Queue depth, batch and rejection counts of the form submission buffer and throttles"""
+    return {
+        **submission_buffer.snapshot(),
+        "validators": form_validators.snapshot(),
+        "throttle": {
+            "backend": SUBMIT_THROTTLE_BACKEND,
+            "per_ip": submit_ip_limiter.snapshot(),
+            "per_form": submit_form_limiter.snapshot(),
+            "duplicates": submit_duplicates.snapshot(),
+        },
+    }
+
+@api_router.get("/admin/metrics/compression")
+async def get_compression_metrics(payload: dict = Depends(verify_token)):
+    """Compression CPU time and bytes saved per encoding, and response cache usage"""
+    return {
+        "min_bytes": COMPRESSION_MIN_BYTES,
+        "gzip_level": compressor.gzip_level,
+        "brotli_quality": compressor.brotli_quality if "br" in compressor.encodings else None,
+        "encodings": compressor.snapshot(),
+        "cache": response_cache.snapshot(),
+    }
+
+def render_prometheus_metrics() -> str:
+    """All request, translation, database, cache and ingest metrics in Prometheus text format"""
+    out = Exposition()
+    out.histogram("http_request_duration_seconds", "Request latency by route template.", (
+        ({"method": method, "route": route}, histogram)
+        for (method, route), histogram in list(request_metrics.latency.items())
+    ))
+    out.counter("http_responses_total", "Responses by route template and status code.", (
+        ({"method": method, "route": route, "status": status}, count)
+        for (method, route, status), count in list(request_metrics.responses.items())
+    ))
+    out.gauge("http_requests_in_flight", "Requests currently being handled.", (
+        ({"method": method, "route": route}, count) for (method, route), count in request_metrics.in_flight().items()
+    ))
+
+    translation = translation_stats.snapshot()
+    out.counter("translation_calls_total", "auto_translate calls that reached the translator.",
+                [({}, translation["calls"])])
+    out.counter("translation_failures_total", "auto_translate calls that failed.", [({}, translation["failures"])])
+    out.counter("translation_characters_total", "Characters sent for translation.",
+                [({}, translation["characters"])])
+    out.histogram("translation_duration_seconds", "auto_translate latency.", [({}, translation_stats.latency)])
+
+    commands = command_monitor.items()
+    out.histogram("mongodb_command_duration_seconds", "Mongo command latency.", (
+        ({"collection": collection, "command": command}, stats.latency) for (collection, command), stats in commands
+    ))
+    out.counter("mongodb_command_errors_total", "Failed Mongo commands.", (
+        ({"collection": collection, "command": command}, stats.errors) for (collection, command), stats in commands
+    ))
+    out.counter("mongodb_command_documents_total", "Documents returned or written by Mongo commands.", (
+        ({"collection": collection, "command": command}, stats.documents) for (collection, command), stats in commands
+    ))
+    pool = pool_monitor.snapshot()
+    out.gauge("mongodb_pool_connections_in_use", "Connections checked out of the pool.", [({}, pool["in_use"])])
+    out.gauge("mongodb_pool_connections_open", "Open pool connections.", [({}, pool["open_connections"])])
+    out.counter("mongodb_pool_clears_total", "Times the pool was cleared.", [({}, pool["pool_clears"])])
+    out.counter("mongodb_pool_checkout_failures_total", "Failed connection check-outs by reason.", (
+        ({"reason": reason}, count) for reason, count in pool["checkout_failures"].items()
+    ))
+    out.histogram("mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pool connection.",
+                  [({}, pool_monitor.wait)])
+
+    cache = response_cache.snapshot()
+    for name in ("hits", "misses", "stores", "evictions", "invalidations"):
+        out.counter(f"response_cache_{name}_total", f"Public response cache {name}.", [({}, cache[name])])
+    out.gauge("response_cache_bytes", "Bytes held by the public response cache.", [({}, cache["bytes"])])
+    out.gauge("response_cache_entries", "Responses held by the public response cache.", [({}, cache["entries"])])
+    validators = form_validators.snapshot()
+    out.counter("form_validator_cache_hits_total", "Form definition cache hits.", [({}, validators["hits"])])
+    out.counter("form_validator_cache_misses_total", "Form definition cache misses.", [({}, validators["misses"])])
+
+    encodings = compressor.snapshot()
+    for name, help_text in (
+        ("responses", "Responses compressed"), ("bytes_in", "Bytes before compression"),
+        ("bytes_out", "Bytes after compression"), ("cpu_seconds", "CPU time spent compressing"),
+    ):
+        out.counter(f"compression_{name}_total", f"{help_text}, by encoding.", (
+            ({"encoding": encoding}, stats[name]) for encoding, stats in encodings.items()
+        ))
+    out.histogram("compression_duration_seconds", "Time spent compressing a response.", (
+        ({"encoding": encoding}, stats["latency"]) for encoding, stats in compressor.stats.items()
+    ))
+
+    ingest = submission_buffer.snapshot()
+    for name in ("accepted", "rejected", "written", "failed", "batches"):
+        out.counter(f"submission_buffer_{name}_total", f"Form submissions {name} by the write-behind buffer.",
+                    [({}, ingest[name])])
+    out.gauge("submission_buffer_depth", "Form submissions waiting to be written.", [({}, ingest["depth"])])
+    out.histogram("submission_buffer_flush_duration_seconds", "Time to write one batch of submissions.",
+                  [({}, submission_buffer.flush_latency)])
+    out.counter("submission_throttle_total", "Public submissions checked against the token buckets.", (
+        ({"scope": scope, "result": result}, count)
+        for scope, limiter in (("ip", submit_ip_limiter), ("form", submit_form_limiter))
+        for result, count in limiter.stats.items()
+    ))
+    out.counter("submission_duplicates_total", "Public submissions dropped as duplicates.",
+                [({}, submit_duplicates.stats["duplicates"])])
+    return out.render()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics(payload: dict = Depends(verify_metrics_access)):
+    """Prometheus scrape endpoint"""
+    return Response(render_prometheus_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+# Profiles (Admin)
+@api_router.get("/admin/profiles")
+async def list_profiles(payload: dict = Depends(verify_token)):
+    """Most recent request profiles, newest first"""
+    return {"sample_rate": PROFILE_SAMPLE_RATE, "capacity": profile_store.capacity, "profiles": profile_store.list()}
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: Literal["raw", "text"] = "raw", payload: dict = Depends(verify_token)):
+    """A profile as a pstats dump or folded stacks; format=text renders a pstats dump as a table"""
+    record = profile_store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text" and record.mode == "cprofile":
+        return Response(stats_text(record.data), media_type="text/plain; charset=utf-8")
+    media_type = "application/octet-stream" if record.mode == "cprofile" else "text/plain; charset=utf-8"
+    return Response(
+        record.data,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{record.filename}"'},
+    )
+
 # Dynamic Pages (Admin)
 @api_router.get("/admin/pages-dynamic")
 async def get_admin_dynamic_pages(payload: dict = Depends(verify_token)):
@@ -531,6 +971,8 @@ async def create_dynamic_page(page: DynamicPage, payload: dict = Depends(verify_
     doc = page.model_dump()
     doc = add_dynamic_page_translations(doc)
     await db.pages_dynamic.insert_one(doc)
+    await record_revisions("pages_dynamic", [page.id], payload)
+    await content_changed("pages_dynamic", [page.id])
     return {"message": "Page created", "id": page.id}
 
 @api_router.put("/admin/pages-dynamic/{page_id}")
@@ -538,9 +980,13 @@ async def update_dynamic_page(page_id: str, page: DynamicPage, payload: dict = D
     doc = page.model_dump()
     doc["updated_at"] = datetime.now(timezone.utc).isoformat()
     doc = add_dynamic_page_translations(doc)
-    result = await db.pages_dynamic.update_one({"id": page_id}, {"$set": doc})
-    if result.modified_count == 0:
+    before = await db.pages_dynamic.find_one_and_update(
+        {"id": page_id}, {"$set": doc}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
         raise HTTPException(status_code=404, detail="Page not found")
+    await record_revisions("pages_dynamic", [page_id], payload, {page_id: before})
+    await content_changed("pages_dynamic", [page_id])
     return {"message": "Page updated"}
 
 @api_router.delete("/admin/pages-dynamic/{page_id}")
@@ -548,6 +994,7 @@ async def delete_dynamic_page(page_id: str, payload: dict = Depends(verify_token
     result = await db.pages_dynamic.delete_one({"id": page_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Page not found")
+    await content_changed("pages_dynamic", [page_id])
     return {"message": "Page deleted"}
 
 # Forms (Admin)
@@ -561,6 +1008,7 @@ async def create_form(form: FormDefinition, payload: dict = Depends(verify_token
     doc = form.model_dump()
     doc = add_form_translations(doc)
     await db.forms.insert_one(doc)
+    form_validators.invalidate(form.id)
     return {"message": "Form created", "id": form.id}
 
 @api_router.put("/admin/forms/{form_id}")
@@ -569,13 +1017,15 @@ async def update_form(form_id: str, form: FormDefinition, payload: dict = Depend
     doc["updated_at"] = datetime.now(timezone.utc).isoformat()
     doc = add_form_translations(doc)
     result = await db.forms.update_one({"id": form_id}, {"$set": doc})
-    if result.modified_count == 0:
+    form_validators.invalidate(form_id)
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Form not found")
     return {"message": "Form updated"}
 
 @api_router.delete("/admin/forms/{form_id}")
 async def delete_form(form_id: str, payload: dict = Depends(verify_token)):
     result = await db.forms.delete_one({"id": form_id})
+    form_validators.invalidate(form_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Form not found")
     return {"message": "Form deleted"}
@@ -587,6 +1037,34 @@ async def get_form_submissions(form_id: Optional[str] = None, payload: dict = De
     submissions = await db.form_submissions.find(query, {"_id": 0}).to_list(500)
     return submissions
 
+# Submission analytics (Admin)
+@api_router.get("/admin/analytics/submissions")
+async def get_submission_analytics(form_id: Optional[str] = None, date_from: Optional[date] = None,
+                                   date_to: Optional[date] = None, payload: dict = Depends(verify_token)):
+    """Daily submission counts and option value counts from the rollups.
+
+    `form_id` is a form id or "contact"; without it, totals per form are returned.
+    """
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    if (date_to - date_from).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {ANALYTICS_MAX_DAYS} days")
+    return await submission_rollups.summary(form_id, date_from, date_to)
+
+@api_router.post("/admin/analytics/rebuild")
+async def rebuild_submission_analytics(payload: dict = Depends(verify_token)):
+    """Recompute the rollups from all stored submissions (superadmin only)
+
+    This worker's submissions are queued, not written, until the rebuild is
+    done; increments from other workers during the rebuild may be lost.
+    """
+    if payload.get("role") != "superadmin":
+        raise HTTPException(status_code=403, detail="Access denied. Superadmin only.")
+    async with submission_buffer.paused():
+        return await submission_rollups.rebuild()
+
 # Media (Admin)
 @api_router.get("/admin/media")
 async def get_media(payload: dict = Depends(verify_token)):
@@ -594,82 +1072,483 @@ async def get_media(payload: dict = Depends(verify_token)):
     return media
 
 @api_router.post("/admin/media")
-async def upload_media(file: UploadFile = File(...), payload: dict = Depends(verify_token)):
+async def upload_media(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                       payload: dict = Depends(verify_token)):
     original_name = file.filename or "upload"
-    extension = Path(original_name).suffix
-    stored_name = f"{uuid.uuid4().hex}{extension}"
-    target_path = UPLOADS_DIR / stored_name
-    with target_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    size = target_path.stat().st_size if target_path.exists() else None
+    try:
+        upload = await stream_upload(file, UPLOADS_DIR, MEDIA_MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File is larger than {MEDIA_MAX_UPLOAD_BYTES} bytes")
+    return await create_media_item(upload, original_name, background_tasks)
+
+async def create_media_item(upload, original_name: str, background_tasks: BackgroundTasks) -> MediaItem:
+    """Turn a fully received upload into a stored blob and a media record"""
+    content_type = sniff_content_type(upload.head, original_name)
+
+    # Re-uploading the same file under the same name returns the existing item
+    existing = await db.media.find_one({"sha256": upload.sha256, "original_name": original_name}, {"_id": 0})
+    if existing:
+        await run_in_threadpool(upload.discard)
+        return MediaItem(**existing)
+
+    blob = await store_blob(upload, content_type, original_name)
     media = MediaItem(
         id=str(uuid.uuid4()),
-        url=f"/uploads/{stored_name}",
-        filename=stored_name,
+        url=f"/uploads/{blob['filename']}",
+        filename=blob["filename"],
         original_name=original_name,
-        content_type=file.content_type,
-        size=size,
+        content_type=content_type,
+        size=upload.size,
+        sha256=upload.sha256,
     )
     await db.media.insert_one(media.model_dump())
+    if derivatives_enabled() and content_type in RESIZABLE_TYPES:
+        background_tasks.add_task(render_media_derivatives, blob["filename"])
+    if is_compressible(content_type) and upload.size <= MEDIA_PRECOMPRESS_MAX_BYTES:
+        background_tasks.add_task(precompress_media, blob["filename"], content_type)
     return media
 
+# Resumable uploads (Admin)
+def upload_session_status(session: dict) -> dict:
+    return {
+        "id": session["id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session["received"],
+        "complete": session["received"] >= session["size"],
+        "max_chunk_bytes": UPLOAD_CHUNK_MAX_BYTES,
+        "expires_at": session["expires_at"].replace(tzinfo=timezone.utc).isoformat(),
+    }
+
+async def get_upload_session(session_id: str) -> dict:
+    session = await db.upload_sessions.find_one({"id": session_id}, {"_id": 0})
+    # The TTL monitor runs about once a minute, so check expiry here as well
+    if not session or session["expires_at"].replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+@api_router.post("/admin/media/uploads")
+async def create_upload_session(request: UploadSessionCreate, payload: dict = Depends(verify_token)):
+    """Start a resumable upload; send the bytes with PUT .../{id}?offset=N"""
+    if request.size > MEDIA_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File is larger than {MEDIA_MAX_UPLOAD_BYTES} bytes")
+    now = datetime.now(timezone.utc)
+    session = {
+        "id": str(uuid.uuid4()),
+        "filename": request.filename,
+        "size": request.size,
+        "sha256": request.sha256.lower() if request.sha256 else None,
+        "received": 0,
+        "created_by": payload.get("sub"),
+        "created_at": now.isoformat(),
+        "expires_at": now + UPLOAD_SESSION_TTL,
+    }
+    await db.upload_sessions.insert_one(session)
+    return upload_session_status(session)
+
+@api_router.get("/admin/media/uploads/{session_id}")
+async def get_upload_session_status(session_id: str, payload: dict = Depends(verify_token)):
+    """Current offset of an upload, to resume after a dropped connection"""
+    return upload_session_status(await get_upload_session(session_id))
+
+@api_router.put("/admin/media/uploads/{session_id}")
+async def upload_chunk(session_id: str, offset: int, request: Request, payload: dict = Depends(verify_token)):
+    """Write the request body at `offset`.
+
+    Resending a chunk that was already received is harmless; an offset past
+    the received bytes is rejected with 409 and the offset to resume from.
+    An X-Chunk-SHA256 header is checked before anything is written.
+    """
+    session = await get_upload_session(session_id)
+    if offset < 0 or offset > session["received"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Chunk does not continue the upload", "offset": session["received"]},
+        )
+
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > UPLOAD_CHUNK_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Chunks are limited to {UPLOAD_CHUNK_MAX_BYTES} bytes")
+    end = offset + len(data)
+    if end > session["size"]:
+        raise HTTPException(status_code=400, detail="Chunk extends past the declared file size")
+    checksum = request.headers.get("x-chunk-sha256")
+    if checksum and hashlib.sha256(data).hexdigest() != checksum.lower():
+        raise HTTPException(status_code=400, detail="Chunk checksum mismatch")
+
+    if end > session["received"]:
+        await run_in_threadpool(write_chunk, UPLOAD_SESSIONS_DIR / f"{session_id}.part", offset, bytes(data))
+    session = await db.upload_sessions.find_one_and_update(
+        {"id": session_id},
+        {
+            "$max": {"received": end},
+            "$set": {"expires_at": datetime.now(timezone.utc) + UPLOAD_SESSION_TTL},
+        },
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload_session_status(session)
+
+@api_router.post("/admin/media/uploads/{session_id}/complete")
+async def complete_upload_session(session_id: str, background_tasks: BackgroundTasks,
+                                  payload: dict = Depends(verify_token)):
+    """Assemble a fully received upload into a media item"""
+    session = await get_upload_session(session_id)
+    if session["received"] < session["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "offset": session["received"]},
+        )
+    # Claim the session so a concurrent retry cannot complete it twice
+    claimed = await db.upload_sessions.find_one_and_delete({"id": session_id})
+    if not claimed:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    path = UPLOAD_SESSIONS_DIR / f"{session_id}.part"
+    try:
+        upload = await run_in_threadpool(hash_file, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload data not found")
+    if upload.size != session["size"] or (session["sha256"] and upload.sha256 != session["sha256"]):
+        await run_in_threadpool(upload.discard)
+        raise HTTPException(status_code=400, detail="Uploaded file does not match the declared size or checksum")
+    return await create_media_item(upload, session["filename"], background_tasks)
+
+@api_router.delete("/admin/media/uploads/{session_id}")
+async def abort_upload_session(session_id: str, payload: dict = Depends(verify_token)):
+    result = await db.upload_sessions.delete_one({"id": session_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    await run_in_threadpool((UPLOAD_SESSIONS_DIR / f"{session_id}.part").unlink, True)
+    return {"message": "Upload aborted"}
+
+async def sweep_upload_sessions() -> int:
+    """Delete the parts of expired upload sessions; returns how many were removed"""
+    cutoff = time.time() - UPLOAD_SESSION_TTL.total_seconds()
+
+    def stale_parts():
+        parts = {}
+        for path in UPLOAD_SESSIONS_DIR.glob("*.part"):
+            try:
+                # Every chunk extends the session, so an idle part outlived it
+                if path.stat().st_mtime < cutoff:
+                    parts[path.stem] = path
+            except FileNotFoundError:
+                pass
+        return parts
+
+    parts = await run_in_threadpool(stale_parts)
+    if not parts:
+        return 0
+    live = await db.upload_sessions.find(
+        {"id": {"$in": list(parts)}, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    for session in live:
+        parts.pop(session["id"], None)
+    for path in parts.values():
+        await run_in_threadpool(path.unlink, True)
+    return len(parts)
+
 @api_router.delete("/admin/media/{media_id}")
 async def delete_media(media_id: str, payload: dict = Depends(verify_token)):
     media = await db.media.find_one({"id": media_id}, {"_id": 0})
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
-    filename = media.get("filename")
-    if filename:
-        file_path = UPLOADS_DIR / filename
-        if file_path.exists():
-            file_path.unlink()
     await db.media.delete_one({"id": media_id})
+    await release_blob(media)
     return {"message": "Media deleted"}
 
+async def store_blob(upload, content_type: str, original_name: str) -> dict:
+    """Store uploaded bytes under their content hash and take a reference"""
+    blob = await db.media_blobs.find_one_and_update(
+        {"_id": upload.sha256},
+        {
+            "$inc": {"refs": 1},
+            "$setOnInsert": {
+                "filename": f"{upload.sha256}{blob_extension(content_type, original_name)}",
+                "size": upload.size,
+                "content_type": content_type,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            },
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # A blob being purged may lose its file at any moment, so store ours regardless
+    if not blob.get("purging") and await media_storage.exists(blob["filename"]):
+        await run_in_threadpool(upload.discard)
+    else:
+        await media_storage.save(upload.path, blob["filename"], content_type)
+    return blob
+
+async def release_blob(media: dict):
+    """Drop a media item's reference and delete the file with the last one"""
+    filename = media.get("filename")
+    if media.get("sha256"):
+        blob = await db.media_blobs.find_one_and_update(
+            {"_id": media["sha256"]}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER
+        )
+        if blob is not None:
+            if blob["refs"] <= 0:
+                await purge_blob(blob["_id"])
+            return
+    if not filename or await db.media.find_one({"filename": filename}, {"_id": 1}):
+        # Files stored before deduplication have no blob record
+        return
+    try:
+        await media_storage.delete(filename)
+        await remove_derived_files(filename)
+    except Exception as e:
+        logger.error(f"Could not delete media file {filename}: {e}")
+
+async def purge_blob(blob_id: str):
+    """Delete an unreferenced blob record and its file.
+
+    The file is moved into quarantine before the record is deleted, and the
+    delete only matches while the blob is still unreferenced. If store_blob
+    takes a new reference in between, the file is moved back; if it comes
+    after, it finds no record and stores its own copy.
+    """
+    blob = await db.media_blobs.find_one_and_update(
+        {"_id": blob_id, "refs": {"$lte": 0}, "purging": {"$ne": True}}, {"$set": {"purging": True}}
+    )
+    if blob is None:
+        return
+    filename = blob["filename"]
+    parked = f"{QUARANTINE_PREFIX}{filename}"
+    try:
+        has_file = await media_storage.exists(filename)
+        if has_file:
+            await media_storage.move(filename, parked)
+        result = await db.media_blobs.delete_one({"_id": blob_id, "refs": {"$lte": 0}, "purging": True})
+        if result.deleted_count == 0:
+            if has_file:
+                await media_storage.move(parked, filename)
+            await db.media_blobs.update_one({"_id": blob_id}, {"$unset": {"purging": ""}})
+            return
+        if has_file:
+            await media_storage.delete(parked)
+        await remove_derived_files(filename)
+    except Exception as e:
+        # A file left in quarantine is restored or purged by media GC
+        logger.error(f"Could not delete media file {filename}: {e}")
+
+async def remove_derived_files(filename: str):
+    """Delete the derivatives and compressed siblings of a stored file"""
+    await derivative_renderer.remove(filename)
+    for item in await media_storage.list(f"{COMPRESSED_PREFIX}{filename}."):
+        await media_storage.delete(item.name)
+    compressed_variants.pop(filename, None)
+    missing_compressed_variants.pop(filename, None)
+
+async def precompress_media(filename: str, content_type: str):
+    """Store .br/.gz siblings that /uploads can serve by Accept-Encoding"""
+    try:
+        async with media_storage.local_copy(filename) as source:
+            siblings = await run_in_threadpool(compress_file, source, UPLOADS_DIR / ".compressed", filename)
+        for encoding, path in siblings:
+            await media_storage.save(path, f"{COMPRESSED_PREFIX}{path.name}", content_type, content_encoding=encoding)
+    except Exception as e:
+        logger.error(f"Could not precompress {filename}: {e}")
+    compressed_variants.pop(filename, None)
+    missing_compressed_variants.pop(filename, None)
+
+async def get_compressed_variants(filename: str) -> Dict[str, str]:
+    variants = compressed_variants.get(filename)
+    if variants is not None:
+        return variants
+    if missing_compressed_variants.get(filename, 0.0) > time.monotonic():
+        return {}
+    suffixes = {suffix: encoding for encoding, suffix in COMPRESSED_ENCODINGS}
+    variants = {}
+    for item in await media_storage.list(f"{COMPRESSED_PREFIX}{filename}."):
+        encoding = suffixes.get(item.name[len(COMPRESSED_PREFIX) + len(filename):])
+        if encoding:
+            variants[encoding] = item.name
+    cache = compressed_variants if variants else missing_compressed_variants
+    if len(cache) >= COMPRESSED_VARIANTS_MAX:
+        cache.clear()
+    if variants:
+        compressed_variants[filename] = variants
+        missing_compressed_variants.pop(filename, None)
+    else:
+        missing_compressed_variants[filename] = time.monotonic() + COMPRESSED_VARIANTS_MISS_TTL
+    return variants
+
+async def render_media_derivatives(filename: str):
+    """Pre-render the eager derivative formats and list them on the media items"""
+    try:
+        derivatives = await derivative_renderer.render_all(filename, EAGER_FORMATS)
+    except Exception as e:
+        logger.error(f"Could not render derivatives for {filename}: {e}")
+        return
+    await db.media.update_many({"filename": filename}, {"$set": {"derivatives": derivatives}})
+
+# Uploaded files
+@app.api_route("/uploads/{filename}", methods=["GET", "HEAD"])
+async def serve_upload(request: Request, filename: str, w: Optional[int] = None, fmt: Optional[str] = None):
+    """Serve an uploaded file, or a resized copy of an image with ?w=&fmt=
+
+    Responses are cacheable forever and support Range and conditional
+    requests. Compressible files are sent precompressed when the client
+    accepts it. When a resized copy cannot be rendered the original is
+    served uncached, so caches retry the rendering later.
+    """
+    if filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if w is not None and w <= 0:
+        raise HTTPException(status_code=400, detail="Width must be positive")
+    if fmt is not None and fmt not in DERIVATIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    # Stored names carry the extension of their sniffed content type
+    content_type = mimetypes.guess_type(filename)[0]
+    name, media_type, fallback = filename, None, False
+    if (w is not None or fmt is not None) and derivatives_enabled() and content_type in RESIZABLE_TYPES:
+        fmt = fmt or content_type.split("/")[1]
+        width = snap_width(w) if w is not None else DERIVATIVE_WIDTHS[-1]
+        try:
+            name = await derivative_renderer.ensure(filename, width, fmt)
+            media_type = DERIVATIVE_CONTENT_TYPES[fmt]
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Not Found")
+        except Exception as e:
+            logger.error(f"Could not render {filename} at {width}px as {fmt}: {e}")
+            fallback = True
+
+    vary = name == filename and is_compressible(content_type)
+    encoding = None
+    if vary and "range" not in request.headers:
+        variants = await get_compressed_variants(filename)
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        encoding = next((enc for enc, _ in COMPRESSED_ENCODINGS if enc in accepted and enc in variants), None)
+        if encoding:
+            name = variants[encoding]
+    response = await media_storage.response(request, name, media_type or content_type, encoding, vary)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if fallback:
+        response.headers["cache-control"] = "no-store"
+    return response
+
+@api_router.get("/admin/media/gc")
+async def get_media_orphans(payload: dict = Depends(verify_token)):
+    """Report orphaned files and media records without changing anything"""
+    return await media_gc.scan()
+
+@api_router.post("/admin/media/gc")
+async def sweep_media_orphans(include_unreferenced: bool = False, payload: dict = Depends(verify_token)):
+    """Quarantine orphans past the grace period and purge expired quarantine (superadmin only)"""
+    if payload.get("role") != "superadmin":
+        raise HTTPException(status_code=403, detail="Access denied. Superadmin only.")
+    return await media_gc.sweep(include_unreferenced=include_unreferenced)
+
+@api_router.post("/admin/media/gc/restore/{filename}")
+async def restore_quarantined_media(filename: str, payload: dict = Depends(verify_token)):
+    """Move a quarantined file back into the library"""
+    if filename.startswith(".") or not await media_gc.restore(filename):
+        raise HTTPException(status_code=404, detail="File is not in quarantine")
+    return {"message": "Media restored"}
+
+# Site snapshot (Admin)
+@api_router.get("/admin/snapshot")
+async def download_snapshot(payload: dict = Depends(verify_token)):
+    """Export all content collections and uploads as one .tar.gz archive"""
+    fd, path = tempfile.mkstemp(suffix=".tar.gz")
+    os.close(fd)
+    await export_snapshot(db, Path(path), media_storage)
+    filename = f"snapshot-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.tar.gz"
+    return FileResponse(path, media_type="application/gzip", filename=filename,
+                        background=BackgroundTask(os.unlink, path))
+
+@api_router.post("/admin/snapshot")
+async def restore_snapshot(file: UploadFile = File(...), payload: dict = Depends(verify_token)):
+    """Replace site content with an exported archive (superadmin only)"""
+    if payload.get("role") != "superadmin":
+        raise HTTPException(status_code=403, detail="Access denied. Superadmin only.")
+    fd, path = tempfile.mkstemp(suffix=".tar.gz")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
+        try:
+            result = await import_snapshot(db, Path(path), media_storage, UPLOADS_DIR)
+        except (OSError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid snapshot archive: {e}")
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors") or [{}]
+            raise HTTPException(
+                status_code=400,
+                detail=f"Snapshot documents could not be restored, site content is unchanged: "
+                       f"{len(errors)} write errors, first: {errors[0].get('errmsg', e)}",
+            )
+    finally:
+        os.unlink(path)
+    await rebuild_search_index()
+    for collection in SNAPSHOT_COLLECTIONS:
+        await content_changed(collection)
+    return result
+
 # Translation utility
-def auto_translate(text: str, source_lang: str = 'ru', target_lang: str = 'en') -> str:
+def auto_translate(text: str, source_lang: str = 'ru', target_lang: str = 'en', field: Optional[str] = None) -> str:
     """Auto-translate text using Google Translate"""
+    if not text or text.strip() == '':
+        return text
+    started = time.perf_counter()
     try:
-        if not text or text.strip() == '':
-            return text
         translator = GoogleTranslator(source=source_lang, target=target_lang)
-        return translator.translate(text)
+        result = translator.translate(text)
     except Exception as e:
-        logging.error(f"Translation error: {e}")
+        duration = time.perf_counter() - started
+        translation_stats.observe(duration, len(text), failed=True)
+        logger.error("Translation failed", extra={
+            "event": "translation_error", "field": field, "source_lang": source_lang, "target_lang": target_lang,
+            "characters": len(text), "duration_ms": round(duration * 1000, 1), "error": str(e),
+        })
         return text
+    duration = time.perf_counter() - started
+    translation_stats.observe(duration, len(text))
+    if SLOW_TRANSLATION_MS > 0 and duration * 1000 >= SLOW_TRANSLATION_MS:
+        slow_log.warning("Slow translation", extra={
+            "event": "slow_translation", "field": field, "source_lang": source_lang, "target_lang": target_lang,
+            "characters": len(text), "duration_ms": round(duration * 1000, 1),
+        })
+    return result
 
-def auto_translate_list(items: List[str], source_lang: str = 'ru', target_lang: str = 'en') -> List[str]:
+def auto_translate_list(items: List[str], source_lang: str = 'ru', target_lang: str = 'en',
+                        field: Optional[str] = None) -> List[str]:
     """Auto-translate list of strings"""
-    return [auto_translate(item, source_lang, target_lang) for item in items]
+    return [auto_translate(item, source_lang, target_lang, field) for item in items]
 
 def add_translations(item: dict) -> dict:
     """Add English translations to an item if not present"""
     if 'name' in item and not item.get('name_en'):
-        item['name_en'] = auto_translate(item['name'])
+        item['name_en'] = auto_translate(item['name'], field='name')
     if 'title' in item and not item.get('title_en'):
-        item['title_en'] = auto_translate(item['title'])
+        item['title_en'] = auto_translate(item['title'], field='title')
     if 'description' in item and not item.get('description_en'):
-        item['description_en'] = auto_translate(item['description'])
+        item['description_en'] = auto_translate(item['description'], field='description')
     if 'excerpt' in item and not item.get('excerpt_en'):
-        item['excerpt_en'] = auto_translate(item['excerpt'])
+        item['excerpt_en'] = auto_translate(item['excerpt'], field='excerpt')
     if 'content' in item and not item.get('content_en'):
-        item['content_en'] = auto_translate(item['content'])
+        item['content_en'] = auto_translate(item['content'], field='content')
     if 'location' in item and not item.get('location_en'):
-        item['location_en'] = auto_translate(item['location'])
+        item['location_en'] = auto_translate(item['location'], field='location')
     if 'challenge' in item and not item.get('challenge_en'):
-        item['challenge_en'] = auto_translate(item['challenge'])
+        item['challenge_en'] = auto_translate(item['challenge'], field='challenge')
     if 'solution' in item and not item.get('solution_en'):
-        item['solution_en'] = auto_translate(item['solution'])
+        item['solution_en'] = auto_translate(item['solution'], field='solution')
     if 'features' in item and isinstance(item['features'], list) and not item.get('features_en'):
-        item['features_en'] = auto_translate_list(item['features'])
+        item['features_en'] = auto_translate_list(item['features'], field='features')
     if 'results' in item and isinstance(item['results'], list) and not item.get('results_en'):
-        item['results_en'] = auto_translate_list(item['results'])
+        item['results_en'] = auto_translate_list(item['results'], field='results')
     return item
 
 
 def add_dynamic_page_translations(page: dict) -> dict:
     if not page.get("title_en") and page.get("title"):
-        page["title_en"] = auto_translate(page["title"])
+        page["title_en"] = auto_translate(page["title"], field="title")
     blocks = page.get("blocks") or []
     translated_blocks = []
     for block in blocks:
@@ -677,33 +1556,33 @@ def add_dynamic_page_translations(page: dict) -> dict:
         block_type = b.get("type")
         if block_type == "hero":
             if b.get("title") and not b.get("title_en"):
-                b["title_en"] = auto_translate(b["title"])
+                b["title_en"] = auto_translate(b["title"], field="title")
             if b.get("subtitle") and not b.get("subtitle_en"):
-                b["subtitle_en"] = auto_translate(b["subtitle"])
+                b["subtitle_en"] = auto_translate(b["subtitle"], field="subtitle")
             if b.get("cta_label") and not b.get("cta_label_en"):
-                b["cta_label_en"] = auto_translate(b["cta_label"])
+                b["cta_label_en"] = auto_translate(b["cta_label"], field="cta_label")
         elif block_type == "text":
             if b.get("heading") and not b.get("heading_en"):
-                b["heading_en"] = auto_translate(b["heading"])
+                b["heading_en"] = auto_translate(b["heading"], field="heading")
             if b.get("body") and not b.get("body_en"):
-                b["body_en"] = auto_translate(b["body"])
+                b["body_en"] = auto_translate(b["body"], field="body")
         elif block_type == "image":
             if b.get("caption") and not b.get("caption_en"):
-                b["caption_en"] = auto_translate(b["caption"])
+                b["caption_en"] = auto_translate(b["caption"], field="caption")
         elif block_type == "video":
             if b.get("title") and not b.get("title_en"):
-                b["title_en"] = auto_translate(b["title"])
+                b["title_en"] = auto_translate(b["title"], field="title")
         elif block_type == "cards":
             if b.get("title") and not b.get("title_en"):
-                b["title_en"] = auto_translate(b["title"])
+                b["title_en"] = auto_translate(b["title"], field="title")
             items = b.get("items") or []
             translated_items = []
             for item in items:
                 i = dict(item)
                 if i.get("title") and not i.get("title_en"):
-                    i["title_en"] = auto_translate(i["title"])
+                    i["title_en"] = auto_translate(i["title"], field="title")
                 if i.get("description") and not i.get("description_en"):
-                    i["description_en"] = auto_translate(i["description"])
+                    i["description_en"] = auto_translate(i["description"], field="description")
                 translated_items.append(i)
             b["items"] = translated_items
         elif block_type == "stats":
@@ -712,24 +1591,24 @@ def add_dynamic_page_translations(page: dict) -> dict:
             for item in items:
                 i = dict(item)
                 if i.get("label") and not i.get("label_en"):
-                    i["label_en"] = auto_translate(i["label"])
+                    i["label_en"] = auto_translate(i["label"], field="label")
                 translated_items.append(i)
             b["items"] = translated_items
         elif block_type == "cta":
             if b.get("title") and not b.get("title_en"):
-                b["title_en"] = auto_translate(b["title"])
+                b["title_en"] = auto_translate(b["title"], field="title")
             if b.get("body") and not b.get("body_en"):
-                b["body_en"] = auto_translate(b["body"])
+                b["body_en"] = auto_translate(b["body"], field="body")
             if b.get("button_label") and not b.get("button_label_en"):
-                b["button_label_en"] = auto_translate(b["button_label"])
+                b["button_label_en"] = auto_translate(b["button_label"], field="button_label")
         elif block_type == "list":
             if b.get("title") and not b.get("title_en"):
-                b["title_en"] = auto_translate(b["title"])
+                b["title_en"] = auto_translate(b["title"], field="title")
             if b.get("items") and not b.get("items_en"):
-                b["items_en"] = auto_translate_list(b["items"])
+                b["items_en"] = auto_translate_list(b["items"], field="items")
         elif block_type == "collection":
             if b.get("title") and not b.get("title_en"):
-                b["title_en"] = auto_translate(b["title"])
+                b["title_en"] = auto_translate(b["title"], field="title")
         translated_blocks.append(b)
     page["blocks"] = translated_blocks
     return page
@@ -737,17 +1616,17 @@ def add_dynamic_page_translations(page: dict) -> dict:
 
 def add_form_translations(form: dict) -> dict:
     if not form.get("title_en") and form.get("title"):
-        form["title_en"] = auto_translate(form["title"])
+        form["title_en"] = auto_translate(form["title"], field="title")
     if not form.get("submit_message_en") and form.get("submit_message"):
-        form["submit_message_en"] = auto_translate(form["submit_message"])
+        form["submit_message_en"] = auto_translate(form["submit_message"], field="submit_message")
     fields = form.get("fields") or []
     translated_fields = []
     for field in fields:
         f = dict(field)
         if f.get("label") and not f.get("label_en"):
-            f["label_en"] = auto_translate(f["label"])
+            f["label_en"] = auto_translate(f["label"], field="label")
         if f.get("options") and not f.get("options_en"):
-            f["options_en"] = auto_translate_list(f["options"])
+            f["options_en"] = auto_translate_list(f["options"], field="options")
         translated_fields.append(f)
     form["fields"] = translated_fields
     return form
@@ -818,6 +1697,100 @@ async def get_or_create_settings() -> dict:
     await db.site_settings.insert_one(settings)
     return settings
 
+# Content change hooks
+async def content_changed(collection: str, doc_ids: Optional[List[str]] = None, paths: Optional[List[str]] = None):
+    """Refresh in-memory derived data after an admin write to a collection.
+
+    When the changed field paths are known, only data derived from those
+    fields is refreshed.
+    """
+    fields = None
+    if paths is not None:
+        fields = {path.split(".")[0] for path in paths}
+        fields |= {field[:-3] for field in fields if field.endswith("_en")}
+    if collection in SEARCH_COLLECTIONS and doc_ids and (fields is None or fields & SEARCH_FIELDS[collection]):
+        docs = await db[collection].find({"id": {"$in": doc_ids}}, {"_id": 0}).to_list(len(doc_ids))
+        found = set()
+        for doc in docs:
+            search_index.add(collection, doc)
+            found.add(doc["id"])
+        for doc_id in doc_ids:
+            if doc_id not in found:
+                search_index.remove(collection, doc_id)
+    if collection in FACET_FIELDS and (fields is None or fields & FACET_FIELDS[collection].keys()):
+        facet_cache.pop(collection, None)
+    response_cache.clear()
+
+
+async def record_revisions(collection: str, doc_ids: List[str], payload: dict, before: Optional[Dict[str, dict]] = None):
+    """Store a revision for each saved document of a revisioned collection"""
+    if collection not in REVISIONED_COLLECTIONS or not doc_ids:
+        return
+    before = before or {}
+    docs = await db[collection].find({"id": {"$in": doc_ids}}, {"_id": 0}).to_list(len(doc_ids))
+    for doc in docs:
+        await revision_store.record(collection, doc["id"], doc, before=before.get(doc["id"]), author=payload.get("sub"))
+
+
+async def get_facet_counts(collection: str, filters: Dict[str, str]) -> dict:
+    """Count facet values in one $facet aggregation.
+
+    Each facet is counted with every active filter except its own, so the UI
+    can show how many results selecting another value would give.
+    """
+    filters = {field: value for field, value in filters.items() if value}
+    cache_key = tuple(sorted(filters.items()))
+    entries = facet_cache.setdefault(collection, OrderedDict())
+    cached = entries.get(cache_key)
+    if cached is not None:
+        entries.move_to_end(cache_key)
+        return cached
+
+    stages = {}
+    for field, is_array in FACET_FIELDS[collection].items():
+        match = {f: v for f, v in filters.items() if f != field}
+        pipeline = [{"$match": match}]
+        if is_array:
+            pipeline.append({"$unwind": f"${field}"})
+        pipeline += [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        stages[field] = pipeline
+    stages["total"] = [{"$match": filters}, {"$count": "count"}]
+
+    rows = await db[collection].aggregate([{"$facet": stages}]).to_list(1)
+    row = rows[0] if rows else {}
+    total = row.get("total") or [{"count": 0}]
+    result = {
+        "total": total[0]["count"],
+        "filters": filters,
+        "facets": {
+            field: [
+                {"value": item["_id"], "count": item["count"]}
+                for item in row.get(field, [])
+                if item["_id"] not in (None, "")
+            ]
+            for field in FACET_FIELDS[collection]
+        },
+    }
+    # Each facet is counted without its own filter, so a value that exists
+    # under the other filters shows up in it
+    if all(any(item["value"] == value for item in result["facets"][field]) for field, value in filters.items()):
+        entries[cache_key] = result
+        while len(entries) > FACET_CACHE_MAX_ENTRIES:
+            entries.popitem(last=False)
+    return result
+
+
+async def rebuild_search_index():
+    documents = []
+    for collection in SEARCH_COLLECTIONS:
+        async for doc in db[collection].find({}, {"_id": 0}):
+            documents.append((collection, doc))
+    search_index.rebuild(documents)
+    logger.info("Search index built: %d documents", len(search_index))
+
 # Services
 @api_router.get("/services", response_model=List[Service])
 async def get_services(lang: Optional[str] = 'en'):
@@ -876,18 +1849,24 @@ async def get_event(slug: str, lang: Optional[str] = 'en'):
 
 # Investment Projects
 @api_router.get("/projects", response_model=List[InvestmentProject])
-async def get_projects(stage: Optional[str] = None, industry: Optional[str] = None, lang: Optional[str] = 'en'):
+async def get_projects(stage: Optional[str] = None, industry: Optional[str] = None, country: Optional[str] = None, lang: Optional[str] = 'en'):
     query = {}
     if stage:
         query["stage"] = stage
     if industry:
         query["industry"] = industry
+    if country:
+        query["country"] = country
     projects = await db.projects.find(query, {"_id": 0}).to_list(100)
     if lang == 'en':
         for project in projects:
             add_translations(project)
     return projects
 
+@api_router.get("/projects/facets")
+async def get_project_facets(stage: Optional[str] = None, industry: Optional[str] = None, country: Optional[str] = None):
+    return await get_facet_counts("projects", {"stage": stage, "industry": industry, "country": country})
+
 @api_router.get("/projects/{slug}", response_model=InvestmentProject)
 async def get_project(slug: str, lang: Optional[str] = 'en'):
     project = await db.projects.find_one({"slug": slug}, {"_id": 0})
@@ -899,16 +1878,22 @@ async def get_project(slug: str, lang: Optional[str] = 'en'):
 
 # Partners
 @api_router.get("/partners", response_model=List[Partner])
-async def get_partners(category: Optional[str] = None, lang: Optional[str] = 'en'):
+async def get_partners(category: Optional[str] = None, country: Optional[str] = None, lang: Optional[str] = 'en'):
     query = {}
     if category:
         query["categories"] = category
+    if country:
+        query["country"] = country
     partners = await db.partners.find(query, {"_id": 0}).to_list(100)
     if lang == 'en':
         for partner in partners:
             add_translations(partner)
     return partners
 
+@api_router.get("/partners/facets")
+async def get_partner_facets(category: Optional[str] = None, country: Optional[str] = None):
+    return await get_facet_counts("partners", {"categories": category, "country": country})
+
 @api_router.get("/partners/{slug}", response_model=Partner)
 async def get_partner(slug: str, lang: Optional[str] = 'en'):
     partner = await db.partners.find_one({"slug": slug}, {"_id": 0})
@@ -979,12 +1964,62 @@ async def get_dynamic_page(slug: str):
 
 # Contact Form
 @api_router.post("/contact", response_model=ContactForm)
-async def submit_contact_form(form_data: ContactFormData):
+async def submit_contact_form(form_data: ContactFormData, request: Request):
+    await throttle_submission(request, "contact")
     contact = ContactForm(**form_data.model_dump())
-    doc = contact.model_dump()
-    await db.contact_forms.insert_one(doc)
+    await store_submission("contact", "contact_forms", contact.model_dump(), form_data.model_dump())
     return contact
 
+def normalize_submission(value):
+    """Case- and whitespace-insensitive form of a submitted value"""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {key: normalize_submission(item) for key, item in value.items() if item not in (None, "")}
+    if isinstance(value, list):
+        return [normalize_submission(item) for item in value]
+    return value
+
+async def throttle_submission(request: Request, form_key: str):
+    """Reject the request with 429 when the client is over its overall or per-form rate"""
+    ip = client_ip(request)
+    retry_after = await submit_ip_limiter.take(ip)
+    if not retry_after:
+        retry_after = await submit_form_limiter.take(f"{form_key}:{ip}")
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many submissions. Try again later.",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+async def store_submission(form_key: str, collection: str, doc: dict, data: dict):
+    """Queue a submission unless the same normalized payload was submitted to this form recently.
+
+    Duplicates are acknowledged like any submission so resubmitting bots learn nothing.
+    """
+    fingerprint = None
+    if SUBMIT_DUPLICATE_WINDOW_SECONDS > 0:
+        normalized = json.dumps(normalize_submission(data), sort_keys=True, ensure_ascii=False, default=str)
+        fingerprint = hashlib.sha256(f"{form_key}\n{normalized}".encode()).hexdigest()
+        if await submit_duplicates.seen(fingerprint):
+            return
+    try:
+        await queue_submission(collection, doc)
+    except Exception:
+        # Not stored, so the client's retry must not count as a duplicate
+        if fingerprint is not None:
+            await submit_duplicates.forget(fingerprint)
+        raise
+
+async def queue_submission(collection: str, doc: dict):
+    try:
+        await submission_buffer.submit(collection, doc)
+    except BufferFull:
+        raise HTTPException(
+            status_code=503, detail="Too many submissions, please retry shortly", headers={"Retry-After": "1"}
+        )
+
 # Dynamic Forms
 @api_router.get("/forms/{slug}")
 async def get_form(slug: str):
@@ -994,12 +2029,18 @@ async def get_form(slug: str):
     return form
 
 @api_router.post("/forms/{slug}/submit")
-async def submit_form(slug: str, payload: Dict):
-    form = await db.forms.find_one({"slug": slug}, {"_id": 0})
+async def submit_form(slug: str, payload: Dict, request: Request):
+    form, validator = await form_validators.get(slug)
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
-    submission = FormSubmission(form_id=form["id"], payload=payload)
-    await db.form_submissions.insert_one(submission.model_dump())
+    await throttle_submission(request, form["id"])
+    try:
+        data = validator.model_validate(payload)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        raise HTTPException(status_code=422, detail=[{**error, "loc": ["body", *error["loc"]]} for error in errors])
+    submission = FormSubmission(form_id=form["id"], payload=data.model_dump(by_alias=True, exclude_none=True))
+    await store_submission(form["id"], "form_submissions", submission.model_dump(), submission.payload)
     return {"message": "Submission stored"}
 
 # Admin CRUD endpoints (Protected)
@@ -1008,14 +2049,16 @@ async def submit_form(slug: str, payload: Dict):
 async def create_service(service: Service, payload: dict = Depends(verify_token)):
     doc = service.model_dump()
     await db.services.insert_one(doc)
+    await content_changed("services", [service.id])
     return {"message": "Service created", "id": service.id}
 
 @api_router.put("/admin/services/{service_id}")
 async def update_service(service_id: str, service: Service, payload: dict = Depends(verify_token)):
     doc = service.model_dump()
     result = await db.services.update_one({"id": service_id}, {"$set": doc})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Service not found")
+    await content_changed("services", [service_id])
     return {"message": "Service updated"}
 
 @api_router.delete("/admin/services/{service_id}")
@@ -1023,6 +2066,7 @@ async def delete_service(service_id: str, payload: dict = Depends(verify_token))
     result = await db.services.delete_one({"id": service_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Service not found")
+    await content_changed("services", [service_id])
     return {"message": "Service deleted"}
 
 # Cases CRUD
@@ -1030,14 +2074,16 @@ async def delete_service(service_id: str, payload: dict = Depends(verify_token))
 async def create_case(case: CaseStudy, payload: dict = Depends(verify_token)):
     doc = case.model_dump()
     await db.cases.insert_one(doc)
+    await content_changed("cases", [case.id])
     return {"message": "Case created", "id": case.id}
 
 @api_router.put("/admin/cases/{case_id}")
 async def update_case(case_id: str, case: CaseStudy, payload: dict = Depends(verify_token)):
     doc = case.model_dump()
     result = await db.cases.update_one({"id": case_id}, {"$set": doc})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Case not found")
+    await content_changed("cases", [case_id])
     return {"message": "Case updated"}
 
 @api_router.delete("/admin/cases/{case_id}")
@@ -1045,6 +2091,7 @@ async def delete_case(case_id: str, payload: dict = Depends(verify_token)):
     result = await db.cases.delete_one({"id": case_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Case not found")
+    await content_changed("cases", [case_id])
     return {"message": "Case deleted"}
 
 # Events CRUD
@@ -1052,14 +2099,16 @@ async def delete_case(case_id: str, payload: dict = Depends(verify_token)):
 async def create_event(event: Event, payload: dict = Depends(verify_token)):
     doc = event.model_dump()
     await db.events.insert_one(doc)
+    await content_changed("events", [event.id])
     return {"message": "Event created", "id": event.id}
 
 @api_router.put("/admin/events/{event_id}")
 async def update_event(event_id: str, event: Event, payload: dict = Depends(verify_token)):
     doc = event.model_dump()
     result = await db.events.update_one({"id": event_id}, {"$set": doc})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await content_changed("events", [event_id])
     return {"message": "Event updated"}
 
 @api_router.delete("/admin/events/{event_id}")
@@ -1067,6 +2116,7 @@ async def delete_event(event_id: str, payload: dict = Depends(verify_token)):
     result = await db.events.delete_one({"id": event_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await content_changed("events", [event_id])
     return {"message": "Event deleted"}
 
 # Projects CRUD
@@ -1074,14 +2124,16 @@ async def delete_event(event_id: str, payload: dict = Depends(verify_token)):
 async def create_project(project: InvestmentProject, payload: dict = Depends(verify_token)):
     doc = project.model_dump()
     await db.projects.insert_one(doc)
+    await content_changed("projects", [project.id])
     return {"message": "Project created", "id": project.id}
 
 @api_router.put("/admin/projects/{project_id}")
 async def update_project(project_id: str, project: InvestmentProject, payload: dict = Depends(verify_token)):
     doc = project.model_dump()
     result = await db.projects.update_one({"id": project_id}, {"$set": doc})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await content_changed("projects", [project_id])
     return {"message": "Project updated"}
 
 @api_router.delete("/admin/projects/{project_id}")
@@ -1089,6 +2141,7 @@ async def delete_project(project_id: str, payload: dict = Depends(verify_token))
     result = await db.projects.delete_one({"id": project_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await content_changed("projects", [project_id])
     return {"message": "Project deleted"}
 
 # Partners CRUD
@@ -1096,14 +2149,16 @@ async def delete_project(project_id: str, payload: dict = Depends(verify_token))
 async def create_partner(partner: Partner, payload: dict = Depends(verify_token)):
     doc = partner.model_dump()
     await db.partners.insert_one(doc)
+    await content_changed("partners", [partner.id])
     return {"message": "Partner created", "id": partner.id}
 
 @api_router.put("/admin/partners/{partner_id}")
 async def update_partner(partner_id: str, partner: Partner, payload: dict = Depends(verify_token)):
     doc = partner.model_dump()
     result = await db.partners.update_one({"id": partner_id}, {"$set": doc})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Partner not found")
+    await content_changed("partners", [partner_id])
     return {"message": "Partner updated"}
 
 @api_router.delete("/admin/partners/{partner_id}")
@@ -1111,6 +2166,7 @@ async def delete_partner(partner_id: str, payload: dict = Depends(verify_token))
     result = await db.partners.delete_one({"id": partner_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Partner not found")
+    await content_changed("partners", [partner_id])
     return {"message": "Partner deleted"}
 
 # Articles CRUD
@@ -1118,14 +2174,20 @@ async def delete_partner(partner_id: str, payload: dict = Depends(verify_token))
 async def create_article(article: Article, payload: dict = Depends(verify_token)):
     doc = article.model_dump()
     await db.articles.insert_one(doc)
+    await record_revisions("articles", [article.id], payload)
+    await content_changed("articles", [article.id])
     return {"message": "Article created", "id": article.id}
 
 @api_router.put("/admin/articles/{article_id}")
 async def update_article(article_id: str, article: Article, payload: dict = Depends(verify_token)):
     doc = article.model_dump()
-    result = await db.articles.update_one({"id": article_id}, {"$set": doc})
-    if result.modified_count == 0:
+    before = await db.articles.find_one_and_update(
+        {"id": article_id}, {"$set": doc}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    await record_revisions("articles", [article_id], payload, {article_id: before})
+    await content_changed("articles", [article_id])
     return {"message": "Article updated"}
 
 @api_router.delete("/admin/articles/{article_id}")
@@ -1133,6 +2195,7 @@ async def delete_article(article_id: str, payload: dict = Depends(verify_token))
     result = await db.articles.delete_one({"id": article_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Article not found")
+    await content_changed("articles", [article_id])
     return {"message": "Article deleted"}
 
 # Team CRUD
@@ -1140,14 +2203,16 @@ async def delete_article(article_id: str, payload: dict = Depends(verify_token))
 async def create_team_member(member: TeamMember, payload: dict = Depends(verify_token)):
     doc = member.model_dump()
     await db.team.insert_one(doc)
+    await content_changed("team", [member.id])
     return {"message": "Team member created", "id": member.id}
 
 @api_router.put("/admin/team/{member_id}")
 async def update_team_member(member_id: str, member: TeamMember, payload: dict = Depends(verify_token)):
     doc = member.model_dump()
     result = await db.team.update_one({"id": member_id}, {"$set": doc})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Team member not found")
+    await content_changed("team", [member_id])
     return {"message": "Team member updated"}
 
 @api_router.delete("/admin/team/{member_id}")
@@ -1155,6 +2220,7 @@ async def delete_team_member(member_id: str, payload: dict = Depends(verify_toke
     result = await db.team.delete_one({"id": member_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Team member not found")
+    await content_changed("team", [member_id])
     return {"message": "Team member deleted"}
 
 # Static Pages CRUD
@@ -1163,6 +2229,8 @@ async def create_page(page: StaticPage, payload: dict = Depends(verify_token)):
     doc = page.model_dump()
     doc = add_translations(doc)
     await db.pages.insert_one(doc)
+    await record_revisions("pages", [page.id], payload)
+    await content_changed("pages", [page.id])
     return {"message": "Page created", "id": page.id}
 
 @api_router.put("/admin/pages/{page_id}")
@@ -1170,9 +2238,13 @@ async def update_page(page_id: str, page: StaticPage, payload: dict = Depends(ve
     doc = page.model_dump()
     doc['updated_at'] = datetime.now(timezone.utc).isoformat()
     doc = add_translations(doc)
-    result = await db.pages.update_one({"id": page_id}, {"$set": doc})
-    if result.modified_count == 0:
+    before = await db.pages.find_one_and_update(
+        {"id": page_id}, {"$set": doc}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
         raise HTTPException(status_code=404, detail="Page not found")
+    await record_revisions("pages", [page_id], payload, {page_id: before})
+    await content_changed("pages", [page_id])
     return {"message": "Page updated"}
 
 @api_router.delete("/admin/pages/{page_id}")
@@ -1180,11 +2252,348 @@ async def delete_page(page_id: str, payload: dict = Depends(verify_token)):
     result = await db.pages.delete_one({"id": page_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Page not found")
+    await content_changed("pages", [page_id])
     return {"message": "Page deleted"}
 
+# Batch and partial updates (Admin)
+# URL segment -> (collection, model, translation function applied on write, label)
+ADMIN_COLLECTIONS = {
+    "services": ("services", Service, None, "Service"),
+    "cases": ("cases", CaseStudy, None, "Case"),
+    "events": ("events", Event, None, "Event"),
+    "projects": ("projects", InvestmentProject, None, "Project"),
+    "partners": ("partners", Partner, None, "Partner"),
+    "articles": ("articles", Article, None, "Article"),
+    "team": ("team", TeamMember, None, "Team member"),
+    "pages": ("pages", StaticPage, add_translations, "Page"),
+    "pages-dynamic": ("pages_dynamic", DynamicPage, add_dynamic_page_translations, "Page"),
+}
+
+def _batch_error(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors())
+    return str(exc)
+
+@api_router.post("/admin/{collection}/batch")
+async def batch_write(collection: str, batch: BatchRequest, payload: dict = Depends(verify_token)):
+    """Apply many create/update/delete operations in one unordered bulk_write"""
+    if collection not in ADMIN_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    if len(batch.operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+    name, model, translate, _ = ADMIN_COLLECTIONS[collection]
+    now = datetime.now(timezone.utc).isoformat()
+
+    results = []
+    pending = []  # (result index, op, doc id, document or None)
+    for index, operation in enumerate(batch.operations):
+        doc_id = operation.id or (operation.data or {}).get("id")
+        result = {"index": index, "op": operation.op, "id": doc_id, "status": "ok"}
+        results.append(result)
+        try:
+            if operation.op == "delete":
+                if not doc_id:
+                    raise ValueError("id is required")
+                pending.append((index, operation.op, doc_id, None))
+                continue
+            data = dict(operation.data or {})
+            if doc_id and data.setdefault("id", doc_id) != doc_id:
+                raise ValueError("id does not match data.id")
+            doc = model(**data).model_dump()
+            if operation.op == "update":
+                if not doc_id:
+                    raise ValueError("id is required")
+                # Updates never rename a document
+                doc.pop("id", None)
+                if "updated_at" in doc:
+                    doc["updated_at"] = now
+            result["id"] = doc_id or doc["id"]
+            pending.append((index, operation.op, result["id"], doc))
+        except (ValidationError, ValueError) as e:
+            result.update(status="error", error=_batch_error(e))
+
+    existing_ids = {op_id for _, op, op_id, _ in pending if op != "create"}
+    before = {}
+    if existing_ids:
+        projection = {"_id": 0} if name in REVISIONED_COLLECTIONS else {"_id": 0, "id": 1}
+        found = await db[name].find({"id": {"$in": list(existing_ids)}}, projection).to_list(None)
+        before = {doc["id"]: doc for doc in found}
+        existing_ids = set(before)
+
+    writes = []
+    write_index = []
+    for index, op, doc_id, doc in pending:
+        if op != "create" and doc_id not in existing_ids:
+            results[index].update(status="error", error="Not found")
+            continue
+        write_index.append(index)
+        writes.append((op, doc_id, doc))
+
+    if translate:
+        docs = [doc for op, _, doc in writes if doc is not None]
+        await run_in_threadpool(lambda: [translate(doc) for doc in docs])
+
+    requests = []
+    for op, doc_id, doc in writes:
+        if op == "create":
+            requests.append(InsertOne(doc))
+        elif op == "update":
+            requests.append(UpdateOne({"id": doc_id}, {"$set": doc}))
+        else:
+            requests.append(DeleteOne({"id": doc_id}))
+
+    counts = {"inserted": 0, "updated": 0, "deleted": 0}
+    if requests:
+        try:
+            outcome = await db[name].bulk_write(requests, ordered=False)
+            details = outcome.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                results[write_index[error["index"]]].update(status="error", error=error.get("errmsg"))
+        counts = {
+            "inserted": details.get("nInserted", 0),
+            "updated": details.get("nMatched", 0),
+            "deleted": details.get("nRemoved", 0),
+        }
+        saved = [results[index]["id"] for index in write_index
+                 if results[index]["status"] == "ok" and results[index]["op"] != "delete"]
+        await record_revisions(name, saved, payload, before)
+        await content_changed(name, [results[index]["id"] for index in write_index])
+
+    errors = sum(1 for result in results if result["status"] == "error")
+    return {**counts, "errors": errors, "results": results}
+
+@lru_cache(maxsize=None)
+def _field_adapter(model, name: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[name].annotation)
+
+def validate_patch_fields(model, patch: dict) -> dict:
+    """Validate only the fields present in a merge patch; None marks removal"""
+    errors = []
+    values = {}
+    for name, value in patch.items():
+        field = model.model_fields.get(name)
+        if field is None or name == "id":
+            errors.append({"loc": [name], "msg": "Field cannot be patched"})
+        elif value is None:
+            if field.is_required():
+                errors.append({"loc": [name], "msg": "Required field cannot be removed"})
+            else:
+                values[name] = None
+        else:
+            adapter = _field_adapter(model, name)
+            try:
+                values[name] = adapter.dump_python(adapter.validate_python(value))
+            except ValidationError as e:
+                errors.extend({"loc": [name, *err["loc"]], "msg": err["msg"]} for err in e.errors())
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return values
+
+def apply_merge_patch(target, patch):
+    """Apply an RFC 7396 JSON Merge Patch and return the result"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+def _drop_stale_translations(old: dict, new: dict, patch: dict) -> dict:
+    """Remove *_en values whose source changed unless the patch supplies them"""
+    for key in list(new):
+        en_key = f"{key}_en"
+        if key.endswith("_en") or en_key not in new or en_key in patch:
+            continue
+        if new[key] != old.get(key):
+            new.pop(en_key)
+    return new
+
+def apply_block_ops(blocks: List[Dict], ops: List[Dict]) -> tuple:
+    """Apply block operations to a page's block list.
+
+    Returns the new blocks, the indexes of blocks whose content changed and
+    whether blocks were inserted, removed or moved.
+    """
+    entries = [(block, False) for block in blocks]
+    restructured = False
+    for op in ops:
+        kind = op.get("op") if isinstance(op, dict) else None
+        index = op.get("index") if kind else None
+        limit = len(entries) + 1 if kind == "insert" else len(entries)
+        if not isinstance(index, int) or not 0 <= index < limit:
+            raise HTTPException(status_code=422, detail=f"Block index out of range: {index}")
+        if kind == "merge" and isinstance(op.get("patch"), dict):
+            block = entries[index][0]
+            merged = apply_merge_patch(block, op["patch"])
+            entries[index] = (_drop_stale_translations(block, merged, op["patch"]), True)
+        elif kind == "replace" and isinstance(op.get("block"), dict):
+            entries[index] = (op["block"], True)
+        elif kind == "insert" and isinstance(op.get("block"), dict):
+            entries.insert(index, (op["block"], True))
+            restructured = True
+        elif kind == "remove":
+            entries.pop(index)
+            restructured = True
+        elif kind == "move" and isinstance(op.get("to"), int) and 0 <= op["to"] < len(entries):
+            entries.insert(op["to"], entries.pop(index))
+            restructured = True
+        else:
+            raise HTTPException(status_code=422, detail=f"Invalid block operation: {kind}")
+    touched = {index for index, (_, changed) in enumerate(entries) if changed}
+    return [block for block, _ in entries], touched, restructured
+
+@api_router.patch("/admin/{collection}/{doc_id}")
+async def patch_document(collection: str, doc_id: str, patch: Dict, payload: dict = Depends(verify_token)):
+    """Partially update a document with a JSON Merge Patch.
+
+    Dynamic pages also accept a "block_ops" list to merge, replace, insert,
+    remove or move single blocks without re-sending the whole block tree.
+    """
+    if collection not in ADMIN_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    name, model, translate, label = ADMIN_COLLECTIONS[collection]
+    patch = dict(patch)
+    block_ops = patch.pop("block_ops", None) if name == "pages_dynamic" else None
+    if block_ops is not None and "blocks" in patch:
+        raise HTTPException(status_code=422, detail="Send either blocks or block_ops, not both")
+    values = validate_patch_fields(model, patch)
+
+    projection = {"_id": 0, "id": 1, **{field: 1 for field in values}}
+    if block_ops is not None:
+        projection.update(blocks=1, updated_at=1)
+    if name in REVISIONED_COLLECTIONS:
+        projection = {"_id": 0}
+    current = await db[name].find_one({"id": doc_id}, projection)
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+
+    to_set = {}
+    to_unset = set()
+    for field, value in values.items():
+        if value is None:
+            if field in current:
+                to_unset.add(field)
+        elif value != current.get(field):
+            to_set[field] = value
+    # Stale translations are re-created on write where the collection translates
+    # on write, and otherwise dropped so reads translate the new text.
+    for field in list(to_set):
+        en_field = f"{field}_en"
+        if en_field in model.model_fields and en_field not in values:
+            if translate and isinstance(to_set[field], str):
+                to_set[en_field] = await run_in_threadpool(auto_translate, to_set[field], field=field)
+            else:
+                to_unset.add(en_field)
+
+    filter_ = {"id": doc_id}
+    if block_ops is not None:
+        if not isinstance(block_ops, list):
+            raise HTTPException(status_code=422, detail="block_ops must be a list")
+        old_blocks = current.get("blocks") or []
+        new_blocks, touched, restructured = apply_block_ops(old_blocks, block_ops)
+        if touched:
+            indexes = sorted(touched)
+            translated = await run_in_threadpool(translate, {"blocks": [new_blocks[i] for i in indexes]})
+            for index, block in zip(indexes, translated["blocks"]):
+                new_blocks[index] = block
+        if restructured:
+            to_set["blocks"] = new_blocks
+        else:
+            for index in touched:
+                old_block, block = old_blocks[index], new_blocks[index]
+                for key, value in block.items():
+                    if old_block.get(key) != value:
+                        to_set[f"blocks.{index}.{key}"] = value
+                for key in old_block.keys() - block.keys():
+                    to_unset.add(f"blocks.{index}.{key}")
+        # The block list was read above; refuse to overwrite a concurrent save.
+        if current.get("updated_at"):
+            filter_["updated_at"] = current["updated_at"]
+
+    if not to_set and not to_unset:
+        return {"message": f"{label} updated", "modified": False}
+    if "updated_at" in model.model_fields:
+        to_set["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update = {"$set": to_set}
+    if to_unset:
+        update["$unset"] = {field: "" for field in to_unset}
+    result = await db[name].update_one(filter_, update)
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail=f"{label} was modified concurrently")
+    await record_revisions(name, [doc_id], payload, {doc_id: current})
+    await content_changed(name, [doc_id], paths=list(to_set) + list(to_unset))
+    return {"message": f"{label} updated", "modified": result.modified_count > 0}
+
+# Revisions (Admin)
+def revisioned_collection(collection: str) -> str:
+    name = ADMIN_COLLECTIONS.get(collection, (None,))[0]
+    if name not in REVISIONED_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Collection has no revision history")
+    return name
+
+@api_router.get("/admin/revisions/{collection}/{doc_id}")
+async def list_revisions(collection: str, doc_id: str, payload: dict = Depends(verify_token)):
+    name = revisioned_collection(collection)
+    revisions = await revision_store.list(name, doc_id)
+    if not revisions:
+        raise HTTPException(status_code=404, detail="No revisions found")
+    stored = sum(revision["size"] for revision in revisions)
+    return {
+        "revisions": revisions,
+        "stored_bytes": stored,
+        "document_bytes": revisions[0]["raw_size"],
+    }
+
+@api_router.get("/admin/revisions/{collection}/{doc_id}/diff")
+async def diff_revisions(collection: str, doc_id: str, from_version: int, to_version: int, payload: dict = Depends(verify_token)):
+    name = revisioned_collection(collection)
+    old = await revision_store.get(name, doc_id, from_version)
+    new = await revision_store.get(name, doc_id, to_version)
+    if old is None or new is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return {"from_version": from_version, "to_version": to_version, "changes": revision_diff(old, new)}
+
+@api_router.get("/admin/revisions/{collection}/{doc_id}/{version}")
+async def get_revision(collection: str, doc_id: str, version: int, payload: dict = Depends(verify_token)):
+    name = revisioned_collection(collection)
+    doc = await revision_store.get(name, doc_id, version)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return {"version": version, "document": doc}
+
+@api_router.post("/admin/revisions/{collection}/{doc_id}/{version}/restore")
+async def restore_revision(collection: str, doc_id: str, version: int, payload: dict = Depends(verify_token)):
+    name = revisioned_collection(collection)
+    doc = await revision_store.get(name, doc_id, version)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    if "updated_at" in doc:
+        doc["updated_at"] = datetime.now(timezone.utc).isoformat()
+    before = await db[name].find_one_and_replace(
+        {"id": doc_id}, doc, projection={"_id": 0}, upsert=True, return_document=ReturnDocument.BEFORE
+    )
+    await record_revisions(name, [doc_id], payload, {doc_id: before} if before else None)
+    await content_changed(name, [doc_id])
+    return {"message": "Revision restored", "version": version}
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Added before CORS so CORS headers are applied to cached responses per request
+app.add_middleware(
+    CompressionMiddleware,
+    compressor=compressor,
+    cache=response_cache,
+    minimum_size=COMPRESSION_MIN_BYTES,
+    prefix="/api/",
+    private_prefixes=("/api/admin", "/api/auth"),
+    invalidate_prefix="/api/admin",
+)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1192,14 +2601,114 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Outside the cache and CORS, so cached responses and CORS preflights are measured too
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    authorize=is_valid_token,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    interval=PROFILE_SAMPLE_INTERVAL_MS / 1000,
 )
+# Outermost, so everything below logs with the request id
+app.add_middleware(RequestContextMiddleware, logger=slow_log, slow_seconds=SLOW_REQUEST_MS / 1000)
+
+# Configure logging; LOG_FORMAT=json emits one JSON object per line
+configure_logging(os.getenv("LOG_FORMAT", "text"))
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_revision_indexes():
+    try:
+        await revision_store.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Revision index creation failed: {e}")
+
+@app.on_event("startup")
+async def create_login_throttle_indexes():
+    if LOGIN_THROTTLE_BACKEND == "mongo":
+        try:
+            await login_user_limiter.ensure_indexes()
+        except Exception as e:
+            logger.error(f"Login throttle index creation failed: {e}")
+
+@app.on_event("startup")
+async def create_submission_throttle_indexes():
+    if SUBMIT_THROTTLE_BACKEND == "mongo":
+        try:
+            await submit_ip_limiter.ensure_indexes()
+        except Exception as e:
+            logger.error(f"Submission throttle index creation failed: {e}")
+
+@app.on_event("startup")
+async def create_media_indexes():
+    try:
+        await db.media.create_index([("sha256", 1), ("original_name", 1)])
+        await db.media.create_index("filename")
+        await db.upload_sessions.create_index("id", unique=True)
+        await db.upload_sessions.create_index("expires_at", expireAfterSeconds=0)
+    except Exception as e:
+        logger.error(f"Media index creation failed: {e}")
+
+@app.on_event("startup")
+async def build_search_index():
+    try:
+        await rebuild_search_index()
+    except Exception as e:
+        logger.error(f"Search index build failed: {e}")
+
+async def media_gc_loop():
+    while True:
+        await asyncio.sleep(MEDIA_GC_INTERVAL_SECONDS)
+        try:
+            result = await media_gc.sweep(include_unreferenced=MEDIA_GC_INCLUDE_UNREFERENCED)
+            actions = {name: len(items) for name, items in result["actions"].items() if items}
+            if actions:
+                logger.info(f"Media GC: {actions}")
+        except Exception as e:
+            logger.error(f"Media GC sweep failed: {e}")
+
+@app.on_event("startup")
+async def start_media_gc():
+    if MEDIA_GC_INTERVAL_SECONDS > 0:
+        app.state.media_gc_task = asyncio.create_task(media_gc_loop())
+
+async def upload_session_sweep_loop():
+    while True:
+        try:
+            removed = await sweep_upload_sessions()
+            if removed:
+                logger.info(f"Removed {removed} expired upload session parts")
+        except Exception as e:
+            logger.error(f"Upload session sweep failed: {e}")
+        await asyncio.sleep(UPLOAD_SESSION_SWEEP_SECONDS)
+
+@app.on_event("startup")
+async def start_upload_session_sweep():
+    if UPLOAD_SESSION_SWEEP_SECONDS > 0:
+        app.state.upload_session_sweep_task = asyncio.create_task(upload_session_sweep_loop())
+
+@app.on_event("startup")
+async def create_rollup_indexes():
+    try:
+        await submission_rollups.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Rollup index creation failed: {e}")
+
+@app.on_event("startup")
+async def start_submission_buffer():
+    submission_buffer.start()
+
+@app.on_event("shutdown")
+async def drain_submission_buffer():
+    await submission_buffer.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    password_executor.shutdown(wait=False)
+    derivative_renderer.shutdown()
+    if getattr(app.state, "media_gc_task", None):
+        app.state.media_gc_task.cancel()
+    if getattr(app.state, "upload_session_sweep_task", None):
+        app.state.upload_session_sweep_task.cancel()
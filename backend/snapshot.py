@@ -0,0 +1,186 @@
+import asyncio
+import io
+import json
+import mimetypes
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bson import json_util
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from media_storage import storage_from_env
+
+ROOT_DIR = Path(__file__).parent
+UPLOADS_DIR = ROOT_DIR / "uploads"
+
+# Site content only: users, submissions and revision history stay behind.
+SNAPSHOT_COLLECTIONS = [
+    "services", "cases", "events", "projects", "partners", "articles", "team",
+    "pages", "pages_dynamic", "forms", "site_settings", "media", "media_blobs",
+]
+SNAPSHOT_FORMAT = 1
+INSERT_CHUNK = 1000
+STAGING_SUFFIX = "_snapshot_import"
+COMPRESS_LEVEL = int(os.getenv("SNAPSHOT_COMPRESS_LEVEL", "6"))
+
+
+async def _dump_collection(db, name: str):
+    buffer = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    count = 0
+    async for doc in db[name].find({}, {"_id": 0}):
+        buffer.write(json_util.dumps(doc, ensure_ascii=False).encode("utf-8"))
+        buffer.write(b"\n")
+        count += 1
+    size = buffer.tell()
+    buffer.seek(0)
+    return name, buffer, size, count
+
+
+def _add_buffer(archive: tarfile.TarFile, name: str, buffer, size: int):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    archive.addfile(info, buffer)
+
+
+async def export_snapshot(db, path: Path, storage) -> dict:
+    """Write all content collections and the media in `storage` into one .tar.gz archive."""
+    dumps = await asyncio.gather(*(_dump_collection(db, name) for name in SNAPSHOT_COLLECTIONS))
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "collections": {name: count for name, _, _, count in dumps},
+        "uploads": 0,
+    }
+    archive = await asyncio.to_thread(tarfile.open, path, mode="w:gz", compresslevel=COMPRESS_LEVEL)
+    try:
+        for name, buffer, size, _ in dumps:
+            await asyncio.to_thread(_add_buffer, archive, f"collections/{name}.jsonl", buffer, size)
+            buffer.close()
+        # Derived and quarantined files live in hidden folders and are not listed
+        for item in await storage.list():
+            async with storage.local_copy(item.name) as source:
+                await asyncio.to_thread(archive.add, str(source), arcname=f"uploads/{item.name}", recursive=False)
+            manifest["uploads"] += 1
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        await asyncio.to_thread(_add_buffer, archive, "manifest.json", io.BytesIO(data), len(data))
+    finally:
+        await asyncio.to_thread(archive.close)
+    return manifest
+
+
+def _read_archive(path: Path, staging_dir: Path) -> dict:
+    """Parse the collections and extract the uploads into `staging_dir`."""
+    collections = {}
+    uploads = []
+    with tarfile.open(path, mode="r:gz") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            folder, _, filename = member.name.partition("/")
+            if not filename or "/" in filename or filename.startswith("."):
+                continue
+            if folder == "collections" and filename.endswith(".jsonl"):
+                name = filename[:-len(".jsonl")]
+                if name not in SNAPSHOT_COLLECTIONS:
+                    continue
+                stream = archive.extractfile(member)
+                collections[name] = [json_util.loads(line) for line in stream if line.strip()]
+            elif folder == "uploads":
+                target = staging_dir / filename
+                with archive.extractfile(member) as source, open(target, "wb") as out:
+                    while chunk := source.read(1024 * 1024):
+                        out.write(chunk)
+                uploads.append(filename)
+    return {"collections": collections, "uploads": uploads}
+
+
+async def _stage_collection(db, name: str, docs: list):
+    """Load `docs` into a staging copy of `name` carrying the same indexes."""
+    staging = db[f"{name}{STAGING_SUFFIX}"]
+    await staging.drop()
+    for index_name, spec in (await db[name].index_information()).items():
+        if index_name == "_id_":
+            continue
+        options = {key: value for key, value in spec.items() if key not in ("key", "v", "ns")}
+        await staging.create_index(spec["key"], name=index_name, **options)
+    chunks = [docs[i:i + INSERT_CHUNK] for i in range(0, len(docs), INSERT_CHUNK)]
+    await asyncio.gather(*(staging.insert_many(chunk, ordered=False) for chunk in chunks))
+
+
+async def _swap_collection(db, name: str, docs: list):
+    if docs:
+        await db[f"{name}{STAGING_SUFFIX}"].rename(name, dropTarget=True)
+    else:
+        await db[f"{name}{STAGING_SUFFIX}"].drop()
+        await db[name].delete_many({})
+
+
+async def import_snapshot(db, path: Path, storage, scratch_dir: Path) -> dict:
+    """Replace content collections with an archive's and store its media in `storage`.
+
+    Files are stored first, then every collection is loaded into a staging
+    copy and only renamed over the live one once all of them loaded, so a
+    failed import leaves the site as it was. Errors from loading documents
+    (BulkWriteError) are raised after the staging copies are dropped.
+    """
+    started = time.perf_counter()
+    staging_dir = Path(await asyncio.to_thread(tempfile.mkdtemp, prefix=".snapshot-", dir=scratch_dir))
+    try:
+        try:
+            data = await asyncio.to_thread(_read_archive, Path(path), staging_dir)
+        except tarfile.TarError as e:
+            raise ValueError(str(e))
+        for filename in data["uploads"]:
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            await storage.save(staging_dir / filename, filename, content_type)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, staging_dir, True)
+
+    collections = data["collections"]
+    try:
+        await asyncio.gather(*(_stage_collection(db, name, docs) for name, docs in collections.items()))
+    except Exception:
+        await asyncio.gather(*(db[f"{name}{STAGING_SUFFIX}"].drop() for name in collections))
+        raise
+    for name, docs in collections.items():
+        await _swap_collection(db, name, docs)
+    return {
+        "collections": {name: {"documents": len(docs)} for name, docs in collections.items()},
+        "uploads": len(data["uploads"]),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def main(argv):
+    if len(argv) < 2 or argv[0] not in ("export", "import"):
+        print("Usage: python snapshot.py export|import <archive.tar.gz>")
+        return 1
+    load_dotenv(ROOT_DIR / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    storage = storage_from_env(UPLOADS_DIR)
+    try:
+        if argv[0] == "export":
+            manifest = await export_snapshot(db, Path(argv[1]), storage)
+            print(f"Exported {sum(manifest['collections'].values())} documents and {manifest['uploads']} files to {argv[1]}")
+        else:
+            UPLOADS_DIR.mkdir(exist_ok=True)
+            result = await import_snapshot(db, Path(argv[1]), storage, UPLOADS_DIR)
+            for name, info in result["collections"].items():
+                print(f"  {name}: {info['documents']} documents")
+            print(f"Imported {result['uploads']} files in {result['seconds']}s")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,137 @@
+import json
+import logging
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from prometheus import route_template
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Incoming request ids are reused only if they look like ids
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# The ASGI scope of the current request; the route is resolved when a record is logged
+request_scope_var: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id and route template."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        if not hasattr(record, "route"):
+            scope = request_scope_var.get()
+            record.route = route_template(scope) if scope else None
+        return True
+
+
+def record_fields(record) -> dict:
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in RECORD_ATTRIBUTES and value is not None
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format with extra fields appended as key=value pairs."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(log_format: str = "text", level: int = logging.INFO):
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter(TEXT_FORMAT))
+    handler.addFilter(RequestContextFilter())
+    logging.basicConfig(level=level, handlers=[handler])
+
+
+class RequestContextMiddleware:
+    """Assigns every request an id, echoed in X-Request-ID, and logs slow requests.
+
+    The id comes from the client's X-Request-ID header when it is a
+    plausible id, so a request can be followed from the proxy onwards.
+    Requests taking `slow_seconds` or longer (0 disables) are logged with
+    their duration and body sizes.
+    """
+
+    def __init__(self, app, logger: logging.Logger, slow_seconds: float = 1.0):
+        self.app = app
+        self.logger = logger
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        request_bytes = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+            elif name == b"content-length":
+                request_bytes = value.decode("latin-1")
+        if request_id is None or not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        status = 500
+        response_bytes = 0
+
+        async def wrapped_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message["headers"], (REQUEST_ID_HEADER, request_id.encode())]}
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        id_token = request_id_var.set(request_id)
+        scope_token = request_scope_var.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            duration = time.perf_counter() - started
+            if self.slow_seconds > 0 and duration >= self.slow_seconds:
+                self.logger.warning("Slow request", extra={
+                    "event": "slow_request",
+                    "duration_ms": round(duration * 1000, 1),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "request_bytes": int(request_bytes) if request_bytes and request_bytes.isdigit() else None,
+                    "response_bytes": response_bytes,
+                })
+            request_scope_var.reset(scope_token)
+            request_id_var.reset(id_token)
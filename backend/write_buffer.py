@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class BufferFull(Exception):
+    pass
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory queue of inserts written to Mongo in batches.
+
+    Documents are flushed every `flush_interval` seconds or as soon as
+    `batch_size` are waiting, whichever comes first, with one unordered
+    insert_many per collection. In `durable` mode `submit` returns only
+    after the batch holding the document was written. `on_flush` is awaited
+    with (collection, documents) after each successful insert.
+    """
+
+    def __init__(self, db, max_queue: int = 10_000, batch_size: int = 500, flush_interval: float = 0.2,
+                 durable: bool = False, retries: int = 3,
+                 on_flush: Optional[Callable[[str, List[dict]], Awaitable]] = None):
+        self.db = db
+        self.on_flush = on_flush
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durable = durable
+        self.retries = retries
+        self.queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        # Held while a batch is written and its flush hook runs
+        self._writing = asyncio.Lock()
+        self.flush_latency = Histogram()
+        self.stats = {"accepted": 0, "rejected": 0, "written": 0, "failed": 0, "batches": 0, "max_depth": 0}
+
+    def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self._wakeup = asyncio.Event()
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, collection: str, doc: dict):
+        """Queue `doc` for insertion; raises BufferFull when the queue is at capacity."""
+        if self._closing:
+            # Shutting down: write directly rather than drop the document
+            async with self._writing:
+                await self.db[collection].insert_one(doc)
+                self.stats["accepted"] += 1
+                self.stats["written"] += 1
+                await self._flushed(collection, [doc])
+            return
+        self.start()
+        future = asyncio.get_running_loop().create_future() if self.durable else None
+        try:
+            self.queue.put_nowait((collection, doc, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise BufferFull()
+        self.stats["accepted"] += 1
+        depth = self.queue.qsize()
+        self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+        if depth >= self.batch_size - 1:
+            self._wakeup.set()
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while True:
+            first = await self.queue.get()
+            if not self._closing and self.queue.qsize() < self.batch_size - 1:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [first]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                async with self._writing:
+                    await self._write(batch)
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write(self, batch: List[Tuple[str, dict, Optional[asyncio.Future]]]):
+        started = time.perf_counter()
+        groups: Dict[str, list] = defaultdict(list)
+        for collection, doc, future in batch:
+            groups[collection].append((doc, future))
+        for collection, items in groups.items():
+            docs = [doc for doc, _ in items]
+            error = await self._insert(collection, docs)
+            if error is None:
+                self.stats["written"] += len(docs)
+                await self._flushed(collection, docs)
+            else:
+                self.stats["failed"] += len(docs)
+                logger.error(
+                    f"Dropped {len(docs)} buffered {collection} documents after {self.retries} attempts: {error}"
+                )
+            for _, future in items:
+                if future is not None and not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+        self.stats["batches"] += 1
+        self.flush_latency.observe(time.perf_counter() - started)
+
+    async def _flushed(self, collection: str, docs: List[dict]):
+        if self.on_flush is None:
+            return
+        try:
+            await self.on_flush(collection, docs)
+        except Exception as e:
+            # The documents are stored; a failed hook must not fail the submission
+            logger.error(f"Write-behind flush hook failed for {collection}: {e}")
+
+    async def _insert(self, collection: str, docs: List[dict]) -> Optional[Exception]:
+        error = None
+        for attempt in range(self.retries):
+            try:
+                await self.db[collection].insert_many(docs, ordered=False)
+                return None
+            except BulkWriteError as e:
+                # insert_many assigned _ids on the first attempt, so a retry
+                # reports documents that already made it as duplicates. Write
+                # concern errors mean the writes may not be durable.
+                write_errors = e.details.get("writeErrors") or []
+                if (write_errors and not e.details.get("writeConcernErrors")
+                        and all(err.get("code") == DUPLICATE_KEY for err in write_errors)):
+                    return None
+                error = e
+            except Exception as e:
+                error = e
+            await asyncio.sleep(0.1 * 2 ** attempt)
+        return error
+
+    @asynccontextmanager
+    async def paused(self):
+        """Hold back writes for the duration; submissions keep queueing meanwhile."""
+        async with self._writing:
+            yield
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the flusher."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Write-behind drain timed out with {self.queue.qsize()} documents queued")
+        self._task.cancel()
+        self._task = None
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "depth": self.queue.qsize() if self.queue else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": round(self.flush_interval * 1000),
+            "durable": self.durable,
+            "flush_latency": self.flush_latency.snapshot(),
+        }
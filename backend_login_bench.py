@@ -0,0 +1,95 @@
+import os
+import requests
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LoginBurstBenchmark:
+    """Measure public GET latency while a burst of logins hits the API
+
+    The burst uses valid credentials so every attempt pays for a full bcrypt
+    check: failed logins are throttled after a few attempts and answered
+    with 429 before any hashing. Use an account that exists on the target.
+    """
+
+    def __init__(self, base_url="http://localhost:8001", username="admin", password="admin123"):
+        self.api_url = f"{base_url}/api"
+        self.username = username
+        self.password = password
+        self.statuses = Counter()
+        self._lock = threading.Lock()
+
+    def sample_latency(self, seconds, endpoint="services"):
+        """Issue sequential GET requests and return latencies in ms"""
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                session.get(f"{self.api_url}/{endpoint}", timeout=30)
+                latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    def login_burst(self, stop, workers):
+        def attempt():
+            with requests.Session() as session:
+                while not stop.is_set():
+                    response = session.post(
+                        f"{self.api_url}/auth/login",
+                        json={"username": self.username, "password": self.password},
+                        timeout=30,
+                    )
+                    with self._lock:
+                        self.statuses[response.status_code] += 1
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in range(workers):
+                pool.submit(attempt)
+
+    @staticmethod
+    def summary(name, latencies):
+        latencies = sorted(latencies)
+        if not latencies:
+            print(f"{name}: no samples")
+            return
+        p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        print(
+            f"{name}: n={len(latencies)} mean={statistics.mean(latencies):.1f}ms "
+            f"p50={p(0.5):.1f}ms p95={p(0.95):.1f}ms p99={p(0.99):.1f}ms max={latencies[-1]:.1f}ms"
+        )
+
+    def run(self, seconds=10, workers=16):
+        print(f"📍 Base URL: {self.api_url}")
+        print(f"⏱  Baseline for {seconds}s...")
+        self.summary("GET /services (idle)", self.sample_latency(seconds))
+
+        print(f"🔐 Login burst with {workers} concurrent clients for {seconds}s...")
+        stop = threading.Event()
+        burst = threading.Thread(target=self.login_burst, args=(stop, workers), daemon=True)
+        burst.start()
+        time.sleep(0.5)
+        try:
+            self.summary("GET /services (login burst)", self.sample_latency(seconds))
+        finally:
+            stop.set()
+            burst.join()
+        print(f"Login responses: {dict(self.statuses)}")
+        if set(self.statuses) != {200}:
+            print("⚠️  Not every login succeeded; check the credentials (BENCH_USERNAME/BENCH_PASSWORD)")
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8001"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    username = os.getenv("BENCH_USERNAME", "admin")
+    password = os.getenv("BENCH_PASSWORD", "admin123")
+    LoginBurstBenchmark(base_url, username, password).run(workers=workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+
+
+def service(**fields):
+    return {"slug": "audit", "name": "Аудит", "description": "…", "image_url": "a.png", "features": [], **fields}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def batch(operations):
+    request = server.BatchRequest(operations=operations)
+    return asyncio.run(server.batch_write("services", request, {"sub": "admin"}))
+
+
+def test_update_cannot_rename_a_document(db):
+    asyncio.run(db.services.insert_one(service(id="A")))
+    result = batch([
+        {"op": "update", "id": "A", "data": service(id="B", name="Renamed")},
+        {"op": "update", "id": "A", "data": service(name="Updated")},
+    ])
+    assert [r["status"] for r in result["results"]] == ["error", "ok"]
+    assert result["results"][0]["error"] == "id does not match data.id"
+    docs = asyncio.run(db.services.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(None))
+    assert docs == [{"id": "A", "name": "Updated"}]
+
+
+def test_create_reports_the_stored_id(db):
+    result = batch([{"op": "create", "id": "C", "data": service()}, {"op": "create", "data": service(id="D")}])
+    assert [r["id"] for r in result["results"]] == ["C", "D"]
+    ids = asyncio.run(db.services.distinct("id"))
+    assert sorted(ids) == ["C", "D"]
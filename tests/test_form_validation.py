@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pydantic import ValidationError
+
+from form_validation import FormValidatorCache, compile_form
+
+
+FORM = {
+    "id": "contact",
+    "slug": "contact",
+    "updated_at": "2024-01-01T00:00:00+00:00",
+    "fields": [
+        {"id": "name", "type": "text", "required": True},
+        {"id": "email", "type": "email", "required": True},
+        {"id": "phone", "type": "tel"},
+        {"id": "plan", "type": "select", "options": ["Базовый", "Про"], "options_en": ["Basic", "Pro"]},
+    ],
+}
+
+
+def errors(model, data):
+    with pytest.raises(ValidationError) as error:
+        model.model_validate(data)
+    return {err["loc"][0] for err in error.value.errors()}
+
+
+def test_valid_submission_is_normalized():
+    model = compile_form(FORM)
+    result = model.model_validate({"name": "  Ann ", "email": "ann@example.com", "phone": "", "plan": "Pro"})
+    assert result.model_dump(by_alias=True) == {"name": "Ann", "email": "ann@example.com", "phone": None, "plan": "Pro"}
+
+
+@pytest.mark.parametrize("data, bad", [
+    ({"name": "Ann", "email": "not-an-email"}, {"email"}),
+    ({"name": "Ann", "email": "ann@example.com", "plan": "Enterprise"}, {"plan"}),
+    ({"name": "Ann", "email": "ann@example.com", "phone": "call me"}, {"phone"}),
+    ({"name": " ", "email": "ann@example.com"}, {"name"}),
+    ({"email": "ann@example.com"}, {"name"}),
+    ({"name": "Ann", "email": "ann@example.com", "extra": "x"}, {"extra"}),
+])
+def test_bad_values_are_rejected(data, bad):
+    assert errors(compile_form(FORM), data) == bad
+
+
+def test_models_are_recompiled_when_updated_at_changes():
+    db = AsyncMongoMockClient()["test"]
+    cache = FormValidatorCache(db.forms, ttl=0)
+
+    async def scenario():
+        await db.forms.insert_one(dict(FORM))
+        _, first = await cache.get("contact")
+        _, again = await cache.get("contact")
+        edited = {**FORM, "updated_at": "2024-02-01T00:00:00+00:00",
+                  "fields": [*FORM["fields"], {"id": "company", "type": "text", "required": True}]}
+        await db.forms.replace_one({"id": "contact"}, edited)
+        _, second = await cache.get("contact")
+        return first, again, second, await cache.get("missing")
+
+    first, again, second, missing = asyncio.run(scenario())
+    assert first is again and second is not first
+    assert errors(second, {"name": "Ann", "email": "ann@example.com"}) == {"company"}
+    assert missing == (None, None)
+    assert cache.compiled == 2
+
+
+def test_definitions_are_cached_until_invalidated():
+    db = AsyncMongoMockClient()["test"]
+    cache = FormValidatorCache(db.forms, ttl=60)
+
+    async def scenario():
+        await db.forms.insert_one(dict(FORM))
+        await cache.get("contact")
+        await db.forms.update_one({"id": "contact"}, {"$set": {"updated_at": "2024-03-01"}})
+        cached, _ = await cache.get("contact")
+        cache.invalidate("contact")
+        fresh, _ = await cache.get("contact")
+        return cached, fresh
+
+    cached, fresh = asyncio.run(scenario())
+    assert cached["updated_at"] == FORM["updated_at"]
+    assert fresh["updated_at"] == "2024-03-01"
+    assert cache.snapshot()["models"] == 1
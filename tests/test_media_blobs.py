@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from media_storage import LocalStorage
+from media_utils import StreamedUpload
+
+
+CONTENT = b"same bytes, uploaded twice"
+SHA = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    storage = LocalStorage(tmp_path)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "media_storage", storage)
+    monkeypatch.setattr(server.derivative_renderer, "storage", storage)
+    return db, storage, tmp_path
+
+
+def upload(directory):
+    path = directory / f".upload-{len(list(directory.iterdir()))}.tmp"
+    path.write_bytes(CONTENT)
+    return StreamedUpload(path, len(CONTENT), SHA, CONTENT[:16])
+
+
+async def store(directory):
+    blob = await server.store_blob(upload(directory), "text/plain", "a.txt")
+    return {"sha256": SHA, "filename": blob["filename"]}
+
+
+def test_refcount_keeps_file_until_last_release(media):
+    db, storage, tmp = media
+
+    async def scenario():
+        first = await store(tmp)
+        second = await store(tmp)
+        assert (await db.media_blobs.find_one({"_id": SHA}))["refs"] == 2
+        await server.release_blob(first)
+        assert await storage.exists(first["filename"])
+        await server.release_blob(second)
+        assert not await storage.exists(first["filename"])
+        assert await db.media_blobs.find_one({"_id": SHA}) is None
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("hook", ["move", "delete"])
+def test_store_during_purge_keeps_file(media, monkeypatch, hook):
+    """A reference taken while the last one is released must keep its bytes."""
+    db, storage, tmp = media
+    stored = {}
+    original = getattr(storage, hook)
+
+    async def interleaved(name, *args):
+        # Runs the concurrent store at the purge's most fragile point: after
+        # the file was moved aside (move), or after the record was deleted
+        # but before the parked file is (delete).
+        await original(name, *args)
+        if not stored:
+            stored["media"] = await store(tmp)
+
+    async def scenario():
+        first = await store(tmp)
+        monkeypatch.setattr(storage, hook, interleaved)
+        await server.release_blob(first)
+        monkeypatch.setattr(storage, hook, original)
+        assert stored, "the purge never reached the hooked call"
+        blob = await db.media_blobs.find_one({"_id": SHA})
+        assert blob is not None and blob["refs"] == 1 and not blob.get("purging")
+        assert (tmp / first["filename"]).read_bytes() == CONTENT
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_store_and_release(media, monkeypatch):
+    db, storage, tmp = media
+
+    async def slow(method):
+        async def wrapper(*args, **kwargs):
+            await asyncio.sleep(0)
+            return await method(*args, **kwargs)
+        return wrapper
+
+    async def scenario():
+        for name in ("exists", "move", "delete", "save"):
+            monkeypatch.setattr(storage, name, await slow(getattr(storage, name)))
+        held = [await store(tmp)]
+        for _ in range(20):
+            results = await asyncio.gather(server.release_blob(held.pop()), store(tmp))
+            held.append(results[1])
+            assert (tmp / held[0]["filename"]).read_bytes() == CONTENT
+        assert (await db.media_blobs.find_one({"_id": SHA}))["refs"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_sweep_removes_parts_of_expired_sessions(media, monkeypatch):
+    db, storage, tmp = media
+    sessions = tmp / ".sessions"
+    sessions.mkdir()
+    monkeypatch.setattr(server, "UPLOAD_SESSIONS_DIR", sessions)
+    idle = server.time.time() - server.UPLOAD_SESSION_TTL.total_seconds() - 60
+    for name in ("expired", "extended", "fresh"):
+        (sessions / f"{name}.part").write_bytes(b"part")
+    for name in ("expired", "extended"):
+        server.os.utime(sessions / f"{name}.part", (idle, idle))
+
+    async def scenario():
+        later = server.datetime.now(server.timezone.utc) + server.timedelta(hours=1)
+        await db.upload_sessions.insert_one({"id": "extended", "expires_at": later})
+        return await server.sweep_upload_sessions()
+
+    assert asyncio.run(scenario()) == 1
+    assert sorted(path.stem for path in sessions.iterdir()) == ["extended", "fresh"]
+
+
+def test_missing_compressed_variants_are_looked_up_again(media, monkeypatch):
+    db, storage, tmp = media
+    monkeypatch.setattr(server, "compressed_variants", {})
+    monkeypatch.setattr(server, "missing_compressed_variants", {})
+    sibling = f"{server.COMPRESSED_PREFIX}a.txt.gz"
+
+    def variants():
+        return asyncio.run(server.get_compressed_variants("a.txt"))
+
+    assert variants() == {}
+    (tmp / sibling).parent.mkdir(parents=True, exist_ok=True)
+    (tmp / sibling).write_bytes(b"gz")
+    # Written by another worker: seen once the miss expires
+    assert variants() == {}
+    server.missing_compressed_variants["a.txt"] = 0.0
+    assert variants() == {"gzip": sibling}
+    assert "a.txt" in server.compressed_variants
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from media_storage import S3Storage
+
+
+class FakeS3:
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.heads = 0
+
+    def head_object(self, Bucket, Key):
+        self.heads += 1
+        if Key not in self.keys:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": 1, "LastModified": datetime.now(timezone.utc)}
+
+    def delete_object(self, Bucket, Key):
+        self.keys.discard(Key)
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        return f"https://bucket.example/{Params['Key']}?signed"
+
+
+def storage(keys, **kwargs):
+    s3 = S3Storage("bucket", prefix="media/", region="us-east-1", **kwargs)
+    s3.client = FakeS3(keys)
+    return s3
+
+
+def test_missing_object_is_not_redirected():
+    s3 = storage({"media/a.png"})
+
+    async def scenario():
+        return [await s3.response(None, name) for name in ("a.png", "missing.png")]
+
+    found, missing = asyncio.run(scenario())
+    assert found.status_code == 307 and found.headers["location"].startswith("https://bucket.example/media/a.png")
+    assert missing is None
+
+
+def test_existence_is_cached_until_deleted():
+    s3 = storage({"media/a.png"}, public_url="https://cdn.example")
+
+    async def scenario():
+        await s3.response(None, "a.png")
+        await s3.response(None, "a.png")
+        await s3.delete("a.png")
+        return await s3.response(None, "a.png")
+
+    assert asyncio.run(scenario()) is None
+    assert s3.client.heads == 2
@@ -0,0 +1,78 @@
+import pytest
+from fastapi import HTTPException
+
+from server import apply_block_ops, apply_merge_patch
+
+
+# Examples from RFC 7396, appendix A
+@pytest.mark.parametrize("target, patch, result", [
+    ({"a": "b"}, {"a": "c"}, {"a": "c"}),
+    ({"a": "b"}, {"b": "c"}, {"a": "b", "b": "c"}),
+    ({"a": "b"}, {"a": None}, {}),
+    ({"a": "b", "b": "c"}, {"a": None}, {"b": "c"}),
+    ({"a": ["b"]}, {"a": "c"}, {"a": "c"}),
+    ({"a": "c"}, {"a": ["b"]}, {"a": ["b"]}),
+    ({"a": {"b": "c"}}, {"a": {"b": "d", "c": None}}, {"a": {"b": "d"}}),
+    ({"a": [{"b": "c"}]}, {"a": [1]}, {"a": [1]}),
+    (["a", "b"], ["c", "d"], ["c", "d"]),
+    ({"a": "b"}, ["c"], ["c"]),
+    ({"a": "foo"}, None, None),
+    ({"a": "foo"}, "bar", "bar"),
+    ({"e": None}, {"a": 1}, {"e": None, "a": 1}),
+    ([1, 2], {"a": "b", "c": None}, {"a": "b"}),
+    ({}, {"a": {"bb": {"ccc": None}}}, {"a": {"bb": {}}}),
+])
+def test_rfc_examples(target, patch, result):
+    assert apply_merge_patch(target, patch) == result
+
+
+def test_merge_patch_leaves_the_target_alone():
+    target = {"a": {"b": 1}}
+    apply_merge_patch(target, {"a": {"b": 2}})
+    assert target == {"a": {"b": 1}}
+
+
+BLOCKS = [
+    {"type": "text", "text": "Привет", "text_en": "Hello"},
+    {"type": "image", "src": "a.png"},
+    {"type": "html", "html": "<p></p>"},
+]
+
+
+def test_block_merge_drops_stale_translations():
+    blocks, touched, restructured = apply_block_ops(BLOCKS, [
+        {"op": "merge", "index": 0, "patch": {"text": "Пока"}},
+        {"op": "merge", "index": 1, "patch": {"alt": "Logo"}},
+    ])
+    assert blocks[0] == {"type": "text", "text": "Пока"}
+    assert blocks[1] == {"type": "image", "src": "a.png", "alt": "Logo"}
+    assert touched == {0, 1} and not restructured
+    assert BLOCKS[0]["text_en"] == "Hello"
+
+
+def test_block_merge_keeps_supplied_translations():
+    blocks, _, _ = apply_block_ops(BLOCKS, [{"op": "merge", "index": 0, "patch": {"text": "Пока", "text_en": "Bye"}}])
+    assert blocks[0] == {"type": "text", "text": "Пока", "text_en": "Bye"}
+
+
+def test_block_structure_ops_track_touched_blocks():
+    blocks, touched, restructured = apply_block_ops(BLOCKS, [
+        {"op": "insert", "index": 0, "block": {"type": "divider"}},
+        {"op": "remove", "index": 3},
+        {"op": "move", "index": 2, "to": 0},
+    ])
+    assert [block["type"] for block in blocks] == ["image", "divider", "text"]
+    assert touched == {1} and restructured
+
+
+@pytest.mark.parametrize("ops", [
+    [{"op": "merge", "index": 3, "patch": {}}],
+    [{"op": "insert", "index": -1, "block": {}}],
+    [{"op": "move", "index": 0, "to": 5}],
+    [{"op": "rename", "index": 0}],
+    ["merge"],
+])
+def test_invalid_block_ops_are_rejected(ops):
+    with pytest.raises(HTTPException) as error:
+        apply_block_ops(BLOCKS, ops)
+    assert error.value.status_code == 422
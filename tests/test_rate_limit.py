@@ -0,0 +1,191 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+import rate_limit
+from rate_limit import (
+    DuplicateFilter, MongoDuplicateFilter, MongoSlidingWindowLimiter, MongoTokenBucketLimiter,
+    SlidingWindowLimiter, TokenBucketLimiter,
+)
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    return clock
+
+
+def take_all(limiter, key, times):
+    return [asyncio.run(limiter.take(key)) for _ in range(times)]
+
+
+def fail_all(limiter, key, times):
+    return [asyncio.run(limiter.failure(key)) for _ in range(times)]
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_sliding_window_lockout_and_backoff(clock, shared):
+    args = (3, 60.0, 10.0, 25.0)
+    if shared:
+        limiter = MongoSlidingWindowLimiter(AsyncMongoMockClient()["test"].login_throttle, "user", *args)
+    else:
+        limiter = SlidingWindowLimiter(*args)
+    assert fail_all(limiter, "a", 3) == [0.0, 0.0, 10.0]
+    assert asyncio.run(limiter.check("a")) == pytest.approx(10.0)
+    assert asyncio.run(limiter.check("b")) == 0.0
+
+    clock.now += 10
+    assert asyncio.run(limiter.check("a")) == 0.0
+    # Every further lockout doubles the delay, up to the maximum
+    assert fail_all(limiter, "a", 3)[-1] == 20.0
+    clock.now += 20
+    assert fail_all(limiter, "a", 3)[-1] == 25.0
+
+    asyncio.run(limiter.reset("a"))
+    assert asyncio.run(limiter.check("a")) == 0.0
+    assert fail_all(limiter, "a", 3)[-1] == 10.0
+
+
+def test_sliding_window_forgets_old_failures(clock):
+    limiter = SlidingWindowLimiter(3, 60.0, 10.0, 100.0)
+    fail_all(limiter, "a", 2)
+    clock.now += 61
+    assert fail_all(limiter, "a", 2) == [0.0, 0.0]
+    assert asyncio.run(limiter.check("a")) == 0.0
+
+
+def test_shared_sliding_window_blocks_other_workers(clock):
+    collection = AsyncMongoMockClient()["test"].login_throttle
+    first = MongoSlidingWindowLimiter(collection, "user", 2, 60.0, 10.0, 100.0)
+    second = MongoSlidingWindowLimiter(collection, "user", 2, 60.0, 10.0, 100.0)
+    fail_all(first, "a", 1)
+    assert fail_all(second, "a", 1) == [10.0]
+    assert asyncio.run(first.check("a")) == pytest.approx(10.0)
+
+
+def test_login_failures_count_per_username_across_clients(clock, monkeypatch):
+    import server
+    from starlette.requests import Request
+
+    monkeypatch.setattr(server, "login_user_limiter", SlidingWindowLimiter(2, 60.0, 10.0, 100.0))
+    monkeypatch.setattr(server, "login_ip_limiter", SlidingWindowLimiter(100, 60.0, 10.0, 100.0))
+    monkeypatch.setattr(server, "db", AsyncMongoMockClient()["test"])
+
+    def request(host, forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return Request({"type": "http", "method": "POST", "path": "/api/auth/login",
+                        "headers": headers, "client": (host, 1234)})
+
+    async def login(host, forwarded=None):
+        with pytest.raises(HTTPException) as error:
+            await server.login(server.LoginRequest(username="admin", password="guess"),
+                               request(host, forwarded), server.BackgroundTasks())
+        return error.value.status_code
+
+    async def scenario():
+        # Without trusted proxies a forged X-Forwarded-For changes nothing
+        assert [await login("10.0.0.1", f"192.0.2.{i}") for i in range(2)] == [401, 401]
+        # Other addresses share the username's budget
+        assert await login("10.0.0.2") == 429
+        clock.now += 10
+        assert await login("10.0.0.3") == 401
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_token_bucket_burst_then_refill(clock, shared):
+    if shared:
+        limiter = MongoTokenBucketLimiter(AsyncMongoMockClient()["test"].throttle, "ip", 2.0, 3)
+    else:
+        limiter = TokenBucketLimiter(2.0, 3)
+    retries = take_all(limiter, "a", 4)
+    assert retries[:3] == [0.0, 0.0, 0.0]
+    assert retries[3] == pytest.approx(0.5)
+    # Other keys have their own bucket
+    assert take_all(limiter, "b", 1) == [0.0]
+
+    clock.now += 0.5
+    assert take_all(limiter, "a", 2)[0] == 0.0
+    clock.now += 10
+    assert take_all(limiter, "a", 3) == [0.0, 0.0, 0.0]
+    assert limiter.stats["rejected"] >= 2
+
+
+def test_shared_token_bucket_is_shared(clock):
+    collection = AsyncMongoMockClient()["test"].throttle
+    first = MongoTokenBucketLimiter(collection, "ip", 1.0, 2)
+    second = MongoTokenBucketLimiter(collection, "ip", 1.0, 2)
+    assert take_all(first, "a", 2) == [0.0, 0.0]
+    assert take_all(second, "a", 1)[0] > 0
+
+
+def test_token_bucket_key_limit(clock):
+    limiter = TokenBucketLimiter(1.0, 1, max_keys=10)
+    for index in range(100):
+        asyncio.run(limiter.take(str(index)))
+    assert limiter.snapshot()["keys"] == 10
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_duplicate_filter_window_and_forget(clock, monkeypatch, shared):
+    if shared:
+        duplicates = MongoDuplicateFilter(AsyncMongoMockClient()["test"].throttle, "dup", 60)
+    else:
+        duplicates = DuplicateFilter(60)
+
+    async def scenario():
+        assert not await duplicates.seen("x")
+        assert await duplicates.seen("x")
+        await duplicates.forget("x")
+        assert not await duplicates.seen("x")
+
+    asyncio.run(scenario())
+    assert duplicates.stats == {"checked": 3, "duplicates": 1}
+
+
+def test_duplicate_filter_expires(clock):
+    duplicates = DuplicateFilter(60)
+    assert not asyncio.run(duplicates.seen("x"))
+    clock.now += 61
+    assert not asyncio.run(duplicates.seen("x"))
+
+
+def test_submission_retry_after_full_buffer_is_stored(monkeypatch):
+    import server
+    from write_buffer import BufferFull
+
+    stored = []
+    attempts = iter([BufferFull(), None])
+
+    async def submit(collection, doc):
+        error = next(attempts)
+        if error:
+            raise error
+        stored.append(doc)
+
+    monkeypatch.setattr(server, "submit_duplicates", DuplicateFilter(600))
+    monkeypatch.setattr(server.submission_buffer, "submit", submit)
+    data = {"name": "Ann", "message": "Hello"}
+
+    async def scenario():
+        with pytest.raises(HTTPException) as error:
+            await server.store_submission("contact", "contact_forms", dict(data), data)
+        assert error.value.status_code == 503
+        await server.store_submission("contact", "contact_forms", dict(data), data)
+        # A genuine resubmission is still dropped
+        await server.store_submission("contact", "contact_forms", dict(data), {**data, "name": " ann "})
+
+    asyncio.run(scenario())
+    assert stored == [data]
@@ -0,0 +1,68 @@
+import asyncio
+import copy
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import revisions
+from revisions import RevisionStore, apply, diff
+
+
+@pytest.mark.parametrize("old, new", [
+    ({"a": 1, "b": {"c": [1, 2, 3]}}, {"a": 2, "b": {"c": [1, 5]}, "d": None}),
+    ({"blocks": [{"t": "x"}]}, {"blocks": [{"t": "y"}, {"t": "z"}]}),
+    ({"a": {"b": 1}}, {"a": "flat"}),
+    ({"a": 1}, {}),
+    ([1, 2], [3]),
+])
+def test_diff_round_trips(old, new):
+    ops = diff(old, new)
+    assert apply(copy.deepcopy(old), ops) == new
+    assert diff(new, new) == []
+
+
+def test_diff_is_structural():
+    ops = diff({"title": "a", "blocks": [{"text": "x"}, {"text": "y"}]},
+               {"title": "a", "blocks": [{"text": "x"}, {"text": "z"}]})
+    assert ops == [["set", ["blocks", 1, "text"], "z"]]
+
+
+# Long enough that a delta is much smaller than a compressed snapshot
+BODY = " ".join(str(i * 7919 % 10007) for i in range(300))
+
+
+def versions(count):
+    return [{"id": "p", "title": f"v{n}", "blocks": [{"text": BODY}, {"n": n}]} for n in range(count)]
+
+
+def test_every_version_is_reconstructed(monkeypatch):
+    monkeypatch.setattr(revisions, "SNAPSHOT_EVERY", 4)
+    store = RevisionStore(AsyncMongoMockClient()["test"].revisions)
+    docs = versions(10)
+
+    async def scenario():
+        numbers = [await store.record("pages", "p", doc, author="admin") for doc in docs]
+        assert await store.record("pages", "p", docs[-1]) is None
+        store._latest.clear()
+        rebuilt = [await store.get("pages", "p", number) for number in numbers]
+        return numbers, rebuilt, await store.list("pages", "p")
+
+    numbers, rebuilt, listed = asyncio.run(scenario())
+    assert numbers == list(range(1, 11))
+    assert rebuilt == docs
+    kinds = {entry["version"]: entry["kind"] for entry in listed}
+    assert kinds[1] == kinds[5] == kinds[9] == "snapshot"
+    assert kinds[2] == "delta"
+    assert all(entry["version"] - entry["base"] < 4 for entry in listed)
+    assert listed[0]["changed"] == ["blocks", "title"]
+
+
+def test_first_save_keeps_the_previous_state():
+    store = RevisionStore(AsyncMongoMockClient()["test"].revisions)
+    before, after = versions(2)
+
+    async def scenario():
+        version = await store.record("articles", "p", after, before=before)
+        return version, await store.get("articles", "p", 1), await store.get("articles", "p", 2)
+
+    assert asyncio.run(scenario()) == (2, before, after)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import date
+
+from mongomock_motor import AsyncMongoMockClient
+
+from rollups import SubmissionRollups
+from write_buffer import WriteBehindBuffer
+
+
+def contact(day, service):
+    return {"created_at": f"{day}T10:00:00+00:00", "name": "Ann", "service": service}
+
+
+def test_rebuild_matches_incremental_counts():
+    db = AsyncMongoMockClient()["test"]
+    rollups = SubmissionRollups(db)
+    docs = [contact("2024-05-01", "audit"), contact("2024-05-01", "tax"), contact("2024-05-02", "audit")]
+
+    async def scenario():
+        await db.contact_forms.insert_many([dict(doc) for doc in docs])
+        await rollups.record("contact_forms", docs)
+        recorded = await rollups.summary("contact", date(2024, 5, 1), date(2024, 5, 2))
+        await db.submission_rollups.insert_one({"_id": "stale", "form": "contact", "day": "2024-05-01",
+                                                "field": "__total__", "value": "", "count": 40})
+        assert (await rollups.rebuild()) == {"rollups": 5}
+        return recorded, await rollups.summary("contact", date(2024, 5, 1), date(2024, 5, 2))
+
+    recorded, rebuilt = asyncio.run(scenario())
+    assert rebuilt == recorded
+    assert rebuilt["total"] == 3 and rebuilt["fields"] == {"service": {"audit": 2, "tax": 1}}
+
+
+def test_submissions_during_a_paused_rebuild_are_counted_once():
+    db = AsyncMongoMockClient()["test"]
+    rollups = SubmissionRollups(db)
+    buffer = WriteBehindBuffer(db, flush_interval=0.01, on_flush=rollups.record)
+
+    async def scenario():
+        await buffer.submit("contact_forms", contact("2024-05-01", "audit"))
+        await asyncio.sleep(0.05)
+        async with buffer.paused():
+            await buffer.submit("contact_forms", contact("2024-05-01", "tax"))
+            await asyncio.sleep(0.05)
+            # Held back until the rebuild has swapped the rollups in
+            assert await db.contact_forms.count_documents({}) == 1
+            await rollups.rebuild()
+        await buffer.stop()
+        return await rollups.summary("contact", date(2024, 5, 1), date(2024, 5, 1))
+
+    summary = asyncio.run(scenario())
+    assert summary["total"] == 2
+    assert summary["fields"] == {"service": {"audit": 1, "tax": 1}}
+
+
+def test_rebuild_counts_only_option_fields_of_dynamic_forms():
+    db = AsyncMongoMockClient()["test"]
+    rollups = SubmissionRollups(db)
+    fields = [{"id": "plan", "type": "select"}, {"id": "note", "type": "textarea"}]
+
+    async def scenario():
+        await db.forms.insert_one({"id": "signup", "fields": fields})
+        await db.form_submissions.insert_many([
+            {"form_id": "signup", "created_at": "2024-05-01T10:00:00+00:00",
+             "payload": {"plan": plan, "note": f"free text {n}"}}
+            for n, plan in enumerate(["basic", "pro", "pro"])
+        ])
+        await rollups.rebuild()
+        return await rollups.summary("signup", date(2024, 5, 1), date(2024, 5, 1)), \
+            await db.submission_rollups.count_documents({})
+
+    summary, stored = asyncio.run(scenario())
+    assert summary["total"] == 3
+    assert summary["fields"] == {"plan": {"pro": 2, "basic": 1}}
+    assert stored == 3
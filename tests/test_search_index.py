@@ -0,0 +1,70 @@
+from search_index import SearchIndex, make_snippet, stem, tokenize
+
+
+def article(doc_id, title, content="", **fields):
+    return {"id": doc_id, "slug": doc_id, "title": title, "content": content, **fields}
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_tokenizer_drops_stopwords_and_stems():
+    assert tokenize("Инвестиции в проекты и партнёров") == [stem("инвестиция"), "проект", "партнер"]
+    assert tokenize("The investments of our partners") == [stem("investment"), stem("partner")]
+    assert stem("партнеров") == stem("партнеры")
+
+
+def test_title_matches_outrank_body_matches():
+    index = SearchIndex()
+    index.add("articles", article("body", "Новости", "Рынок логистики растёт"))
+    index.add("articles", article("title", "Логистика в Азии", "Обзор рынка"))
+    index.add("articles", article("other", "Финансы", "Банки и кредиты"))
+    assert ids(index.search("логистика")) == ["title", "body"]
+
+
+def test_more_matching_terms_rank_higher():
+    index = SearchIndex()
+    index.add("articles", article("one", "Экспорт", "зерно"))
+    index.add("articles", article("both", "Экспорт зерна", "зерно"))
+    assert ids(index.search("экспорт зерна"))[0] == "both"
+
+
+def test_english_query_uses_translations_and_language_filter():
+    index = SearchIndex()
+    index.add("articles", article("a", "Логистика", title_en="Logistics"))
+    results = index.search("logistics")
+    assert ids(results) == ["a"] and results[0]["lang"] == "en"
+    assert index.search("logistics", lang="ru") == []
+    assert index.search("logistics", types=["cases"]) == []
+
+
+def test_update_and_remove_drop_old_hits():
+    index = SearchIndex()
+    index.add("articles", article("a", "Логистика"))
+    index.add("articles", article("b", "Логистика и склады"))
+    index.add("articles", article("a", "Финансы"))
+    assert ids(index.search("логистика")) == ["b"]
+    assert ids(index.search("финансы")) == ["a"]
+
+    index.remove("articles", "b")
+    assert index.search("логистика") == []
+    assert "логистик" not in index.postings
+    assert len(index) == 2
+    index.remove("articles", "a")
+    assert len(index) == 0 and index.total_length == 0
+
+
+def test_dynamic_page_blocks_skip_non_text_keys():
+    index = SearchIndex()
+    index.add("pages_dynamic", {"id": "p", "slug": "p", "title": "О нас", "blocks": [
+        {"type": "hero", "image_url": "logistics.png", "text": "<p>Морские перевозки</p>"},
+    ]})
+    assert ids(index.search("перевозки")) == ["p"]
+    assert index.search("logistics") == []
+
+
+def test_snippet_centres_on_the_first_match():
+    text = " ".join(["слово"] * 80) + " логистика " + " ".join(["текст"] * 80)
+    snippet = make_snippet(text, tokenize("логистика"), width=60)
+    assert "логистика" in snippet and snippet.startswith("…") and snippet.endswith("…")
@@ -0,0 +1,25 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from seed_utils import seed_collection
+
+
+SEED = [{"id": "a", "title": "Seeded", "updated_at": "2024-01-01"}, {"id": "b", "title": "New"}]
+
+
+def test_reseeding_keeps_admin_edits_unless_overwriting():
+    db = AsyncMongoMockClient()["test"]
+
+    async def scenario():
+        await db.services.insert_one({"id": "a", "title": "Edited by admin", "updated_at": "2024-06-01"})
+        kept = await seed_collection(db, "services", [dict(doc) for doc in SEED])
+        edited = await db.services.find_one({"id": "a"}, {"_id": 0})
+        reset = await seed_collection(db, "services", [dict(doc) for doc in SEED], missing_only=False)
+        return kept, edited, reset, await db.services.find({}, {"_id": 0}).sort("id").to_list(None)
+
+    kept, edited, reset, docs = asyncio.run(scenario())
+    assert (kept["inserted"], kept["updated"], kept["unchanged"]) == (1, 0, 1)
+    assert edited["title"] == "Edited by admin"
+    assert (reset["updated"], reset["unchanged"]) == (1, 1)
+    assert docs == SEED
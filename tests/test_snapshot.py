@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+
+from media_storage import LocalStorage
+from snapshot import export_snapshot, import_snapshot
+
+
+def site(tmp_path, name):
+    root = tmp_path / name
+    root.mkdir()
+    return AsyncMongoMockClient()[name], LocalStorage(root), root
+
+
+def test_round_trip_through_media_storage(tmp_path):
+    source_db, source, source_root = site(tmp_path, "source")
+    target_db, target, target_root = site(tmp_path, "target")
+    archive = tmp_path / "snapshot.tar.gz"
+    (source_root / "blob.png").write_bytes(b"png")
+    (source_root / ".derivatives").mkdir()
+    (source_root / ".derivatives" / "blob-320.webp").write_bytes(b"webp")
+
+    async def scenario():
+        await source_db.services.insert_many([{"id": "s1"}, {"id": "s2"}])
+        await source_db.media.insert_one({"id": "m1", "filename": "blob.png"})
+        await target_db.services.insert_one({"id": "old"})
+        await target_db.services.create_index("id", unique=True)
+        await target_db.articles.insert_one({"id": "gone"})
+        manifest = await export_snapshot(source_db, archive, source)
+        result = await import_snapshot(target_db, archive, target, target_root)
+        services = await target_db.services.find({}, {"_id": 0}).sort("id").to_list(None)
+        return manifest, result, services, await target_db.articles.count_documents({}), \
+            await target_db.services.index_information(), await target_db.list_collection_names()
+
+    manifest, result, services, articles, indexes, names = asyncio.run(scenario())
+    assert manifest["uploads"] == 1 and result["uploads"] == 1
+    assert services == [{"id": "s1"}, {"id": "s2"}]
+    assert articles == 0
+    assert any(spec.get("unique") for spec in indexes.values())
+    assert not [name for name in names if name.endswith("_snapshot_import")]
+    assert sorted(path.name for path in target_root.iterdir()) == ["blob.png"]
+    assert (target_root / "blob.png").read_bytes() == b"png"
+
+
+def test_failed_import_leaves_the_site_untouched(tmp_path):
+    source_db, source, _ = site(tmp_path, "source")
+    target_db, target, target_root = site(tmp_path, "target")
+    archive = tmp_path / "snapshot.tar.gz"
+
+    async def scenario():
+        await source_db.services.insert_many([{"id": "dup"}, {"id": "dup"}])
+        await source_db.team.insert_one({"id": "t1"})
+        await target_db.services.insert_one({"id": "live"})
+        await target_db.services.create_index("id", unique=True)
+        await target_db.team.insert_one({"id": "live"})
+        await export_snapshot(source_db, archive, source)
+        with pytest.raises(BulkWriteError):
+            await import_snapshot(target_db, archive, target, target_root)
+        return [await target_db[name].find({}, {"_id": 0}).to_list(None) for name in ("services", "team")], \
+            await target_db.list_collection_names()
+
+    (services, team), names = asyncio.run(scenario())
+    assert services == [{"id": "live"}] and team == [{"id": "live"}]
+    assert not [name for name in names if name.endswith("_snapshot_import")]
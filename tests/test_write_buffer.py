@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import write_buffer
+from write_buffer import DUPLICATE_KEY, BufferFull, WriteBehindBuffer
+
+
+class FlakyCollection:
+    """Fails insert_many with the queued errors, then stores the documents."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.docs = []
+        self.attempts = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        self.docs.extend(docs)
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+def bulk_error(write_errors=(), write_concern_errors=()):
+    return BulkWriteError({
+        "writeErrors": [{"index": i, "code": code, "errmsg": "error"} for i, code in enumerate(write_errors)],
+        "writeConcernErrors": [{"code": code, "errmsg": "error"} for code in write_concern_errors],
+        "nInserted": 0,
+    })
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    async def sleep(seconds):
+        pass
+
+    monkeypatch.setattr(write_buffer.asyncio, "sleep", sleep)
+
+
+def insert(errors, retries=3):
+    collection = FlakyCollection(errors)
+    buffer = WriteBehindBuffer({"items": collection}, retries=retries)
+    error = asyncio.run(buffer._insert("items", [{"n": 1}]))
+    return error, collection
+
+
+def test_duplicates_on_retry_count_as_written():
+    error, collection = insert([ConnectionError("reset"), bulk_error([DUPLICATE_KEY])])
+    assert error is None
+    assert collection.attempts == 2
+
+
+@pytest.mark.parametrize("failure", [
+    bulk_error([]),
+    bulk_error([DUPLICATE_KEY, 121]),
+    bulk_error([DUPLICATE_KEY], write_concern_errors=[64]),
+    bulk_error([], write_concern_errors=[64]),
+])
+def test_other_bulk_errors_are_retried(failure):
+    error, collection = insert([failure] * 3)
+    assert error is failure
+    assert collection.attempts == 3
+
+
+def test_retry_recovers_from_a_transient_error():
+    error, collection = insert([bulk_error([], write_concern_errors=[64])])
+    assert error is None
+    assert collection.docs == [{"n": 1}]
+
+
+def test_durable_submit_raises_when_the_batch_is_dropped():
+    failure = bulk_error([121])
+    collection = FlakyCollection([failure] * 3)
+    flushed = []
+
+    async def on_flush(name, docs):
+        flushed.append(docs)
+
+    async def scenario():
+        buffer = WriteBehindBuffer({"items": collection}, flush_interval=0.01, durable=True, on_flush=on_flush)
+        with pytest.raises(BulkWriteError):
+            await buffer.submit("items", {"n": 1})
+        await buffer.stop()
+        return buffer.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1 and stats["written"] == 0
+    assert flushed == []
+
+
+def test_full_queue_rejects_and_flush_hook_errors_are_contained():
+    collection = FlakyCollection([])
+
+    async def on_flush(name, docs):
+        raise RuntimeError("hook")
+
+    async def scenario():
+        buffer = WriteBehindBuffer({"items": collection}, max_queue=1, flush_interval=0.01, on_flush=on_flush)
+        await buffer.submit("items", {"n": 1})
+        with pytest.raises(BufferFull):
+            await buffer.submit("items", {"n": 2})
+        await buffer.stop()
+        return buffer.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1 and stats["written"] == 1
+    assert collection.docs == [{"n": 1}]